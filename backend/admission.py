@@ -0,0 +1,127 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+# ==================== ADMISSION CONTROL ====================
+
+# Rough peak memory of loading a file into a DataFrame, relative to its size on disk
+MEMORY_FACTORS = {
+    'csv': 6,
+    'excel': 15,  # openpyxl cell objects dominate
+    'xml': 10
+}
+DEFAULT_MEMORY_FACTOR = 10
+MIN_JOB_BYTES = 16 * 1024 * 1024
+
+def estimate_job_memory(file_size: Optional[int], file_type: Optional[str]) -> int:
+    """Memory to reserve for a job that loads a file of this size and type"""
+    factor = MEMORY_FACTORS.get(file_type, DEFAULT_MEMORY_FACTOR)
+    return max(MIN_JOB_BYTES, (file_size or 0) * factor)
+
+class Overloaded(HTTPException):
+    """429 with a Retry-After hint; raised when a job is not admitted"""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class WorkTicket:
+    """An admitted job's reservation; released once the job has run"""
+
+    def __init__(self, estimated_bytes: int):
+        self.estimated_bytes = estimated_bytes
+        self.released = False
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for file parsing and detection work.
+
+    Jobs are admitted before they are queued: at most workers run at once,
+    at most max_queued wait behind them, and the estimated memory of all
+    admitted jobs stays within memory_budget (a job larger than the whole
+    budget is admitted only when nothing else holds memory). Jobs that
+    don't fit raise Overloaded instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queued: int, memory_budget: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.memory_budget = memory_budget
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="heavy-work")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._reserved_bytes = 0
+        self._avg_seconds = 1.0
+        self.completed = 0
+        self.rejected = 0
+
+    def admit(self, estimated_bytes: int) -> WorkTicket:
+        """Reserve capacity for a job or raise Overloaded"""
+        with self._lock:
+            if self._admitted >= self.workers + self.max_queued:
+                self.rejected += 1
+                raise Overloaded("Server is busy, too many files are being processed", self._retry_after())
+            if self._reserved_bytes and self._reserved_bytes + estimated_bytes > self.memory_budget:
+                self.rejected += 1
+                raise Overloaded("Server is busy, not enough memory for this file right now", self._retry_after())
+            self._admitted += 1
+            self._reserved_bytes += estimated_bytes
+            return WorkTicket(estimated_bytes)
+
+    def release(self, ticket: WorkTicket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._admitted -= 1
+            self._reserved_bytes -= ticket.estimated_bytes
+
+    async def run(self, ticket: WorkTicket, fn: Callable, *args, **kwargs):
+        """Run fn on the pool under an admitted ticket, releasing it afterwards"""
+        try:
+            future = self._pool.submit(self._timed, fn, args, kwargs)
+        except BaseException:
+            self.release(ticket)
+            raise
+        # Released when the job ends, even if the awaiting request went away first
+        future.add_done_callback(lambda _: self.release(ticket))
+        return await asyncio.wrap_future(future)
+
+    def _timed(self, fn: Callable, args, kwargs):
+        with self._lock:
+            self._running += 1
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def _retry_after(self) -> int:
+        # Time for the work ahead to drain at the recent average job duration
+        return max(1, math.ceil(self._avg_seconds * self._admitted / self.workers))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "max_queued": self.max_queued,
+                "reserved_bytes": self._reserved_bytes,
+                "memory_budget": self.memory_budget,
+                "avg_job_seconds": round(self._avg_seconds, 3),
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
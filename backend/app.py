@@ -1,19 +1,61 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import os
 import uuid
 import json
 import sqlite3
-import re
 import csv
 import io
+import hashlib
+import functools
+import inspect
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Callable, Iterator
 import pandas as pd
 import numpy as np
 
+from dataframe_cache import DataFrameCache
+from db import ConnectionPool, AsyncConnectionPool, open_connection
+from admission import BoundedExecutor, estimate_job_memory
+from month_mask import range_mask, mask_label, overlapping_masks
+from parsing import (
+    normalize_dataframe, normalize_dataframe_parallel, normalize_months, normalize_fields,
+    month_inputs, field_columns, build_record, summarize_parse
+)
+from ingest import (
+    RECORDS_VERSION, apply_ingest_pragmas, ensure_record_indexes, stage_records, ingest_records,
+    stage_reparse_records, reingest_records,
+    decode_row_numbers
+)
+from excel import list_sheets, read_excel_sheet, sample_excel_sheet, count_excel_rows
+from xml_records import read_xml_records, sample_xml_records, count_xml_records, suggest_record_paths
+from detection import COLUMN_KEYWORDS, detect_column, get_sample_values, auto_detect_columns
+from jobs import JobRegistry, ParseJob, JobCancelled
+from columnar import (
+    has_columnar_copy, write_columnar_copy, read_columnar_copy, remove_columnar_copy
+)
+from gantt import aggregate_gantt_groups, month_span
+from column_stats import compute_column_stats, store_column_stats, has_column_stats, release_column_stats
+from http_cache import CompressionMiddleware, make_etag, matching_etag, set_validators, not_modified_response
+from record_formats import (
+    RECORD_FORMATS, NDJSON_MEDIA_TYPE, dumps, loads, negotiate_record_format, record_response
+)
+from value_search import (
+    SEARCH_MODES, MAX_SEARCH_LIMIT, create_value_search, has_trigram_index,
+    build_value_search, value_search_range, search_values, scan_search_values
+)
+from exports import (
+    EXPORT_MEDIA_TYPES, export_filename, iter_csv_export, iter_json_export, build_xlsx_export, iter_file_chunks
+)
+
 app = FastAPI()
 
 # Enable CORS for Replit development
@@ -24,24 +66,88 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # ==================== REQUEST MODELS ====================
 
 class FilterRequest(BaseModel):
     column_name: str
     values: List[str]
+    page_size: Optional[int] = None
+    cursor: Optional[str] = None
+
+class ExportRequest(BaseModel):
+    column_name: Optional[str] = None  # None: every harvesting record of the parse
+    values: List[str] = []
+    columns: Optional[List[str]] = None
+
+class GanttRequest(BaseModel):
+    grouping_columns: List[str]
+    column_name: Optional[str] = None  # None: every harvesting record of the parse
+    values: List[str] = []
+    include_record_ids: bool = True
+
+class SheetSelectionRequest(BaseModel):
+    sheet_name: str
+
+class RecordPathRequest(BaseModel):
+    record_path: Optional[str] = None  # None: the root's children
+
+class MonthQueryRequest(BaseModel):
+    start_month: int
+    end_month: int
+    upload_ids: Optional[List[str]] = None
+    filters: Dict[str, List[str]] = {}
+    limit: int = 1000
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 DB_FILE = os.path.join(DATA_DIR, "db.sqlite")
 
+# Connections kept open per pool (sync endpoints / async endpoints), and how
+# long a request waits for a free one before it is answered with 503
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+db = ConnectionPool(DB_FILE, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+async_db = AsyncConnectionPool(DB_FILE, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+
+# Rows read on upload for the preview and column detection
+UPLOAD_SAMPLE_ROWS = int(os.environ.get("UPLOAD_SAMPLE_ROWS", 1000))
+
+# Memory budget for parsed upload DataFrames kept between requests
+DF_CACHE_MAX_BYTES = int(os.environ.get("DF_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Upload limits: files are streamed to disk in chunks of UPLOAD_CHUNK_SIZE
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Parallel parsing: PARSE_WORKERS > 1 enables a process pool for files with at
+# least PARALLEL_PARSE_MIN_ROWS rows, split into chunks of PARSE_CHUNK_ROWS
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", 0))
+PARALLEL_PARSE_MIN_ROWS = int(os.environ.get("PARALLEL_PARSE_MIN_ROWS", 100000))
+PARSE_CHUNK_ROWS = int(os.environ.get("PARSE_CHUNK_ROWS", 50000))
+
+# File parsing/detection runs on its own bounded pool so it can't starve cheap
+# endpoints; work beyond the queue or memory budget is refused with 429
+HEAVY_WORKERS = int(os.environ.get("HEAVY_WORKERS", min(4, os.cpu_count() or 1)))
+HEAVY_MAX_QUEUED = int(os.environ.get("HEAVY_MAX_QUEUED", 8))
+HEAVY_MEMORY_BUDGET = int(os.environ.get("HEAVY_MEMORY_BUDGET", 1024 * 1024 * 1024))
+
+# Filter results: largest page a client may ask for, and rows fetched per
+# step while streaming NDJSON
+MAX_FILTER_PAGE_SIZE = int(os.environ.get("MAX_FILTER_PAGE_SIZE", 10000))
+FILTER_STREAM_BATCH = 1000
+
 # ==================== DATABASE SETUP ====================
 
 def init_db():
     """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = open_connection(DB_FILE)
     c = conn.cursor()
     
+    # Readers don't block the parse writer and commits avoid the rollback journal
+    c.execute("PRAGMA journal_mode=WAL")
+    
     c.execute("""CREATE TABLE IF NOT EXISTS uploads (
                 upload_id TEXT PRIMARY KEY,
                 filename TEXT,
@@ -62,144 +168,162 @@ def init_db():
                 month_mask INTEGER
                 )""")
     
-    conn.commit()
-    conn.close()
-
-init_db()
-
-# ==================== COLUMN DETECTION HEURISTICS ====================
-
-COLUMN_KEYWORDS = {
-    'crop_name': [
-        'crop', 'crop name', 'crop type', 'commodity', 'product', 'species',
-        'plant', 'variety', 'cultivar', 'item', 'produce', 'culture'
-    ],
-    'country': [
-        'country', 'nation', 'region', 'location', 'place', 'state', 'province',
-        'area', 'zone', 'territory', 'land', 'country code', 'nation code'
-    ],
-    'season': [
-        'season', 'period', 'phase', 'timing', 'cycle', 'growth', 'stage',
-        'stage name', 'period name', 'season name'
-    ],
-    'harvest_calendar': [
-        'harvest', 'harvest calendar', 'harvest period', 'harvest months',
-        'harvest season', 'calendar', 'months', 'month', 'growing period',
-        'growing months', 'season calendar', 'schedule', 'timing', 'duration',
-        'date', 'dates', 'start', 'end', 'from', 'to', 'period', 'calendar period'
-    ],
-    'start_date': [
-        'start', 'start date', 'from date', 'begin', 'begin date', 'commence',
-        'start month', 'start date', 'sowing', 'planting', 'plantation'
-    ],
-    'end_date': [
-        'end', 'end date', 'to date', 'finish', 'finish date', 'complete',
-        'end month', 'harvest', 'harvest date', 'completion', 'deadline'
-    ],
-    'allYear': [
-        'all year', 'allyear', 'year round', 'year-round', 'perennial', 'continuous',
-        'all months', 'always', 'permanent', 'annual crop'
-    ],
-    'currentYear': [
-        'year', 'current year', 'year data', 'data year', 'year reference', 'harvest year',
-        'year identifier', 'year of', 'year value', 'season year'
-    ]
-}
-
-MONTH_NAMES = {
-    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
-    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
-    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
-    'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12
-}
-
-def score_column_header(header: str, column_type: str) -> float:
-    """
-    Score how likely a column header matches a given column type.
-    Returns a score 0.0-1.0
-    """
-    header_lower = header.lower().strip()
-    keywords = COLUMN_KEYWORDS.get(column_type, [])
+    # Stored files, shared by every upload with the same content hash
+    c.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                path TEXT,
+                file_type TEXT,
+                file_size INTEGER,
+                total_rows INTEGER,
+                columns_json TEXT,
+                preview_json TEXT,
+                detected_json TEXT,
+                ref_count INTEGER,
+                created_at TEXT
+                )""")
     
-    max_score = 0.0
+    # Parse results, shared by every upload with the same content and mappings
+    c.execute("""CREATE TABLE IF NOT EXISTS parse_results (
+                parse_id TEXT PRIMARY KEY,
+                content_hash TEXT,
+                mappings_json TEXT,
+                stats_json TEXT,
+                sample_json TEXT,
+                ref_count INTEGER,
+                created_at TEXT
+                )""")
     
-    # Exact match
-    if header_lower in keywords:
-        return 1.0
+    # Distinct month masks per parse, used to turn month windows into index lookups
+    c.execute("""CREATE TABLE IF NOT EXISTS parse_masks (
+                parse_id TEXT,
+                month_mask INTEGER,
+                record_count INTEGER,
+                PRIMARY KEY (parse_id, month_mask)
+                )""")
     
-    # Contains keyword
-    for keyword in keywords:
-        if keyword in header_lower:
-            score = len(keyword) / len(header_lower)
-            max_score = max(max_score, score)
+    # Row numbers of each parse's records per original column value, for filtering
+    c.execute("""CREATE TABLE IF NOT EXISTS value_postings (
+                parse_id TEXT,
+                column_name TEXT,
+                value TEXT,
+                row_count INTEGER,
+                row_numbers BLOB,
+                PRIMARY KEY (parse_id, column_name, value)
+                ) WITHOUT ROWID""")
     
-    # Partial match (Levenshtein-like simple check)
-    for keyword in keywords:
-        if header_lower.startswith(keyword) or keyword.startswith(header_lower):
-            max_score = max(max_score, 0.7)
+    # Columns of each parse and whether value_postings covers them
+    c.execute("""CREATE TABLE IF NOT EXISTS parse_columns (
+                parse_id TEXT,
+                column_name TEXT,
+                position INTEGER,
+                distinct_count INTEGER,
+                indexed INTEGER,
+                PRIMARY KEY (parse_id, column_name)
+                )""")
     
-    return max_score
-
-def detect_column_type(header: str, sample_values: List[str]) -> Optional[str]:
-    """
-    Auto-detect column type based on header name and sample values.
-    Returns the detected type or None if uncertain.
-    """
-    scores = {}
+    # Column statistics of each upload source (content + table), see column_stats.py
+    c.execute("""CREATE TABLE IF NOT EXISTS column_stats (
+                source_key TEXT,
+                column_name TEXT,
+                content_key TEXT,
+                position INTEGER,
+                dtype TEXT,
+                inferred_type TEXT,
+                row_count INTEGER,
+                distinct_count INTEGER,
+                null_count INTEGER,
+                values_json TEXT,
+                PRIMARY KEY (source_key, column_name)
+                )""")
     
-    for col_type in COLUMN_KEYWORDS.keys():
-        header_score = score_column_header(header, col_type)
-        scores[col_type] = header_score
+    # Value counts of the columns with too many values to store inline
+    c.execute("""CREATE TABLE IF NOT EXISTS column_values (
+                source_key TEXT,
+                column_name TEXT,
+                value TEXT,
+                value_count INTEGER,
+                PRIMARY KEY (source_key, column_name, value)
+                ) WITHOUT ROWID""")
     
-    # Additional heuristics based on sample values
-    sample_text = " ".join(str(v).lower() for v in sample_values if v)
+    # Trigram index over the values of the searched columns where SQLite
+    # supports it, see value_search.py
+    create_value_search(c)
     
-    # Check for month-like values
-    month_count = sum(1 for month in MONTH_NAMES.keys() if month in sample_text)
-    if month_count > 0:
-        scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.3)
+    ensure_columns(c, "uploads", {
+        "content_hash": "TEXT",
+        "file_size": "INTEGER",
+        "parse_id": "TEXT",
+        # The table read from the file: Excel sheet name or XML record path
+        # (NULL: the first sheet / the root's children)
+        "source_table": "TEXT",
+        # Bumped when what the upload reads changes (table, row count) and
+        # when its mappings are saved; they feed the read endpoints' ETags
+        "version": "INTEGER DEFAULT 1",
+        "mappings_version": "INTEGER DEFAULT 1",
+        "updated_at": "TEXT"
+    })
+    ensure_columns(c, "records", {
+        "parse_id": "TEXT",
+        "crop_name": "TEXT",
+        "country": "TEXT",
+        "requires_review": "INTEGER",
+        "review_reason": "TEXT",
+        "is_harvest": "INTEGER"
+    })
+    ensure_columns(c, "blobs", {
+        "rows_estimated": "INTEGER"
+    })
+    ensure_columns(c, "parse_results", {
+        "records_version": "INTEGER"
+    })
+    # Jobs live in memory: parses interrupted by a restart are not running anymore
+    c.execute("""UPDATE uploads SET status = CASE WHEN parse_id IS NULL THEN 'uploaded' ELSE 'parsed' END
+                WHERE status IN ('queued', 'parsing')""")
     
-    # Check for numeric ranges (likely dates/months)
-    if re.search(r'\d+\s*-\s*\d+', sample_text):
-        scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.2)
-        scores['start_date'] = min(1.0, scores['start_date'] + 0.15)
-        scores['end_date'] = min(1.0, scores['end_date'] + 0.15)
+    # Indexes are built after the first load; databases from older versions need them now
+    if c.execute("SELECT 1 FROM records LIMIT 1").fetchone():
+        ensure_record_indexes(c)
     
-    # Find top match
-    if scores:
-        top_type = max(scores, key=scores.get)
-        top_score = scores[top_type]
-        
-        # Return only if confidence is high enough
-        if top_score > 0.3:
-            return top_type
+    # Records written before parse results were shared belong to their upload alone
+    c.execute("UPDATE records SET parse_id = upload_id WHERE parse_id IS NULL")
+    if c.rowcount:
+        c.execute("""INSERT OR IGNORE INTO parse_results (parse_id, ref_count, created_at)
+                    SELECT DISTINCT upload_id, 1, ? FROM records WHERE parse_id = upload_id""",
+                 (datetime.now().isoformat(),))
+        c.execute("""UPDATE uploads SET parse_id = upload_id
+                    WHERE parse_id IS NULL AND upload_id IN (SELECT parse_id FROM parse_results)""")
     
-    return None
+    conn.commit()
+    conn.close()
 
-def get_sample_values(df: pd.DataFrame, column: str, n: int = 5) -> List[str]:
-    """Get first n non-null values from a column"""
-    values = df[column].dropna().unique()[:n]
-    return [str(v) for v in values]
+def ensure_columns(c: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+    """Add columns missing from an existing table (databases created by older versions)"""
+    c.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in c.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
 
-def auto_detect_columns(df: pd.DataFrame) -> Dict[str, Optional[str]]:
-    """
-    Auto-detect column types for all columns in dataframe.
-    Returns dict: {column_name: detected_type}
-    """
-    detected = {}
-    
-    for column in df.columns:
-        sample_values = get_sample_values(df, column)
-        col_type = detect_column_type(column, sample_values)
-        detected[column] = col_type
-    
-    return detected
+init_db()
 
 # ==================== FILE HANDLING ====================
 
-def read_file_to_dataframe(file_path: str) -> Tuple[pd.DataFrame, str]:
+def get_file_type(file_path: str) -> str:
+    """Map a file extension to the file_type stored for uploads"""
+    file_lower = file_path.lower()
+    if file_lower.endswith('.csv'):
+        return 'csv'
+    elif file_lower.endswith(('.xlsx', '.xls')):
+        return 'excel'
+    elif file_lower.endswith('.xml'):
+        return 'xml'
+    raise ValueError(f"Unsupported file type: {file_lower}")
+
+def read_source_file(file_path: str, source_table: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
     """
-    Read CSV, XLSX, or XML file into pandas DataFrame.
+    Parse the original CSV, XLSX, or XML file into pandas DataFrame.
+    Excel and XML files are streamed; source_table selects the sheet or
+    the XML record path (the first sheet / the root's children by default).
     Returns (dataframe, file_type)
     """
     file_lower = file_path.lower()
@@ -209,40 +333,462 @@ def read_file_to_dataframe(file_path: str) -> Tuple[pd.DataFrame, str]:
             df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
             return df, 'csv'
         elif file_lower.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_path, dtype=str, keep_default_na=False)
+            df = read_excel_sheet(file_path, source_table)
             return df, 'excel'
         elif file_lower.endswith('.xml'):
-            # Basic XML parsing
-            import xml.etree.ElementTree as ET
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            rows = []
-            for child in root:
-                row = {}
-                for element in child:
-                    row[element.tag] = element.text or ''
-                rows.append(row)
-            
-            if rows:
-                df = pd.DataFrame(rows)
-                return df, 'xml'
-            else:
-                raise ValueError("No data found in XML file")
+            df = read_xml_records(file_path, source_table)
+            return df, 'xml'
         else:
             raise ValueError(f"Unsupported file type: {file_lower}")
     except Exception as e:
         raise ValueError(f"Failed to read file: {str(e)}")
 
+def read_source_sample(file_path: str, nrows: int, source_table: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Read the header and first nrows rows of the original file, parsed like
+    read_source_file. Reading stops after nrows.
+    """
+    file_lower = file_path.lower()
+    if file_lower.endswith('.csv'):
+        return pd.read_csv(file_path, dtype=str, keep_default_na=False, nrows=nrows), 'csv'
+    elif file_lower.endswith(('.xlsx', '.xls')):
+        return read_excel_sheet(file_path, source_table, nrows), 'excel'
+    elif file_lower.endswith('.xml'):
+        return read_xml_records(file_path, source_table, nrows), 'xml'
+    raise ValueError(f"Unsupported file type: {file_lower}")
+
+def count_source_rows(file_path: str, file_type: str, source_table: Optional[str] = None) -> int:
+    """Exact data row count of the original file in one streaming pass (rows as read_source_file reads them)"""
+    if file_type == 'csv':
+        with open(file_path, newline='', encoding='utf-8', errors='replace') as f:
+            return max(0, sum(1 for row in csv.reader(f) if row) - 1)
+    elif file_type == 'excel':
+        return count_excel_rows(file_path, source_table)
+    elif file_type == 'xml':
+        return count_xml_records(file_path, source_table)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+def estimate_row_count(file_path: str, file_type: str, file_size: int, sample_rows: int) -> int:
+    """
+    Row count extrapolated from the sample: a CSV's size divided by the
+    average size of its sampled rows. Other types report the sample size.
+    """
+    if file_type != 'csv' or not sample_rows:
+        return sample_rows
+    with open(file_path, 'rb') as f:
+        header_end = len(f.readline())
+        for _ in range(sample_rows):
+            if not f.readline():
+                return sample_rows
+        sample_bytes = f.tell() - header_end
+    return max(sample_rows, int((file_size - header_end) / max(sample_bytes / sample_rows, 1)))
+
+def read_file_to_dataframe(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    source_table: Optional[str] = None
+) -> Tuple[pd.DataFrame, str]:
+    """
+    Read an uploaded file (the given table of it) into pandas DataFrame.
+    Uses the memory-mapped columnar copy when one exists (only the requested
+    columns are loaded), otherwise parses the original file.
+    Returns (dataframe, file_type)
+    """
+    if has_columnar_copy(file_path, source_table):
+        try:
+            return read_columnar_copy(file_path, columns, source_table), get_file_type(file_path)
+        except Exception:
+            pass  # Damaged copy - fall back to the original file
+    
+    df, file_type = read_source_file(file_path, source_table)
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df, file_type
+
+def load_source_and_convert(file_path: str, source_table: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """Loader for the DataFrame cache that also backfills a missing columnar copy"""
+    if has_columnar_copy(file_path, source_table):
+        return read_file_to_dataframe(file_path, source_table=source_table)
+    df, file_type = read_source_file(file_path, source_table)
+    write_columnar_copy(df, file_path, source_table)
+    return df, file_type
+
+async def save_upload_stream(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    Stream an upload to disk in UPLOAD_CHUNK_SIZE chunks.
+    Hashes and counts bytes as they are written and aborts with 413 as soon
+    as MAX_UPLOAD_BYTES is exceeded, so only one chunk is held in memory.
+    Returns (file_size, sha256 hex digest)
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+    
+    partial_path = file_path + ".part"
+    digest = hashlib.sha256()
+    file_size = 0
+    try:
+        with open(partial_path, 'wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(partial_path, file_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    
+    return file_size, digest.hexdigest()
+
+df_cache = DataFrameCache(max_bytes=DF_CACHE_MAX_BYTES)
+
+def load_upload_dataframe(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    source_table: Optional[str] = None
+) -> Tuple[pd.DataFrame, str]:
+    """
+    Read an upload's file (its selected table) through the shared DataFrame cache.
+    With columns set, a cache miss only loads those columns from the
+    columnar copy and the partial frame is not cached.
+    The returned DataFrame is shared - do not modify it in place.
+    """
+    if columns is not None:
+        cached = df_cache.peek(file_path, source_table)
+        if cached is not None:
+            df, file_type = cached
+            return df[[col for col in columns if col in df.columns]], file_type
+        return read_file_to_dataframe(file_path, columns, source_table)
+    return df_cache.get_or_load(file_path, functools.partial(load_source_and_convert, source_table=source_table),
+                                source_table)
+
+def remove_stored_file(file_path: str):
+    """Delete a stored upload file, its columnar copy and its cache entry"""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    remove_columnar_copy(file_path)
+    df_cache.invalidate(file_path)
+
+# ==================== CONTENT-ADDRESSED STORAGE ====================
+
+def acquire_blob(c: sqlite3.Cursor, content_hash: str) -> Optional[Dict]:
+    """
+    Take a reference on the stored file for content_hash.
+    Returns the stored file's metadata, or None if the content is new.
+    """
+    c.execute("UPDATE blobs SET ref_count = ref_count + 1 WHERE content_hash = ?", (content_hash,))
+    if c.rowcount == 0:
+        return None
+    
+    c.execute("""SELECT path, file_type, total_rows, rows_estimated, columns_json, preview_json, detected_json
+                FROM blobs WHERE content_hash = ?""", (content_hash,))
+    path, file_type, total_rows, rows_estimated, columns_json, preview_json, detected_json = c.fetchone()
+    return {
+        "path": path,
+        "file_type": file_type,
+        "total_rows": total_rows,
+        "total_rows_estimated": bool(rows_estimated),
+        "columns": json.loads(columns_json),
+        "preview_rows": json.loads(preview_json),
+        "detected_columns": json.loads(detected_json)
+    }
+
+def release_blob(c: sqlite3.Cursor, content_hash: str) -> Optional[str]:
+    """
+    Drop a reference on a stored file.
+    Returns its path when this was the last reference; the caller removes
+    the file once the transaction is committed.
+    """
+    c.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE content_hash = ?", (content_hash,))
+    c.execute("SELECT path, ref_count FROM blobs WHERE content_hash = ?", (content_hash,))
+    row = c.fetchone()
+    if row and row[1] <= 0:
+        c.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+        release_column_stats(c, content_hash)
+        return row[0]
+    return None
+
+def source_key(content_key: str, source_table: Optional[str]) -> str:
+    """Identity of the data an upload reads: its content, plus the table when not the default one"""
+    return content_key if source_table is None else f"{content_key}#table:{source_table}"
+
+def compute_parse_id(content_key: str, mappings: Dict[str, str]) -> str:
+    """Parse results are identified by the file content and the mapping set"""
+    payload = content_key + ":" + json.dumps(mappings, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_parse_result(c: sqlite3.Cursor, parse_id: str) -> Optional[Dict]:
+    """
+    Stored stats and sample records for parse results, or None if not parsed yet.
+    stats is None for results whose records were written by an older version
+    (no stats, or a different RECORDS_VERSION layout); those are re-parsed.
+    """
+    c.execute("SELECT stats_json, sample_json, records_version FROM parse_results WHERE parse_id = ?",
+             (parse_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    current = row[0] and row[2] == RECORDS_VERSION
+    return {
+        "stats": json.loads(row[0]) if current else None,
+        "sample_records": json.loads(row[1]) if row[1] else []
+    }
+
+def acquire_parse(c: sqlite3.Cursor, parse_id: str) -> Optional[Dict]:
+    """Take a reference on existing parse results, returning them (None if not parsed yet)"""
+    c.execute("UPDATE parse_results SET ref_count = ref_count + 1 WHERE parse_id = ?", (parse_id,))
+    if c.rowcount == 0:
+        return None
+    return get_parse_result(c, parse_id)
+
+def release_parse(c: sqlite3.Cursor, parse_id: Optional[str]):
+    """Drop a reference on parse results, deleting the records with the last one"""
+    if not parse_id:
+        return
+    c.execute("UPDATE parse_results SET ref_count = ref_count - 1 WHERE parse_id = ?", (parse_id,))
+    c.execute("SELECT ref_count FROM parse_results WHERE parse_id = ?", (parse_id,))
+    row = c.fetchone()
+    if row is None or row[0] <= 0:
+        c.execute("DELETE FROM records WHERE parse_id = ?", (parse_id,))
+        c.execute("DELETE FROM parse_masks WHERE parse_id = ?", (parse_id,))
+        c.execute("DELETE FROM value_postings WHERE parse_id = ?", (parse_id,))
+        c.execute("DELETE FROM parse_columns WHERE parse_id = ?", (parse_id,))
+        c.execute("DELETE FROM parse_results WHERE parse_id = ?", (parse_id,))
+
+def release_upload(c: sqlite3.Cursor, upload_id: str) -> Optional[str]:
+    """
+    Delete an upload row and release its shared file and parse results.
+    Returns the stored file path if nothing references it anymore.
+    """
+    c.execute("SELECT path, content_hash, parse_id FROM uploads WHERE upload_id = ?", (upload_id,))
+    row = c.fetchone()
+    if not row:
+        return None
+    
+    path, content_hash, parse_id = row
+    release_parse(c, parse_id)
+    c.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+    
+    if content_hash:
+        return release_blob(c, content_hash)
+    release_column_stats(c, upload_id)
+    return path  # Uploads stored before deduplication own their file
+
+# ==================== HEAVY WORK ====================
+
+heavy_work_pool = BoundedExecutor(HEAVY_WORKERS, HEAVY_MAX_QUEUED, HEAVY_MEMORY_BUDGET)
+
+def admit_heavy_work(file_size: Optional[int], file_type: Optional[str]):
+    """Reserve heavy-work capacity for a file, raising 429 when the server is saturated"""
+    return heavy_work_pool.admit(estimate_job_memory(file_size, file_type))
+
+def stored_file_size(path: Optional[str], file_size: Optional[int]) -> Optional[int]:
+    # Uploads stored before file sizes were recorded
+    if file_size is None and path and os.path.exists(path):
+        return os.path.getsize(path)
+    return file_size
+
+def heavy_work(endpoint: Callable) -> Callable:
+    """
+    Run a sync upload endpoint on the heavy-work pool instead of the shared
+    threadpool, admitted by the size and type of the upload's file.
+    """
+    @functools.wraps(endpoint)
+    async def run_heavy(**kwargs):
+        file_size, file_type = None, None
+        async with async_db.connection() as conn:
+            async with conn.execute("SELECT path, file_size, file_type FROM uploads WHERE upload_id = ?",
+                                    (kwargs.get("upload_id"),)) as c:
+                row = await c.fetchone()
+        if row:
+            file_size, file_type = stored_file_size(row[0], row[1]), row[2]
+        ticket = admit_heavy_work(file_size, file_type)
+        return await heavy_work_pool.run(ticket, functools.partial(endpoint, **kwargs))
+    return run_heavy
+
+# ==================== HTTP CACHING ====================
+
+def upload_validators(include_mappings: bool = False) -> Callable:
+    """
+    Conditional GET for a read endpoint of one upload. The ETag comes from
+    the request URL and the upload's version (plus its mappings version
+    when the response shows mappings), so it is known before the endpoint
+    runs: a request whose validators still match gets a 304 without
+    regenerating the body or being admitted as heavy work.
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        @functools.wraps(endpoint)
+        async def validated(request: Request, **kwargs):
+            async with async_db.connection() as conn:
+                async with conn.execute("""SELECT version, mappings_version, COALESCE(updated_at, created_at)
+                                          FROM uploads WHERE upload_id = ?""", (kwargs.get("upload_id"),)) as c:
+                    row = await c.fetchone()
+            
+            if row:
+                version, mappings_version, updated_at = row
+                parts = [request.url.path, request.url.query, version]
+                if include_mappings:
+                    parts.append(mappings_version)
+                etag = make_etag(*parts)
+                last_modified = datetime.fromisoformat(updated_at)
+                current = matching_etag(request.headers, etag, last_modified)
+                if current:
+                    return not_modified_response(current, last_modified)
+            
+            result = endpoint(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            if not row:
+                return result
+            response = result if isinstance(result, Response) else JSONResponse(jsonable_encoder(result))
+            return set_validators(response, etag, last_modified)
+        
+        # FastAPI reads the parameters from the signature: the endpoint's, plus the request
+        signature = inspect.signature(endpoint)
+        validated.__signature__ = signature.replace(parameters=[
+            inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)
+        ] + list(signature.parameters.values()))
+        return validated
+    return decorate
+
 # ==================== API ENDPOINTS ====================
 
+@app.on_event("shutdown")
+async def close_db_pools():
+    db.close()
+    await async_db.close()
+    heavy_work_pool.shutdown()
+
 @app.get("/api/health")
 def health():
     """Health check endpoint"""
     return {"status": "ok"}
 
+def store_upload(upload_id: str, filename: str, file_path: str, file_size: int, content_hash: str) -> Dict:
+    """
+    Register a file saved by upload_file: reuse a stored copy of the same
+    content, or read it, detect columns and store it.
+    """
+    # Known content: share the stored file and its detection results
+    with db.connection() as conn:
+        c = conn.cursor()
+        blob = acquire_blob(c, content_hash)
+        if blob:
+            c.execute("""INSERT INTO uploads 
+                        (upload_id, filename, path, status, columns_json, total_rows, created_at, file_type,
+                         content_hash, file_size)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                     (upload_id, filename, blob["path"], 'uploaded', json.dumps(blob["columns"]),
+                      blob["total_rows"], datetime.now().isoformat(), blob["file_type"], content_hash, file_size))
+            conn.commit()
+    
+    if blob:
+        os.remove(file_path)
+        return {
+            "success": True,
+            "upload_id": upload_id,
+            "filename": filename,
+            "file_type": blob["file_type"],
+            "total_rows": blob["total_rows"],
+            "total_rows_estimated": blob["total_rows_estimated"],
+            "columns": blob["columns"],
+            "preview_rows": blob["preview_rows"],
+            "detected_columns": blob["detected_columns"],
+            "sheets": excel_sheets(blob["path"], blob["file_type"]),
+            "deduplicated": True
+        }
+    
+    # Until the upload row is committed nothing refers to the saved file, so a
+    # failure (an empty or unreadable file) removes it
+    try:
+        # Read only the header and a sample: enough for the preview and detection.
+        # The full file is loaded (and converted to columnar) when first needed.
+        df, file_type = read_source_sample(file_path, UPLOAD_SAMPLE_ROWS)
+        
+        if df.empty:
+            raise HTTPException(status_code=400, detail="File is empty")
+        
+        # A short file was read whole; otherwise the row count is estimated until counted
+        rows_estimated = len(df) >= UPLOAD_SAMPLE_ROWS
+        total_rows = estimate_row_count(file_path, file_type, file_size, len(df)) if rows_estimated else len(df)
+        
+        # Get columns
+        columns = df.columns.tolist()
+        
+        # Get preview (first 10 rows)
+        preview_df = df.head(10)
+        preview_rows = preview_df.fillna("").to_dict('records')
+        
+        # Auto-detect columns
+        detected_columns = auto_detect_columns(df)
+        
+        # Store in database
+        with db.connection() as conn:
+            c = conn.cursor()
+            c.execute("""INSERT OR IGNORE INTO blobs
+                        (content_hash, path, file_type, file_size, total_rows, rows_estimated, columns_json,
+                         preview_json, detected_json, ref_count, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)""",
+                     (content_hash, file_path, file_type, file_size, total_rows, int(rows_estimated),
+                      json.dumps(columns), json.dumps(preview_rows), json.dumps(detected_columns),
+                      datetime.now().isoformat()))
+            stored_path = file_path
+            if c.rowcount == 0:
+                # A concurrent upload of the same content registered it first
+                stored_path = acquire_blob(c, content_hash)["path"]
+            elif not rows_estimated:
+                # The whole file was read: its column statistics come for free
+                store_column_stats(c, content_hash, content_hash, compute_column_stats(df))
+            c.execute("""INSERT INTO uploads 
+                        (upload_id, filename, path, status, columns_json, total_rows, created_at, file_type,
+                         content_hash, file_size)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                     (upload_id, filename, stored_path, 'uploaded', json.dumps(columns), 
+                      total_rows, datetime.now().isoformat(), file_type, content_hash, file_size))
+            conn.commit()
+    except BaseException:
+        remove_stored_file(file_path)
+        raise
+    
+    if stored_path != file_path:
+        remove_stored_file(file_path)
+    
+    return {
+        "success": True,
+        "upload_id": upload_id,
+        "filename": filename,
+        "file_type": file_type,
+        "total_rows": total_rows,
+        "total_rows_estimated": rows_estimated,
+        "columns": columns,
+        "preview_rows": preview_rows,
+        "detected_columns": detected_columns,
+        "sheets": excel_sheets(stored_path, file_type)
+    }
+
+def count_upload_rows(content_hash: str):
+    """Background task: replace a stored file's estimated row count with the exact one"""
+    with db.connection() as conn:
+        row = conn.execute("SELECT path, file_type FROM blobs WHERE content_hash = ? AND rows_estimated = 1",
+                          (content_hash,)).fetchone()
+    if not row:
+        return  # Already counted, or deleted meanwhile
+    
+    total_rows = count_source_rows(row[0], row[1])
+    with db.connection() as conn:
+        conn.execute("UPDATE blobs SET total_rows = ?, rows_estimated = 0 WHERE content_hash = ?",
+                    (total_rows, content_hash))
+        conn.execute("""UPDATE uploads SET total_rows = ?, version = version + 1, updated_at = ?
+                       WHERE content_hash = ? AND source_table IS NULL""",
+                    (total_rows, datetime.now().isoformat(), content_hash))
+        conn.commit()
+
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload a file and return preview with auto-detected columns.
     
@@ -252,13 +798,15 @@ async def upload_file(file: UploadFile = File(...)):
         "filename": "example.csv",
         "file_type": "csv",
         "total_rows": 1000,
+        "total_rows_estimated": false,   (true until the background row count finishes)
         "columns": ["col1", "col2", ...],
         "preview_rows": [{"col1": "val1", ...}, ...],
         "detected_columns": {
             "col1": "crop_name",
             "col2": "country",
             ...
-        }
+        },
+        "sheets": ["Sheet1", ...]   (Excel only, null otherwise; the first sheet is read)
     }
     """
     try:
@@ -266,51 +814,29 @@ async def upload_file(file: UploadFile = File(...)):
         if not file.filename:
             raise HTTPException(status_code=400, detail="No filename provided")
         
-        # Save uploaded file
+        try:
+            get_file_type(file.filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Stream uploaded file to disk
         upload_id = str(uuid.uuid4())
         file_path = os.path.join(DATA_DIR, f"{upload_id}_{file.filename}")
+        file_size, content_hash = await save_upload_stream(file, file_path)
         
-        contents = await file.read()
-        with open(file_path, 'wb') as f:
-            f.write(contents)
-        
-        # Read file into dataframe
-        df, file_type = read_file_to_dataframe(file_path)
-        
-        if df.empty:
-            raise HTTPException(status_code=400, detail="File is empty")
-        
-        # Get columns
-        columns = df.columns.tolist()
-        
-        # Get preview (first 10 rows)
-        preview_df = df.head(10)
-        preview_rows = preview_df.fillna("").to_dict('records')
-        
-        # Auto-detect columns
-        detected_columns = auto_detect_columns(df)
-        
-        # Store in database
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("""INSERT INTO uploads 
-                    (upload_id, filename, path, status, columns_json, total_rows, created_at, file_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                 (upload_id, file.filename, file_path, 'uploaded', json.dumps(columns), 
-                  len(df), datetime.now().isoformat(), file_type))
-        conn.commit()
-        conn.close()
-        
-        return {
-            "success": True,
-            "upload_id": upload_id,
-            "filename": file.filename,
-            "file_type": file_type,
-            "total_rows": len(df),
-            "columns": columns,
-            "preview_rows": preview_rows,
-            "detected_columns": detected_columns
-        }
+        # Parsing and detection run on the heavy-work pool
+        try:
+            ticket = admit_heavy_work(file_size, get_file_type(file.filename))
+        except HTTPException:
+            os.remove(file_path)
+            raise
+        result = await heavy_work_pool.run(ticket, store_upload, upload_id, file.filename, file_path,
+                                           file_size, content_hash)
+        
+        # Count rows after responding; a streaming pass needs little memory, so it is not admitted
+        if result["total_rows_estimated"] and not result.get("deduplicated"):
+            background_tasks.add_task(count_upload_rows, content_hash)
+        return result
     
     except HTTPException as e:
         raise e
@@ -321,15 +847,14 @@ async def upload_file(file: UploadFile = File(...)):
         }, 500
 
 @app.get("/api/upload/{upload_id}")
-def get_upload_info(upload_id: str):
+async def get_upload_info(upload_id: str):
     """Get information about an upload"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("""SELECT filename, status, columns_json, total_rows, file_type, created_at 
-                    FROM uploads WHERE upload_id = ?""", (upload_id,))
-        row = c.fetchone()
-        conn.close()
+        async with async_db.connection() as conn:
+            async with conn.execute("""SELECT filename, status, columns_json, total_rows, file_type, created_at,
+                                      source_table
+                                      FROM uploads WHERE upload_id = ?""", (upload_id,)) as c:
+                row = await c.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="Upload not found")
@@ -341,7 +866,8 @@ def get_upload_info(upload_id: str):
             "columns": json.loads(row[2]),
             "total_rows": row[3],
             "file_type": row[4],
-            "created_at": row[5]
+            "created_at": row[5],
+            "source_table": row[6]
         }
     except HTTPException as e:
         raise e
@@ -349,14 +875,15 @@ def get_upload_info(upload_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/upload/{upload_id}/preview")
+@upload_validators()
+@heavy_work
 def get_preview(upload_id: str, rows: int = 20):
     """Get extended preview of uploaded file"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT path, columns_json FROM uploads WHERE upload_id = ?", (upload_id,))
-        row = c.fetchone()
-        conn.close()
+        with db.connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT path, columns_json, source_table FROM uploads WHERE upload_id = ?", (upload_id,))
+            row = c.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="Upload not found")
@@ -365,7 +892,7 @@ def get_preview(upload_id: str, rows: int = 20):
         columns = json.loads(row[1])
         
         # Read file and get preview
-        df, _ = read_file_to_dataframe(file_path)
+        df, _ = load_upload_dataframe(file_path, source_table=row[2])
         preview_df = df.head(min(rows, len(df)))
         preview_rows = preview_df.fillna("").to_dict('records')
         
@@ -381,14 +908,14 @@ def get_preview(upload_id: str, rows: int = 20):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/upload/{upload_id}/detect-columns")
+@heavy_work
 def redetect_columns(upload_id: str):
     """Re-run column detection"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT path, columns_json FROM uploads WHERE upload_id = ?", (upload_id,))
-        row = c.fetchone()
-        conn.close()
+        with db.connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT path, columns_json, source_table FROM uploads WHERE upload_id = ?", (upload_id,))
+            row = c.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="Upload not found")
@@ -396,7 +923,7 @@ def redetect_columns(upload_id: str):
         file_path = row[0]
         
         # Read and detect
-        df, _ = read_file_to_dataframe(file_path)
+        df, _ = load_upload_dataframe(file_path, source_table=row[2])
         detected_columns = auto_detect_columns(df)
         
         return {
@@ -408,6 +935,8 @@ def redetect_columns(upload_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/upload/{upload_id}/column-mapping")
+@upload_validators(include_mappings=True)
+@heavy_work
 def get_column_mapping_ui(upload_id: str, rows: int = 20):
     """
     Get data for column mapping UI with auto-detected types and confidence scores.
@@ -428,50 +957,31 @@ def get_column_mapping_ui(upload_id: str, rows: int = 20):
     }
     """
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("SELECT path, columns_json, total_rows FROM uploads WHERE upload_id = ?", (upload_id,))
-        row = c.fetchone()
-        conn.close()
+        with db.connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT path, columns_json, total_rows, source_table FROM uploads WHERE upload_id = ?",
+                     (upload_id,))
+            row = c.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="Upload not found")
         
-        file_path, columns_json, total_rows = row
+        file_path, columns_json, total_rows, source_table = row
         columns_list = json.loads(columns_json)
         
         # Read file
-        df, _ = read_file_to_dataframe(file_path)
+        df, _ = load_upload_dataframe(file_path, source_table=source_table)
         
         # Auto-detect with confidence scores
         column_info = []
         for col in columns_list:
             sample_values = get_sample_values(df, col, n=3)
-            
-            # Calculate confidence for each type
-            scores = {}
-            for col_type in COLUMN_KEYWORDS.keys():
-                header_score = score_column_header(col, col_type)
-                scores[col_type] = header_score
-            
-            # Add value-based heuristics
-            sample_text = " ".join(str(v).lower() for v in sample_values if v)
-            month_count = sum(1 for month in MONTH_NAMES.keys() if month in sample_text)
-            if month_count > 0:
-                scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.3)
-            
-            if re.search(r'\d+\s*-\s*\d+', sample_text):
-                scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.2)
-                scores['start_date'] = min(1.0, scores['start_date'] + 0.15)
-                scores['end_date'] = min(1.0, scores['end_date'] + 0.15)
-            
-            detected_type = max(scores, key=scores.get) if scores else None
-            confidence = round(max(scores.values()) if scores else 0.0, 2)
+            detected_type, confidence = detect_column(col, sample_values)
             
             column_info.append({
                 "name": col,
-                "detected_type": detected_type if confidence > 0.3 else None,
-                "confidence": confidence,
+                "detected_type": detected_type,
+                "confidence": round(confidence, 2),
                 "sample_values": sample_values
             })
         
@@ -491,7 +1001,7 @@ def get_column_mapping_ui(upload_id: str, rows: int = 20):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/upload/{upload_id}/save-mappings")
-def save_column_mappings(upload_id: str, mappings: Dict[str, str]):
+async def save_column_mappings(upload_id: str, mappings: Dict[str, str]):
     """
     Save user-configured column mappings.
     
@@ -517,20 +1027,17 @@ def save_column_mappings(upload_id: str, mappings: Dict[str, str]):
                 )
         
         # Store mappings in database
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Check if upload exists
-        c.execute("SELECT upload_id FROM uploads WHERE upload_id = ?", (upload_id,))
-        if not c.fetchone():
-            conn.close()
-            raise HTTPException(status_code=404, detail="Upload not found")
-        
-        # Update uploads table with column mappings
-        c.execute("""UPDATE uploads SET columns_json = ? WHERE upload_id = ?""",
-                 (json.dumps(mappings), upload_id))
-        conn.commit()
-        conn.close()
+        async with async_db.connection() as conn:
+            # Check if upload exists
+            async with conn.execute("SELECT upload_id FROM uploads WHERE upload_id = ?", (upload_id,)) as c:
+                if not await c.fetchone():
+                    raise HTTPException(status_code=404, detail="Upload not found")
+            
+            # Update uploads table with column mappings
+            await conn.execute("""UPDATE uploads SET columns_json = ?, mappings_version = mappings_version + 1,
+                                  updated_at = ? WHERE upload_id = ?""",
+                              (json.dumps(mappings), datetime.now().isoformat(), upload_id))
+            await conn.commit()
         
         return {
             "success": True,
@@ -543,420 +1050,973 @@ def save_column_mappings(upload_id: str, mappings: Dict[str, str]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ==================== PARSING & NORMALIZATION ====================
+# ==================== SOURCE TABLES ====================
+#
+# An upload reads one table of its file: an Excel sheet or the records at
+# an XML record path. The default (first sheet, root's children) is stored
+# as NULL so it shares parse results with uploads that never switched.
 
-def extract_month_from_date(date_str: str) -> Optional[int]:
-    """
-    Extract month number from a date string.
-    Handles: MM/DD/YYYY, DD-MM-YY, MM-DD-YYYY, etc.
-    Returns month number (1-12) or None if can't parse
-    """
-    if not date_str or pd.isna(date_str):
-        return None
-    
-    date_str = str(date_str).strip()
-    
-    # Try parsing with common date formats
-    for fmt in ['%m/%d/%Y', '%m/%d/%y', '%d-%m-%y', '%d-%m-%Y', '%m-%d-%Y', '%m-%d-%y', 
-                '%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
-        try:
-            parsed_date = datetime.strptime(date_str, fmt)
-            return parsed_date.month
-        except:
-            continue
-    
-    # If date parsing fails, try to extract just the month
-    # Look for MM in MM/DD or MM-DD patterns
-    month_match = re.search(r'^(\d{1,2})(?:[/-]|$)', date_str)
-    if month_match:
-        try:
-            month = int(month_match.group(1))
-            if 1 <= month <= 12:
-                return month
-        except:
-            pass
-    
-    return None
+def excel_sheets(file_path: str, file_type: str) -> Optional[List[str]]:
+    """Sheet names of an Excel upload, None for other file types"""
+    return list_sheets(file_path) if file_type == 'excel' else None
 
-def parse_month_string(value: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[int, bool, str]:
+def switch_source_table(upload_id: str, parse_id: Optional[str], source_table: Optional[str],
+                        columns: List[str], total_rows: int):
     """
-    Parse month/season information and return (month_mask, requires_review, parsed_months).
-    
-    Priority:
-    1. If start_date and end_date are provided, use them for precise month extraction
-    2. Otherwise parse the period/value string (Jan-Mar, 3-5, All year, etc.)
-    
-    month_mask: 12-bit integer where bit i=1 means month i is active
+    Point an upload at another table of its file. The saved mappings and
+    parse results belong to the previous table's columns and are cleared.
     """
-    if not value or pd.isna(value):
-        return 0, True, "unknown"
-    
-    value = str(value).strip().lower()
-    
-    # PRIORITY 1: Use actual start_date and end_date if available
-    if start_date and end_date:
-        start_month = extract_month_from_date(start_date)
-        end_month = extract_month_from_date(end_date)
-        
-        if start_month and end_month:
-            month_mask = 0
-            parsed_months = []
-            
-            # Handle wraparound (e.g., Oct-Feb crossing year boundary)
-            if start_month <= end_month:
-                for m in range(start_month, end_month + 1):
-                    month_mask |= (1 << (m - 1))
-                    parsed_months.append(m)
-            else:
-                # Wraparound (e.g., Oct=10 to Feb=2)
-                for m in range(start_month, 13):
-                    month_mask |= (1 << (m - 1))
-                    parsed_months.append(m)
-                for m in range(1, end_month + 1):
-                    month_mask |= (1 << (m - 1))
-                    parsed_months.append(m)
-            
-            # Generate month names string
-            month_names_list = []
-            for m in sorted(set(parsed_months)):
-                for name, num in MONTH_NAMES.items():
-                    if num == m and len(name) >= 3:
-                        month_names_list.append(name.capitalize())
-                        break
-            parsed_months_str = ", ".join(month_names_list)
-            
-            return month_mask, False, parsed_months_str
-    
-    # PRIORITY 2: Parse the period string
-    # Check for "all year" / perennial indicators (but NOT just "12")
-    if any(x in value for x in ['all year', 'allyear', 'year round', 'year-round', 'perennial', 'permanent', 'annual crop']):
-        return 4095, False, "all year"  # 111111111111 in binary
-    
-    month_mask = 0
-    requires_review = False
-    parsed_months = []
-    
-    # Try range patterns with dates (e.g., "Jan 01 to Feb 28", "Mar 15 - Apr 15")
-    # This pattern handles month names even when followed by dates
-    date_range_patterns = [
-        r'([a-z]{3,})\s+\d+\s*(?:to|-|through)\s*([a-z]{3,})\s+\d+',  # "Jan 01 to Feb 28"
-        r'([a-z]{3,})\s*(?:to|-|through)\s*([a-z]{3,})',  # "Jan to Feb"
-        r'(\d+)\s*(?:to|-|through)\s*(\d+)',  # "3 to 5"
-    ]
-    
-    for pattern in date_range_patterns:
-        match = re.search(pattern, value, re.IGNORECASE)
-        if match:
-            start_str, end_str = match.groups()
-            
-            # Try to convert to month numbers
-            start_month = None
-            end_month = None
-            
-            # Check if they're month names
-            start_month = MONTH_NAMES.get(start_str.lower()[:3], None)
-            end_month = MONTH_NAMES.get(end_str.lower()[:3], None)
-            
-            # If not month names, try numeric
-            if not start_month:
-                try:
-                    start_month = int(start_str)
-                    if start_month > 12:
-                        start_month = None
-                except:
-                    pass
-            
-            if not end_month:
-                try:
-                    end_month = int(end_str)
-                    if end_month > 12:
-                        end_month = None
-                except:
-                    pass
-            
-            if start_month and end_month:
-                # Handle wraparound (e.g., Oct-Feb)
-                if start_month <= end_month:
-                    for m in range(start_month, end_month + 1):
-                        month_mask |= (1 << (m - 1))
-                        if m not in parsed_months:
-                            parsed_months.append(m)
-                else:
-                    # Wraparound
-                    for m in range(start_month, 13):
-                        month_mask |= (1 << (m - 1))
-                        if m not in parsed_months:
-                            parsed_months.append(m)
-                    for m in range(1, end_month + 1):
-                        month_mask |= (1 << (m - 1))
-                        if m not in parsed_months:
-                            parsed_months.append(m)
-                break
-    
-    # Try individual month patterns (e.g., "Jan", "May", "Aug")
-    if month_mask == 0:
-        individual_months = re.findall(r'\b([a-z]{3,})\b', value)
-        for month_str in individual_months:
-            month_num = MONTH_NAMES.get(month_str.lower()[:3], None)
-            if month_num:
-                month_mask |= (1 << (month_num - 1))
-                if month_num not in parsed_months:
-                    parsed_months.append(month_num)
-    
-    # Generate month names string
-    if parsed_months:
-        month_names_list = []
-        for m in sorted(set(parsed_months)):
-            for name, num in MONTH_NAMES.items():
-                if num == m and len(name) >= 3:
-                    month_names_list.append(name.capitalize())
-                    break
-        parsed_months_str = ", ".join(month_names_list)
-    else:
-        parsed_months_str = "unparseable"
-        requires_review = True
-    
-    return month_mask, requires_review, parsed_months_str
+    with db.connection() as conn:
+        c = conn.cursor()
+        release_parse(c, parse_id)
+        c.execute("""UPDATE uploads SET source_table = ?, columns_json = ?, total_rows = ?,
+                    parse_id = NULL, status = 'uploaded', version = version + 1, updated_at = ?
+                    WHERE upload_id = ?""",
+                 (source_table, json.dumps(columns), total_rows, datetime.now().isoformat(), upload_id))
+        conn.commit()
 
-@app.post("/api/upload/{upload_id}/parse")
-def parse_and_normalize_data(upload_id: str):
-    """
-    Parse entire file with configured column mappings.
-    Extract month information and generate month_mask.
-    Flag rows requiring manual review.
-    """
+@app.get("/api/upload/{upload_id}/sheets")
+def get_upload_sheets(upload_id: str):
+    """List an Excel upload's sheets and the one its data is read from"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
+        with db.connection() as conn:
+            row = conn.execute("SELECT path, file_type, source_table FROM uploads WHERE upload_id = ?",
+                              (upload_id,)).fetchone()
         
-        # Get upload and mappings
-        c.execute(
-            "SELECT path, columns_json, total_rows FROM uploads WHERE upload_id = ?",
-            (upload_id,)
-        )
-        row = c.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if row[1] != 'excel':
+            raise HTTPException(status_code=400, detail="Only Excel uploads have sheets")
+        
+        sheets = list_sheets(row[0])
+        return {
+            "upload_id": upload_id,
+            "sheets": sheets,
+            "sheet_name": row[2] or sheets[0]
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/upload/{upload_id}/sheet")
+@heavy_work
+def select_upload_sheet(upload_id: str, request: SheetSelectionRequest):
+    """
+    Read an Excel upload's data from another sheet.
+    The sheet is streamed once for its preview, detected columns and exact
+    row count. Switching sheets clears the saved mappings and parse results.
+    
+    Returns the same fields as the upload response, for the selected sheet.
+    """
+    try:
+        with db.connection() as conn:
+            row = conn.execute("""SELECT path, file_type, source_table, status, parse_id
+                                 FROM uploads WHERE upload_id = ?""", (upload_id,)).fetchone()
         
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Upload not found")
         
-        file_path, mappings_json, total_rows = row
-        mappings = json.loads(mappings_json)
+        file_path, file_type, current_sheet, status, parse_id = row
+        if file_type != 'excel':
+            raise HTTPException(status_code=400, detail="Only Excel uploads have sheets")
         
-        # Read file
-        df, _ = read_file_to_dataframe(file_path)
-        
-        # Parse records
-        parsed_records = []
-        stats = {
-            'total_parsed': 0,
-            'successful': 0,
-            'manual_review': 0,
-            'errors': 0
-        }
+        sheets = list_sheets(file_path)
+        if request.sheet_name not in sheets:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sheet '{request.sheet_name}' not found. Available sheets: {', '.join(sheets)}"
+            )
+        if status in ('queued', 'parsing'):
+            raise HTTPException(status_code=409, detail="Upload is being parsed")
         
-        for idx, raw_row in df.iterrows():
-            try:
-                # Build normalized record
-                normalized = {}
-                requires_review = False
-                review_reason = None
-                
-                # Find all relevant columns
-                start_date_col = None
-                end_date_col = None
-                harvest_calendar_col = None
-                season_col = None
-                period_col = 'period' if 'period' in df.columns else None  # Always try period as fallback
-                
-                for col_name, col_type in mappings.items():
-                    if col_type == 'start_date':
-                        start_date_col = col_name
-                    elif col_type == 'end_date':
-                        end_date_col = col_name
-                    elif col_type == 'harvest_calendar':
-                        harvest_calendar_col = col_name
-                    elif col_type == 'season':
-                        season_col = col_name
-                
-                for col_name, col_type in mappings.items():
-                    if col_type == 'ignore':
-                        continue
-                    
-                    value = raw_row.get(col_name)
-                    
-                    # Handle month/period parsing
-                    if col_type == 'harvest_calendar' or col_type == 'season':
-                        # Try to use start_date and end_date for more accurate parsing
-                        start_date = None
-                        end_date = None
-                        
-                        if start_date_col:
-                            start_date = raw_row.get(start_date_col)
-                        if end_date_col:
-                            end_date = raw_row.get(end_date_col)
-                        
-                        month_mask, needs_review, parsed_months = parse_month_string(value, start_date, end_date)
-                        normalized['month_mask'] = month_mask
-                        normalized['parsed_months'] = parsed_months
-                        if needs_review:
-                            requires_review = True
-                            review_reason = f"Could not parse: {value}"
-                    
-                    elif col_type not in ['start_date', 'end_date']:  # Skip storing raw date columns
-                        normalized[col_type] = str(value) if pd.notna(value) else None
-                
-                # If month_mask is 0 (parse failed), try period column as fallback
-                if (normalized.get('month_mask') is None or normalized.get('month_mask') == 0) and period_col:
-                    period_value = raw_row.get(period_col)
-                    start_date = raw_row.get(start_date_col) if start_date_col else None
-                    end_date = raw_row.get(end_date_col) if end_date_col else None
-                    
-                    month_mask, needs_review, parsed_months = parse_month_string(period_value, start_date, end_date)
-                    
-                    # Only update if we successfully parsed something (month_mask > 0)
-                    if month_mask > 0:
-                        normalized['month_mask'] = month_mask
-                        normalized['parsed_months'] = parsed_months
-                        requires_review = False  # Clear the review flag if fallback succeeded
-                        review_reason = None
-                    elif month_mask == 0 and needs_review:
-                        # Fallback also failed to parse
-                        normalized['month_mask'] = month_mask
-                        normalized['parsed_months'] = parsed_months
-                        requires_review = True
-                        review_reason = f"Could not parse period: {period_value}"
-                
-                # Store record
-                record_data = {
-                    'row_number': idx + 1,
-                    'requires_review': requires_review,
-                    'review_reason': review_reason,
-                    **normalized
-                }
-                parsed_records.append(record_data)
-                
-                # Store in database
-                c.execute("""
-                    INSERT INTO records (upload_id, row_number, raw_json, month_mask)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    upload_id,
-                    idx + 1,
-                    json.dumps(dict(raw_row)),
-                    normalized.get('month_mask', 0)
-                ))
-                
-                stats['total_parsed'] += 1
-                if requires_review:
-                    stats['manual_review'] += 1
-                else:
-                    stats['successful'] += 1
-                    
-            except Exception as e:
-                stats['errors'] += 1
-                continue
+        df, total_rows = sample_excel_sheet(file_path, request.sheet_name, UPLOAD_SAMPLE_ROWS)
+        if df.empty:
+            raise HTTPException(status_code=400, detail=f"Sheet '{request.sheet_name}' is empty")
+        columns = df.columns.tolist()
         
-        conn.commit()
-        conn.close()
+        sheet_name = None if request.sheet_name == sheets[0] else request.sheet_name
+        if sheet_name != current_sheet:
+            switch_source_table(upload_id, parse_id, sheet_name, columns, total_rows)
         
         return {
             "success": True,
             "upload_id": upload_id,
-            "stats": stats,
-            "sample_records": parsed_records[:5],
-            "message": f"Parsed {stats['total_parsed']} records"
+            "file_type": file_type,
+            "sheet_name": request.sheet_name,
+            "sheets": sheets,
+            "total_rows": total_rows,
+            "total_rows_estimated": False,
+            "columns": columns,
+            "preview_rows": df.head(10).to_dict('records'),
+            "detected_columns": auto_detect_columns(df)
         }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/upload/{upload_id}/record-paths")
+@heavy_work
+def get_upload_record_paths(upload_id: str):
+    """Suggest record paths for an XML upload (repeated element paths) and show the current one"""
+    try:
+        with db.connection() as conn:
+            row = conn.execute("SELECT path, file_type, source_table FROM uploads WHERE upload_id = ?",
+                              (upload_id,)).fetchone()
         
+        if not row:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if row[1] != 'xml':
+            raise HTTPException(status_code=400, detail="Only XML uploads have record paths")
+        
+        return {
+            "upload_id": upload_id,
+            "record_path": row[2],
+            "suggestions": suggest_record_paths(row[0])
+        }
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/upload/{upload_id}/record-path")
+@heavy_work
+def select_upload_record_path(upload_id: str, request: RecordPathRequest):
+    """
+    Read an XML upload's records from another element path (e.g. 'Crops/Crop',
+    '*' for any tag). Records at an explicit path are flattened: attributes
+    become '@name' columns and nested elements 'parent.child' columns. A null
+    path goes back to the root's children with their direct child elements.
+    Switching clears the saved mappings and parse results.
+    
+    Returns the same fields as the upload response, for the selected records.
+    """
+    try:
+        with db.connection() as conn:
+            row = conn.execute("""SELECT path, file_type, source_table, status, parse_id
+                                 FROM uploads WHERE upload_id = ?""", (upload_id,)).fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        
+        file_path, file_type, current_path, status, parse_id = row
+        if file_type != 'xml':
+            raise HTTPException(status_code=400, detail="Only XML uploads have record paths")
+        if status in ('queued', 'parsing'):
+            raise HTTPException(status_code=409, detail="Upload is being parsed")
+        
+        record_path = request.record_path.strip().strip("/") if request.record_path is not None else None
+        try:
+            df, total_rows = sample_xml_records(file_path, record_path, UPLOAD_SAMPLE_ROWS)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"No records found at '{request.record_path}'")
+        columns = df.columns.tolist()
+        
+        if record_path != current_path:
+            switch_source_table(upload_id, parse_id, record_path, columns, total_rows)
+        
+        return {
+            "success": True,
+            "upload_id": upload_id,
+            "file_type": file_type,
+            "record_path": record_path,
+            "total_rows": total_rows,
+            "total_rows_estimated": False,
+            "columns": columns,
+            "preview_rows": df.head(10).fillna("").to_dict('records'),
+            "detected_columns": auto_detect_columns(df)
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# ==================== GROUP SELECTION & FILTERING ====================
+# ==================== PARSING & NORMALIZATION ====================
 
-@app.get("/api/upload/{upload_id}/group-columns")
-def get_group_columns(upload_id: str):
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Process pool for parallel parsing, started on first use"""
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn: forking a threaded server process is not safe
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+def normalize_for_parse(df: pd.DataFrame, mappings: Dict[str, str]) -> Dict:
+    """Normalize on the process pool for large files, in-process otherwise"""
+    if PARSE_WORKERS > 1 and len(df) >= PARALLEL_PARSE_MIN_ROWS:
+        return normalize_dataframe_parallel(df, mappings, get_parse_pool(), PARSE_CHUNK_ROWS)
+    return normalize_dataframe(df, mappings)
+
+def load_base_parse(c: sqlite3.Cursor, parse_id: Optional[str]) -> Optional[Dict]:
     """
-    Get list of available columns for grouping/filtering.
-    Returns columns with their data types and unique value counts.
+    Parse results a re-parse of the same rows with other mappings can start
+    from: records in the current layout, with their mappings and stats known.
+    """
+    if not parse_id:
+        return None
+    c.execute("SELECT mappings_json, stats_json, records_version FROM parse_results WHERE parse_id = ?",
+             (parse_id,))
+    row = c.fetchone()
+    if not row or not row[0] or not row[1] or row[2] != RECORDS_VERSION:
+        return None
+    return {"parse_id": parse_id, "mappings": json.loads(row[0]), "stats": json.loads(row[1])}
+
+def base_valid_rows(c: sqlite3.Cursor, base_parse_id: str, n: int) -> np.ndarray:
+    """Which of the n rows the base parse stored records for"""
+    c.execute("SELECT row_number FROM records WHERE parse_id = ?", (base_parse_id,))
+    valid = np.zeros(n, dtype=bool)
+    valid[np.array([row[0] for row in c.fetchall()], dtype=np.int64) - 1] = True
+    return valid
+
+def base_month_results(c: sqlite3.Cursor, base_parse_id: str, n: int) -> Dict:
+    """normalize_months() output for the base parse's rows, read back from its records"""
+    normalized = {
+        "row_number": np.arange(1, n + 1),
+        "month_mask": np.zeros(n, dtype=np.int64),
+        "parsed_months": np.full(n, None, dtype=object),
+        "has_month": np.zeros(n, dtype=bool),
+        "requires_review": np.zeros(n, dtype=bool),
+        "review_reason": np.full(n, None, dtype=object),
+        "valid": np.zeros(n, dtype=bool)
+    }
+    c.execute("""SELECT row_number, month_mask, requires_review, review_reason,
+                        json_extract(normalized_json, '$.parsed_months'),
+                        json_type(normalized_json, '$.month_mask') IS NOT NULL
+                 FROM records WHERE parse_id = ?""", (base_parse_id,))
+    rows = c.fetchall()
+    if rows:
+        row_numbers, masks, review, reasons, parsed, has_month = zip(*rows)
+        i = np.array(row_numbers, dtype=np.int64) - 1
+        normalized["month_mask"][i] = masks
+        normalized["requires_review"][i] = review
+        normalized["review_reason"][i] = reasons
+        normalized["parsed_months"][i] = parsed
+        normalized["has_month"][i] = has_month
+        normalized["valid"][i] = True
+    return normalized
+
+def normalize_from_base(
+    c: sqlite3.Cursor,
+    file_path: str,
+    source_table: Optional[str],
+    mappings: Dict[str, str],
+    base: Dict
+) -> Optional[Dict]:
     """
+    normalize_dataframe() output for mappings, starting from a base parse of
+    the same rows. With unchanged month inputs the month results are read
+    back from its records; either way only the columns still to be
+    normalized are read. None when the valid rows come out different from
+    the base parse's, whose records can't be reused then.
+    """
+    stats = base["stats"]
+    n = stats["total_parsed"] + stats["errors"]
+    reuse_months = month_inputs(mappings) == month_inputs(base["mappings"])
+    
+    needed = set(field_columns(mappings))
+    if not reuse_months:
+        month_cols, start_date_col, end_date_col = month_inputs(mappings)
+        needed.update(month_cols)
+        needed.update(col for col in (start_date_col, end_date_col, 'period') if col)
+    c.execute("SELECT column_name FROM parse_columns WHERE parse_id = ? ORDER BY position", (base["parse_id"],))
+    columns = [row[0] for row in c.fetchall() if row[0] in needed]
+    
+    if columns:
+        df, _ = load_upload_dataframe(file_path, columns=columns, source_table=source_table)
+        if len(df) != n:
+            return None
+    else:
+        df = pd.DataFrame(index=pd.RangeIndex(n))
+    
+    if reuse_months:
+        normalized = base_month_results(c, base["parse_id"], n)
+    else:
+        normalized = normalize_months(df, mappings)
+        if not np.array_equal(normalized["valid"], base_valid_rows(c, base["parse_id"], n)):
+            return None
+    normalized["fields"], normalized["field_order"] = normalize_fields(df, mappings)
+    return normalized
+
+# Parses hold the SQLite writer from taking their references until the
+# commit; they take turns, so a parse waits for the one ahead of it instead
+# of failing after busy_timeout
+parse_write_lock = threading.Lock()
+
+@contextmanager
+def parse_write_section(conn: sqlite3.Connection) -> Iterator[sqlite3.Cursor]:
+    """
+    The write phase of a parse: one IMMEDIATE transaction, so the writer is
+    taken (or waited for) up front instead of failing when a read turns
+    into a write. Runs under parse_write_lock; anything not committed is
+    rolled back before the next parse gets the lock.
+    """
+    with parse_write_lock:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn.cursor()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+def claim_parse_results(
+    c: sqlite3.Cursor,
+    upload_id: str,
+    parse_id: str,
+    previous_parse_id: Optional[str]
+) -> Optional[Dict]:
+    """
+    In the write phase of a parse: take the upload's reference on parse
+    results that already exist, returning them (None if not parsed yet).
+    Raises 409 when the upload was re-parsed since the parse started.
+    """
+    c.execute("SELECT parse_id FROM uploads WHERE upload_id = ?", (upload_id,))
+    row = c.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if row[0] != previous_parse_id:
+        raise HTTPException(status_code=409, detail="Upload was parsed again meanwhile, retry the parse")
+    if parse_id == previous_parse_id:
+        return get_parse_result(c, parse_id)  # Already referenced by the upload
+    return acquire_parse(c, parse_id)
+
+def link_parse(c: sqlite3.Cursor, upload_id: str, parse_id: str, previous_parse_id: Optional[str]):
+    """Point an upload at parse results it holds a reference on, releasing its previous ones"""
+    if previous_parse_id != parse_id:
+        release_parse(c, previous_parse_id)
+    c.execute("UPDATE uploads SET parse_id = ?, status = 'parsed' WHERE upload_id = ?", (parse_id, upload_id))
+
+def reused_parse_response(upload_id: str, existing: Dict) -> Dict:
+    stats = existing["stats"]
+    return {
+        "success": True,
+        "upload_id": upload_id,
+        "stats": stats,
+        "sample_records": existing["sample_records"],
+        "message": f"Parsed {stats['total_parsed']} records",
+        "reused": True
+    }
+
+def run_parse(upload_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Parse entire file with configured column mappings.
+    Extract month information and generate month_mask.
+    Flag rows requiring manual review.
+    
+    on_progress(rows_done, rows_total) is called between the load,
+    normalize and ingest stages and as records are staged; an exception
+    raised from it aborts the parse and rolls back.
+    
+    The file is loaded and normalized, and the records are built into a
+    TEMP table, without locking the database; only taking the references
+    and copying the records over happen in the write phase, one parse at a
+    time (parse_write_section).
+    
+    When the mappings change, the upload's previous parse is the starting
+    point: only the affected normalized fields are recomputed (month masks
+    are kept if the month columns are unchanged) and the rest of each
+    record is copied from the previous records.
+    """
+    # A dedicated connection: the ingest pragmas should not stay on pooled ones
+    conn = open_connection(DB_FILE)
+    apply_ingest_pragmas(conn)
+    c = conn.cursor()
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Get file path
-        c.execute("SELECT path FROM uploads WHERE upload_id = ?", (upload_id,))
+        # Get upload and mappings
+        c.execute(
+            """SELECT path, columns_json, total_rows, content_hash, parse_id, source_table
+               FROM uploads WHERE upload_id = ?""",
+            (upload_id,)
+        )
         row = c.fetchone()
+        
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Upload not found")
         
-        file_path = row[0]
-        df, _ = read_file_to_dataframe(file_path)
-        
-        # Get columns with unique counts
-        columns_info = []
-        for col in df.columns:
-            unique_count = df[col].nunique()
-            columns_info.append({
-                "name": col,
-                "unique_values": unique_count,
-                "type": str(df[col].dtype)
-            })
+        file_path, mappings_json, total_rows, content_hash, previous_parse_id, source_table = row
+        mappings = json.loads(mappings_json)
+        parse_id = compute_parse_id(source_key(content_hash or upload_id, source_table), mappings)
+        
+        def report_stage():
+            # Between stages, so a cancellation takes effect before the next one starts
+            if on_progress:
+                on_progress(0, total_rows or 0)
+        
+        # Same content already parsed with the same mappings: share its records
+        existing = get_parse_result(c, parse_id)
+        if existing and existing["stats"] is not None:
+            with parse_write_section(conn) as c:
+                existing = claim_parse_results(c, upload_id, parse_id, previous_parse_id)
+                if existing and existing["stats"] is not None:
+                    link_parse(c, upload_id, parse_id, previous_parse_id)
+                    conn.commit()
+            if existing and existing["stats"] is not None:
+                if on_progress:
+                    on_progress(existing["stats"]['total_parsed'], existing["stats"]['total_parsed'])
+                return reused_parse_response(upload_id, existing)
+        
+        report_stage()
+        
+        # Changed mappings: start from the previous parse of the same rows
+        base = load_base_parse(c, previous_parse_id) if previous_parse_id != parse_id else None
+        normalized = normalize_from_base(c, file_path, source_table, mappings, base) if base else None
+        df = None
+        catalog_key = source_key(content_hash or upload_id, source_table)
+        catalog_stats = None
+        if normalized is None:
+            base = None
+            df, _ = load_upload_dataframe(file_path, source_table=source_table)
+            report_stage()
+            
+            # The file is loaded anyway: catalog its columns if that wasn't done yet
+            if not has_column_stats(c, catalog_key):
+                catalog_stats = compute_column_stats(df)
+            
+            # Parse all rows at once: each distinct period/season/date value is parsed once
+            normalized = normalize_for_parse(df, mappings)
+        stats = summarize_parse(normalized)
+        sample_records = [build_record(normalized, i) for i in np.flatnonzero(normalized['valid'])[:5]]
+        report_stage()
+        
+        # Build the records in a TEMP table, which doesn't lock the database
+        report = None
+        if on_progress:
+            on_progress(0, stats['total_parsed'])
+            report = lambda rows_done: on_progress(rows_done, stats['total_parsed'])
+        if base:
+            staging_seconds = stage_reparse_records(c, normalized, on_batch=report)
+        else:
+            staging_seconds = stage_records(c, upload_id, parse_id, df, normalized, on_batch=report)
+        conn.commit()  # Only TEMP tables were written
+        
+        with parse_write_section(conn) as c:
+            existing = claim_parse_results(c, upload_id, parse_id, previous_parse_id)
+            if existing and existing["stats"] is not None:
+                # Parsed meanwhile by an upload of the same content
+                link_parse(c, upload_id, parse_id, previous_parse_id)
+                conn.commit()
+                return reused_parse_response(upload_id, existing)
+            if existing:
+                # Records stored by an older version are rebuilt
+                c.execute("DELETE FROM records WHERE parse_id = ?", (parse_id,))
+            if catalog_stats is not None and not has_column_stats(c, catalog_key):
+                store_column_stats(c, catalog_key, content_hash or upload_id, catalog_stats)
+            
+            # Copy the staged records over in SQL, in the one transaction committed below
+            if base:
+                ingest = reingest_records(c, upload_id, parse_id, base["parse_id"], normalized, staging_seconds)
+            else:
+                ingest = ingest_records(c, parse_id, df, normalized, staging_seconds)
+            
+            c.execute("""INSERT INTO parse_results
+                        (parse_id, content_hash, mappings_json, stats_json, sample_json, records_version,
+                         ref_count, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+                        ON CONFLICT(parse_id) DO UPDATE SET
+                            stats_json = excluded.stats_json, sample_json = excluded.sample_json,
+                            records_version = excluded.records_version""",
+                     (parse_id, content_hash, json.dumps(mappings), json.dumps(stats),
+                      json.dumps(sample_records), RECORDS_VERSION, datetime.now().isoformat()))
+            # Released after the ingest: reingest_records copies from the previous records
+            link_parse(c, upload_id, parse_id, previous_parse_id)
+            
+            conn.commit()
         
-        conn.close()
         return {
+            "success": True,
             "upload_id": upload_id,
-            "columns": columns_info
+            "stats": stats,
+            "sample_records": sample_records,
+            "ingest": ingest,
+            "message": f"Parsed {stats['total_parsed']} records"
         }
+    finally:
+        conn.close()
+
+@app.post("/api/upload/{upload_id}/parse")
+@heavy_work
+def parse_and_normalize_data(upload_id: str):
+    """Parse synchronously and return the parse stats (see run_parse)"""
+    try:
+        return run_parse(upload_id)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/upload/{upload_id}/unique-values/{column_name}")
-def get_unique_values(upload_id: str, column_name: str):
+# ==================== BACKGROUND PARSE JOBS ====================
+
+parse_jobs = JobRegistry()
+
+def set_upload_status(upload_id: str, status: str):
+    with db.connection() as conn:
+        conn.execute("UPDATE uploads SET status = ? WHERE upload_id = ?", (status, upload_id))
+        conn.commit()
+
+def run_parse_job(job: ParseJob):
     """
-    Get all unique values for a specific column.
-    Returns sorted list with counts.
+    Background task body: run_parse with progress reporting and cancellation.
+    Every way out finishes the job, so the upload can always be parsed again.
     """
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
+        if job.cancel_requested:
+            raise JobCancelled()
+        job.start()
+        set_upload_status(job.upload_id, 'parsing')
+        result = run_parse(job.upload_id, on_progress=job.report_progress)
+        job.finish('completed', result=result)  # run_parse already set status 'parsed'
+        return
+    except JobCancelled:
+        state, error = 'cancelled', None
+    except HTTPException as e:
+        state, error = 'failed', str(e.detail)
+    except Exception as e:
+        state, error = 'failed', str(e)
+    
+    job.finish(state, error=error)
+    try:
+        set_upload_status(job.upload_id, state)
+    except sqlite3.Error:
+        pass  # The job is finished either way; the status is refreshed by the next parse
+
+@app.post("/api/upload/{upload_id}/parse-jobs")
+def submit_parse_job(upload_id: str, background_tasks: BackgroundTasks):
+    """
+    Start parsing in the background and return immediately.
+    Poll /api/parse-jobs/{job_id} for progress; a parse already queued or
+    running for the upload is returned instead of starting another one.
+    
+    Returns:
+    {
+        "job_id": "uuid",
+        "upload_id": "uuid",
+        "state": "queued",
+        ...
+    }
+    """
+    try:
+        with db.connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT path, file_size, file_type FROM uploads WHERE upload_id = ?", (upload_id,))
+            row = c.fetchone()
         
-        c.execute("SELECT path FROM uploads WHERE upload_id = ?", (upload_id,))
-        row = c.fetchone()
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Upload not found")
         
-        file_path = row[0]
-        df, _ = read_file_to_dataframe(file_path)
+        # Admitted up front so a saturated server refuses the job instead of queueing it unbounded
+        ticket = admit_heavy_work(stored_file_size(row[0], row[1]), row[2])
+        job, created = parse_jobs.create(upload_id)
+        if created:
+            set_upload_status(upload_id, 'queued')
+            background_tasks.add_task(heavy_work_pool.run, ticket, run_parse_job, job)
+        else:
+            heavy_work_pool.release(ticket)
         
-        if column_name not in df.columns:
-            raise HTTPException(status_code=400, detail=f"Column '{column_name}' not found")
+        return job.to_dict()
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/parse-jobs/{job_id}")
+def get_parse_job(job_id: str):
+    """Job state and progress: rows done/total, throughput and ETA"""
+    job = parse_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/parse-jobs/{job_id}/cancel")
+def cancel_parse_job(job_id: str):
+    """Request cancellation; records written so far are rolled back"""
+    job = parse_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.request_cancel():
+        raise HTTPException(status_code=409, detail=f"Job already {job.state}")
+    return job.to_dict()
+
+@app.get("/api/parse-jobs/{job_id}/result")
+def get_parse_job_result(job_id: str):
+    """Final parse response (stats and sample records) of a completed job"""
+    job = parse_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.state == 'failed':
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.state != 'completed':
+        raise HTTPException(status_code=409, detail=f"Job is {job.state}")
+    return job.result
+
+# ==================== MONTH QUERIES ====================
+
+MAX_QUERY_LIMIT = 10000
+
+def resolve_parse_ids(c: sqlite3.Cursor, upload_ids: Optional[List[str]]) -> Dict[str, str]:
+    """
+    Map parse_id -> upload_id for parsed uploads (every upload when upload_ids is None).
+    Uploads sharing parse results map to the oldest of them, so shared
+    records are returned once.
+    """
+    if upload_ids is None:
+        c.execute("""SELECT upload_id, parse_id FROM uploads
+                    WHERE parse_id IS NOT NULL ORDER BY created_at""")
+    else:
+        placeholders = ", ".join("?" for _ in upload_ids)
+        c.execute(f"""SELECT upload_id, parse_id FROM uploads
+                     WHERE parse_id IS NOT NULL AND upload_id IN ({placeholders})
+                     ORDER BY created_at""", upload_ids)
+    
+    parse_uploads = {}
+    for upload_id, parse_id in c.fetchall():
+        parse_uploads.setdefault(parse_id, upload_id)
+    return parse_uploads
+
+def get_parse_masks(c: sqlite3.Cursor, parse_id: str) -> List[int]:
+    """Distinct month masks of a parse, backfilled from records for older parses"""
+    c.execute("SELECT month_mask FROM parse_masks WHERE parse_id = ?", (parse_id,))
+    masks = [row[0] for row in c.fetchall()]
+    if masks:
+        return masks
+    
+    c.execute("""INSERT OR IGNORE INTO parse_masks (parse_id, month_mask, record_count)
+                SELECT parse_id, month_mask, COUNT(*) FROM records
+                WHERE parse_id = ? GROUP BY month_mask""", (parse_id,))
+    c.execute("SELECT month_mask FROM parse_masks WHERE parse_id = ?", (parse_id,))
+    return [row[0] for row in c.fetchall()]
+
+def raw_column_path(column: str) -> str:
+    """JSON path selecting an original column from records.raw_json"""
+    if '"' in column:
+        raise HTTPException(status_code=400, detail=f"Unsupported column name: {column}")
+    return f'$."{column}"'
+
+@app.post("/api/query/months")
+def query_month_window(query: MonthQueryRequest, request: Request, format: Optional[str] = None):
+    """
+    Find records active in a month window, across uploads, without reading files.
+    Windows wrap over the year end when start_month > end_month (Nov-Feb).
+    
+    Request body:
+    {
+        "start_month": 3,
+        "end_month": 5,
+        "upload_ids": ["uuid", ...],          (optional, default: all parsed uploads)
+        "filters": {"Crop": ["Wheat"]},       (optional, original column -> values)
+        "limit": 1000
+    }
+    
+    The window is turned into the set of stored month masks that overlap it
+    (parse_masks), so matching rows are found with (parse_id, month_mask)
+    index seeks instead of testing every record. Records come in the layout
+    negotiated from ?format= or Accept: json, columnar or arrow.
+    """
+    try:
+        record_format = negotiate_record_format(format, request.headers.get("accept", ""),
+                                                ('json', 'columnar', 'arrow'))
+        if not (1 <= query.start_month <= 12 and 1 <= query.end_month <= 12):
+            raise HTTPException(status_code=400, detail="Months must be between 1 and 12")
+        limit = max(1, min(query.limit, MAX_QUERY_LIMIT))
+        window = range_mask(query.start_month, query.end_month)
+        window_masks = set(overlapping_masks(window).tolist())
+        
+        with db.connection() as conn:
+            c = conn.cursor()
+            parse_uploads = resolve_parse_ids(c, query.upload_ids)
+            
+            filter_sql = ""
+            filter_params = []
+            for column, values in query.filters.items():
+                if not values:
+                    continue
+                filter_sql += f" AND json_extract(raw_json, ?) IN ({', '.join('?' for _ in values)})"
+                filter_params += [raw_column_path(column)] + list(values)
+            
+            total = 0
+            records = []
+            for parse_id, upload_id in parse_uploads.items():
+                masks = [m for m in get_parse_masks(c, parse_id) if m in window_masks]
+                if not masks:
+                    continue
+                
+                where = f"parse_id = ? AND month_mask IN ({', '.join('?' for _ in masks)}){filter_sql}"
+                params = [parse_id] + masks + filter_params
+                
+                c.execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)
+                total += c.fetchone()[0]
+                
+                remaining = limit - len(records)
+                if remaining <= 0:
+                    continue
+                c.execute(f"""SELECT row_number, month_mask, raw_json FROM records
+                             WHERE {where} ORDER BY row_number LIMIT ?""", params + [remaining])
+                for row_number, month_mask, raw_json in c.fetchall():
+                    records.append({
+                        "upload_id": upload_id,
+                        "row_number": row_number,
+                        "month_mask": month_mask,
+                        "months": mask_label(month_mask),
+                        "data": loads(raw_json) if raw_json else {}
+                    })
+            conn.commit()  # parse_masks backfills
+        
+        return record_response({
+            "success": True,
+            "window": {
+                "start_month": query.start_month,
+                "end_month": query.end_month,
+                "month_mask": window,
+                "months": mask_label(window)
+            },
+            "total_records": total,
+            "returned": len(records)
+        }, records, record_format)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==================== GROUP SELECTION & FILTERING ====================
+
+def build_column_catalog(file_path: str, source_table: Optional[str], catalog_key: str, content_key: str):
+    """Compute and store the column statistics of an upload's table in one pass over it"""
+    df, _ = load_upload_dataframe(file_path, source_table=source_table)
+    stats = compute_column_stats(df)
+    with db.connection() as conn:
+        store_column_stats(conn.cursor(), catalog_key, content_key, stats)
+        conn.commit()
+
+async def column_catalog_key(upload_id: str) -> str:
+    """
+    Key of the column statistics catalog of an upload's table. A table
+    without one yet (a large file not parsed so far, or stored by an older
+    version) is read once on the heavy-work pool to compute it.
+    """
+    async with async_db.connection() as conn:
+        async with conn.execute("""SELECT path, file_size, file_type, content_hash, source_table
+                                  FROM uploads WHERE upload_id = ?""", (upload_id,)) as c:
+            row = await c.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Upload not found")
         
-        # Get unique values with counts
-        value_counts = df[column_name].value_counts().reset_index()
-        value_counts.columns = ['value', 'count']
-        unique_values = value_counts.sort_values('value').to_dict('records')
+        file_path, file_size, file_type, content_hash, source_table = row
+        catalog_key = source_key(content_hash or upload_id, source_table)
+        async with conn.execute("SELECT 1 FROM column_stats WHERE source_key = ? LIMIT 1", (catalog_key,)) as c:
+            cataloged = await c.fetchone()
+    
+    if not cataloged:
+        ticket = admit_heavy_work(stored_file_size(file_path, file_size), file_type)
+        await heavy_work_pool.run(ticket, build_column_catalog, file_path, source_table, catalog_key,
+                                  content_hash or upload_id)
+    return catalog_key
+
+@app.get("/api/upload/{upload_id}/group-columns")
+@upload_validators()
+async def get_group_columns(upload_id: str):
+    """
+    Get list of available columns for grouping/filtering.
+    Returns columns with their data types, unique value counts and null
+    counts, from the column statistics catalog.
+    """
+    try:
+        catalog_key = await column_catalog_key(upload_id)
+        async with async_db.connection() as conn:
+            async with conn.execute("""SELECT column_name, distinct_count, dtype, inferred_type, null_count
+                                      FROM column_stats WHERE source_key = ? ORDER BY position""",
+                                    (catalog_key,)) as c:
+                rows = await c.fetchall()
+        
+        columns_info = [{
+            "name": name,
+            "unique_values": distinct_count,
+            "type": dtype,
+            "inferred_type": inferred_type,
+            "null_count": null_count
+        } for name, distinct_count, dtype, inferred_type, null_count in rows]
         
-        conn.close()
         return {
+            "upload_id": upload_id,
+            "columns": columns_info
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/upload/{upload_id}/unique-values/{column_name}")
+@upload_validators()
+async def get_unique_values(upload_id: str, column_name: str):
+    """
+    Get all unique values for a specific column.
+    Returns sorted list with counts, from the column statistics catalog.
+    """
+    try:
+        catalog_key = await column_catalog_key(upload_id)
+        async with async_db.connection() as conn:
+            async with conn.execute("SELECT values_json FROM column_stats WHERE source_key = ? AND column_name = ?",
+                                    (catalog_key, column_name)) as c:
+                row = await c.fetchone()
+            if not row:
+                raise HTTPException(status_code=400, detail=f"Column '{column_name}' not found")
+            
+            if row[0] is not None:
+                value_counts = json.loads(row[0]).items()
+            else:
+                # Too many values to keep inline
+                async with conn.execute("""SELECT value, value_count FROM column_values
+                                          WHERE source_key = ? AND column_name = ? ORDER BY value""",
+                                        (catalog_key, column_name)) as c:
+                    value_counts = await c.fetchall()
+        
+        unique_values = [{"value": value, "count": count} for value, count in value_counts]
+        
+        # Plain strings and ints already: skip the per-item response encoding
+        return JSONResponse({
             "upload_id": upload_id,
             "column": column_name,
             "unique_values": unique_values,
             "total_unique": len(unique_values)
-        }
+        })
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def search_column_values(catalog_key: str, column_name: str, query: str, mode: str, limit: int) -> Optional[List[Dict]]:
+    """search_values over a cataloged column, indexing it on its first search (None: no such column)"""
+    with db.connection() as conn:
+        c = conn.cursor()
+        if not has_trigram_index():
+            return scan_search_values(c, catalog_key, column_name, query, mode, limit)
+        value_range = value_search_range(c, catalog_key, column_name)
+        if value_range is None:
+            value_range = build_value_search(c, catalog_key, column_name)
+            conn.commit()
+            if value_range is None:
+                return None
+        return search_values(c, value_range, query, mode, limit)
+
+@app.get("/api/upload/{upload_id}/unique-values/{column_name}/search")
+@upload_validators()
+async def search_unique_values(upload_id: str, column_name: str, q: str = "", mode: str = "all", limit: int = 20):
+    """
+    Typeahead search over a column's unique values.
+    mode: 'prefix', 'substring', 'fuzzy' (trigram similarity) or 'all'
+    (prefix, then substring, then fuzzy matches). Returns at most limit
+    values with their counts; an empty q returns the most frequent values.
+    """
+    try:
+        if mode not in SEARCH_MODES:
+            raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(SEARCH_MODES)}")
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+        
+        catalog_key = await column_catalog_key(upload_id)
+        matches = await run_in_threadpool(search_column_values, catalog_key, column_name, q, mode, limit)
+        if matches is None:
+            raise HTTPException(status_code=400, detail=f"Column '{column_name}' not found")
+        
+        return JSONResponse({
+            "upload_id": upload_id,
+            "column": column_name,
+            "query": q,
+            "mode": mode,
+            "matches": matches
+        })
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def resolve_parsed_upload(c: sqlite3.Cursor, upload_id: str, action: str = "filtering") -> str:
+    """parse_id of an upload whose records are ready"""
+    c.execute("SELECT parse_id FROM uploads WHERE upload_id = ?", (upload_id,))
+    row = c.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    parse_id = row[0]
+    parse_result = get_parse_result(c, parse_id) if parse_id else None
+    if not parse_result or parse_result["stats"] is None:
+        raise HTTPException(status_code=409, detail=f"Upload must be parsed before {action}")
+    return parse_id
+
+def resolve_filter_column(
+    c: sqlite3.Cursor,
+    upload_id: str,
+    column_name: str,
+    action: str = "filtering"
+) -> Tuple[str, bool]:
+    """(parse_id, has_postings) for filtering an upload's records on column_name"""
+    parse_id = resolve_parsed_upload(c, upload_id, action)
+    c.execute("SELECT indexed FROM parse_columns WHERE parse_id = ? AND column_name = ?",
+             (parse_id, column_name))
+    column = c.fetchone()
+    if not column:
+        raise HTTPException(status_code=400, detail=f"Column '{column_name}' not found")
+    return parse_id, bool(column[0])
+
+def filter_conditions(
+    c: sqlite3.Cursor,
+    parse_id: str,
+    column_name: str,
+    values: List[str],
+    indexed: bool
+) -> Tuple[str, list]:
+    """
+    WHERE clause and parameters selecting the harvesting records of a parse
+    whose column_name is one of values.
+    """
+    if indexed:
+        # Matching row numbers come from the value postings; records are fetched by index
+        placeholders = ", ".join("?" for _ in values)
+        c.execute(f"""SELECT row_numbers FROM value_postings
+                     WHERE parse_id = ? AND column_name = ? AND value IN ({placeholders})""",
+                 [parse_id, column_name] + list(values))
+        postings = [decode_row_numbers(row[0]) for row in c.fetchall()]
+        row_numbers = np.unique(np.concatenate(postings)) if postings else np.array([], dtype=np.int32)
+        return ("parse_id = ? AND is_harvest = 1 AND row_number IN (SELECT value FROM json_each(?))",
+                [parse_id, json.dumps(row_numbers.tolist())])
+    
+    placeholders = ", ".join("?" for _ in values)
+    return (f"""parse_id = ? AND is_harvest = 1
+               AND CAST(json_extract(raw_json, ?) AS TEXT) IN ({placeholders})""",
+            [parse_id, raw_column_path(column_name)] + list(values))
+
+def filter_record(raw_json: str, normalized_json: Optional[str], month_mask: int) -> Dict:
+    """Original row with its parsed data, as returned by the filter endpoint"""
+    record = loads(raw_json)
+    record['parsed_data'] = loads(normalized_json) if normalized_json else {}
+    record['month_mask'] = month_mask
+    return record
+
+def iter_filter_batches(where: str, params: list, limit: Optional[int] = None):
+    """Yield matching records in row order, FILTER_STREAM_BATCH at a time"""
+    # Streamed to a client at its own pace, so on a connection of its own rather
+    # than holding a pooled one for the whole download
+    with closing(open_connection(DB_FILE)) as conn:
+        sql = f"SELECT raw_json, normalized_json, month_mask FROM records WHERE {where} ORDER BY row_number"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        c = conn.execute(sql, params)
+        while True:
+            rows = c.fetchmany(FILTER_STREAM_BATCH)
+            if not rows:
+                break
+            yield [filter_record(*row) for row in rows]
+
+def stream_filter_records(where: str, params: list, limit: Optional[int]):
+    """Yield matching records as NDJSON lines, FILTER_STREAM_BATCH rows at a time"""
+    for batch in iter_filter_batches(where, params, limit):
+        yield b"".join(dumps(record) + b"\n" for record in batch)
+
 @app.post("/api/upload/{upload_id}/filter")
-def apply_filter(upload_id: str, filter_req: FilterRequest):
+def apply_filter(upload_id: str, filter_req: FilterRequest, request: Request, format: Optional[str] = None):
     """
     Apply filter to get matching records.
     ONLY RETURNS HARVESTING RECORDS - sowing/planting data is excluded.
@@ -964,101 +2024,92 @@ def apply_filter(upload_id: str, filter_req: FilterRequest):
     Request body:
     {
         "column_name": "Crop",
-        "values": ["Sesame", "Wheat"]
+        "values": ["Sesame", "Wheat"],
+        "page_size": 1000,      (optional, default: all records in one response)
+        "cursor": "..."         (optional, next_cursor of the previous page)
     }
     
     Returns filtered records with their parsed data (harvesting only).
+    Answered from the parse's records without reading the file: the value
+    postings give the matching row numbers, which are fetched by index
+    (columns without postings are matched on raw_json instead).
+    
+    Pages are keyed on row number, so following next_cursor stays cheap
+    however deep the page. The layout is negotiated from ?format= or
+    Accept: a list of records (json), columns of values (columnar), an
+    Arrow IPC stream (arrow), or one JSON object per line, streamed (ndjson).
     """
     try:
         column_name = filter_req.column_name
         selected_values = filter_req.values
+        page_size = filter_req.page_size
         
         if not column_name or not selected_values:
             raise HTTPException(status_code=400, detail="Missing column_name or values")
-        
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Get upload and mappings
-        c.execute(
-            "SELECT path, columns_json FROM uploads WHERE upload_id = ?",
-            (upload_id,)
-        )
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            raise HTTPException(status_code=404, detail="Upload not found")
-        
-        file_path, mappings_json = row
-        mappings = json.loads(mappings_json) if mappings_json else {}
-        
-        # Read and filter data
-        df, _ = read_file_to_dataframe(file_path)
-        
-        if column_name not in df.columns:
-            raise HTTPException(status_code=400, detail=f"Column '{column_name}' not found")
-        
-        # Filter to matching rows
-        filtered_df = df[df[column_name].isin(selected_values)]
-        
-        # Filter to ONLY harvesting records - exclude sowing/planting
-        cropprocess_cols = [col for col in filtered_df.columns if 'cropprocess' in col.lower() or 'crop_process' in col.lower()]
-        if cropprocess_cols:
-            cropprocess_col = cropprocess_cols[0]
-            filtered_df = filtered_df[
-                filtered_df[cropprocess_col].str.lower().str.contains('harvesting', na=False)
-            ]
-        
-        # Get parsed records from database if available
-        c.execute("""
-            SELECT row_number, normalized_json, month_mask FROM records
-            WHERE upload_id = ?
-        """, (upload_id,))
-        parsed_rows = {row[0]: (json.loads(row[1]) if row[1] else {}, row[2]) for row in c.fetchall()}
-        
-        # Build result records
-        result_records = []
-        for idx, df_row in filtered_df.iterrows():
-            record = dict(df_row)
-            row_num = idx + 1
+        record_format = negotiate_record_format(format, request.headers.get("accept", ""), RECORD_FORMATS)
+        if page_size is not None and not 1 <= page_size <= MAX_FILTER_PAGE_SIZE:
+            raise HTTPException(status_code=400,
+                              detail=f"page_size must be between 1 and {MAX_FILTER_PAGE_SIZE}")
+        try:
+            after_row = int(filter_req.cursor) if filter_req.cursor else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        with db.connection() as conn:
+            c = conn.cursor()
+            parse_id, indexed = resolve_filter_column(c, upload_id, column_name)
+            where, params = filter_conditions(c, parse_id, column_name, selected_values, indexed)
+            page_where, page_params = f"{where} AND row_number > ?", params + [after_row]
             
-            # Include parsed data if available
-            if row_num in parsed_rows:
-                parsed, month_mask = parsed_rows[row_num]
-                record['parsed_data'] = parsed
-                record['month_mask'] = month_mask
+            if record_format == "ndjson":
+                return StreamingResponse(stream_filter_records(page_where, page_params, page_size),
+                                         media_type=NDJSON_MEDIA_TYPE, headers={"Vary": "Accept"})
             
-            result_records.append(record)
-        
-        conn.close()
-        
-        return {
+            c.execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)
+            total_records = c.fetchone()[0]
+            
+            sql = f"""SELECT row_number, raw_json, normalized_json, month_mask FROM records
+                     WHERE {page_where} ORDER BY row_number"""
+            if page_size:
+                sql += f" LIMIT {page_size + 1}"
+            c.execute(sql, page_params)
+            rows = c.fetchall()
+        
+        # One extra row tells whether another page follows
+        next_cursor = None
+        if page_size and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = str(rows[-1][0])
+        
+        result_records = [filter_record(raw_json, normalized_json, month_mask)
+                          for _, raw_json, normalized_json, month_mask in rows]
+        
+        return record_response({
             "success": True,
             "upload_id": upload_id,
             "filter": {
                 "column": column_name,
                 "values": selected_values
             },
-            "total_records": len(result_records),
-            "records": result_records
-        }
+            "total_records": total_records,
+            "returned": len(result_records),
+            "next_cursor": next_cursor
+        }, result_records, record_format)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/upload/{upload_id}")
-def get_upload_details(upload_id: str):
+async def get_upload_details(upload_id: str):
     """Get upload details for loading from history"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute(
-            "SELECT upload_id, filename, file_type, total_rows, path, columns_json FROM uploads WHERE upload_id = ?",
-            (upload_id,)
-        )
-        row = c.fetchone()
-        conn.close()
+        async with async_db.connection() as conn:
+            async with conn.execute(
+                "SELECT upload_id, filename, file_type, total_rows, path, columns_json FROM uploads WHERE upload_id = ?",
+                (upload_id,)
+            ) as c:
+                row = await c.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="Upload not found")
@@ -1084,22 +2135,17 @@ def get_upload_details(upload_id: str):
 def delete_upload(upload_id: str):
     """Delete a single upload and its associated data"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Get file path to delete from filesystem
-        c.execute("SELECT path FROM uploads WHERE upload_id = ?", (upload_id,))
-        row = c.fetchone()
-        
-        if row and os.path.exists(row[0]):
-            os.remove(row[0])
+        with db.connection() as conn:
+            c = conn.cursor()
+            
+            # Delete upload, releasing its shared file and records
+            orphaned_path = release_upload(c, upload_id)
+            
+            conn.commit()
         
-        # Delete records and upload
-        c.execute("DELETE FROM records WHERE upload_id = ?", (upload_id,))
-        c.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
-        
-        conn.commit()
-        conn.close()
+        # Remove the file from the filesystem once nothing references it
+        if orphaned_path:
+            remove_stored_file(orphaned_path)
         
         return {"success": True, "message": "Upload deleted"}
     except Exception as e:
@@ -1113,39 +2159,50 @@ def delete_multiple_uploads(ids: dict):
         if not upload_ids:
             raise HTTPException(status_code=400, detail="No IDs provided")
         
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        
-        # Delete files from filesystem
-        for upload_id in upload_ids:
-            c.execute("SELECT path FROM uploads WHERE upload_id = ?", (upload_id,))
-            row = c.fetchone()
-            if row and os.path.exists(row[0]):
-                os.remove(row[0])
+        with db.connection() as conn:
+            c = conn.cursor()
+            
+            # Delete uploads, releasing their shared files and records
+            orphaned_paths = []
+            for upload_id in upload_ids:
+                orphaned_path = release_upload(c, upload_id)
+                if orphaned_path:
+                    orphaned_paths.append(orphaned_path)
             
-            # Delete records and upload
-            c.execute("DELETE FROM records WHERE upload_id = ?", (upload_id,))
-            c.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            conn.commit()
         
-        conn.commit()
-        conn.close()
+        # Remove files from the filesystem once nothing references them
+        for orphaned_path in orphaned_paths:
+            remove_stored_file(orphaned_path)
         
         return {"success": True, "deleted": len(upload_ids)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/cache-stats")
+def get_cache_stats():
+    """DataFrame cache usage and hit/miss counters"""
+    return df_cache.stats()
+
+@app.get("/api/work-stats")
+def get_work_stats():
+    """Heavy-work pool load: running/queued jobs, reserved memory, rejections"""
+    return heavy_work_pool.stats()
+
 @app.get("/api/upload-history")
-def get_upload_history(limit: int = 20):
-    """Get list of recent uploads for history view"""
+async def get_upload_history(request: Request, limit: int = 20):
+    """
+    Get list of recent uploads for history view.
+    The ETag is a digest of the listed rows: cheap to read, and any new,
+    deleted or re-parsed upload changes it.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("""SELECT upload_id, filename, file_type, total_rows, created_at, status
-                    FROM uploads 
-                    ORDER BY created_at DESC 
-                    LIMIT ?""", (limit,))
-        rows = c.fetchall()
-        conn.close()
+        async with async_db.connection() as conn:
+            async with conn.execute("""SELECT upload_id, filename, file_type, total_rows, created_at, status
+                                      FROM uploads 
+                                      ORDER BY created_at DESC 
+                                      LIMIT ?""", (limit,)) as c:
+                rows = await c.fetchall()
         
         history = []
         for row in rows:
@@ -1158,11 +2215,175 @@ def get_upload_history(limit: int = 20):
                 "status": row[5]
             })
         
-        return {
+        etag = make_etag(json.dumps(history, sort_keys=True))
+        current = matching_etag(request.headers, etag)
+        if current:
+            return not_modified_response(current)
+        
+        return set_validators(JSONResponse({
             "success": True,
             "history": history,
             "total": len(history)
+        }), etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ==================== GANTT AGGREGATION ====================
+
+def resolve_record_selection(
+    c: sqlite3.Cursor,
+    upload_id: str,
+    column_name: Optional[str],
+    values: List[str],
+    action: str
+) -> Tuple[str, str, list]:
+    """
+    (parse_id, WHERE clause, parameters) for an upload's harvesting records,
+    optionally filtered like /filter.
+    """
+    if column_name and not values:
+        raise HTTPException(status_code=400, detail="Missing values")
+    if column_name:
+        parse_id, indexed = resolve_filter_column(c, upload_id, column_name, action)
+        where, params = filter_conditions(c, parse_id, column_name, values, indexed)
+        return parse_id, where, params
+    parse_id = resolve_parsed_upload(c, upload_id, action)
+    return parse_id, "parse_id = ? AND is_harvest = 1", [parse_id]
+
+@app.post("/api/upload/{upload_id}/gantt")
+def get_gantt_groups(upload_id: str, gantt_req: GanttRequest):
+    """
+    Gantt rows for an upload's harvesting records, grouped on one or more
+    columns (e.g. Country + Period + Crop).
+    
+    Request body:
+    {
+        "grouping_columns": ["Country", "Crop"],
+        "column_name": "Crop",               (optional filter, as in /filter)
+        "values": ["Sesame", "Wheat"],
+        "include_record_ids": true
+    }
+    
+    Returns one entry per group with the OR-ed month_mask, per-month record
+    counts (Jan first), the bar segments (a segment over the year end has
+    start_month > end_month) and the group's record row numbers, plus the
+    chart's month_span (12, or up to 24 for wrapping segments). The payload
+    grows with the number of groups rather than records.
+    """
+    try:
+        grouping_columns = gantt_req.grouping_columns
+        if not grouping_columns:
+            raise HTTPException(status_code=400, detail="Missing grouping_columns")
+        
+        with db.connection() as conn:
+            c = conn.cursor()
+            parse_id, where, params = resolve_record_selection(
+                c, upload_id, gantt_req.column_name, gantt_req.values, "building a Gantt chart"
+            )
+            c.execute("SELECT column_name FROM parse_columns WHERE parse_id = ?", (parse_id,))
+            parse_columns = {row[0] for row in c.fetchall()}
+            for column in grouping_columns:
+                if column not in parse_columns:
+                    raise HTTPException(status_code=400, detail=f"Column '{column}' not found")
+            
+            extracts = ", ".join("CAST(json_extract(raw_json, ?) AS TEXT)" for _ in grouping_columns)
+            c.execute(f"SELECT row_number, month_mask, {extracts} FROM records WHERE {where} ORDER BY row_number",
+                     [raw_column_path(column) for column in grouping_columns] + params)
+            rows = pd.DataFrame.from_records(c.fetchall(),
+                                             columns=["row_number", "month_mask"] + grouping_columns)
+            
+            groups = aggregate_gantt_groups(
+                rows[grouping_columns],
+                rows["month_mask"].to_numpy(),
+                rows["row_number"].to_numpy(),
+                gantt_req.include_record_ids
+            )
+            
+            # The group's first record, for labels and tooltips
+            c.execute("""SELECT row_number, raw_json FROM records
+                        WHERE parse_id = ? AND row_number IN (SELECT value FROM json_each(?))""",
+                     (parse_id, json.dumps([group["first_row_number"] for group in groups])))
+            first_records = {row_number: json.loads(raw_json) for row_number, raw_json in c.fetchall()}
+        
+        for group in groups:
+            group["first_record"] = first_records.get(group["first_row_number"], {})
+        
+        return {
+            "success": True,
+            "upload_id": upload_id,
+            "grouping_columns": grouping_columns,
+            "filter": {
+                "column": gantt_req.column_name,
+                "values": gantt_req.values
+            } if gantt_req.column_name else None,
+            "total_records": len(rows),
+            "total_groups": len(groups),
+            "month_span": month_span(np.array([group["month_mask"] for group in groups], dtype=np.int64)),
+            "groups": groups
         }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==================== EXPORTS ====================
+
+@app.post("/api/upload/{upload_id}/export")
+@heavy_work
+def export_records(upload_id: str, export_req: ExportRequest, format: str = "xlsx"):
+    """
+    Download an upload's harvesting records as XLSX, CSV or JSON, streamed
+    from the database instead of built in the browser.
+    
+    Request body (all optional):
+    {
+        "column_name": "Crop",            (filter as in /filter; default: all records)
+        "values": ["Sesame", "Wheat"],
+        "columns": ["Crop", "Country", "month_mask"]
+    }
+    
+    Only the selected columns are exported (default: the upload's columns
+    and month_mask; for JSON, every field of the records), with month_mask
+    as 12 binary digits.
+    
+    Admitted as heavy work. XLSX workbooks are built on the heavy-work pool
+    before the response starts and only read back while streaming; CSV and
+    JSON are generated as they stream.
+    """
+    try:
+        if format not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+        
+        with db.connection() as conn:
+            c = conn.cursor()
+            parse_id, where, params = resolve_record_selection(
+                c, upload_id, export_req.column_name, export_req.values, "exporting"
+            )
+            
+            c.execute(f"SELECT COUNT(*) FROM records WHERE {where}", params)
+            total_records = c.fetchone()[0]
+            c.execute("SELECT column_name FROM parse_columns WHERE parse_id = ? ORDER BY position", (parse_id,))
+            upload_columns = [row[0] for row in c.fetchall()]
+        
+        columns = export_req.columns or None
+        batches = iter_filter_batches(where, params)
+        if format == "json":
+            content = iter_json_export(batches, columns, total_records)
+        else:
+            columns = columns or upload_columns + ["month_mask"]
+            if format == "csv":
+                content = iter_csv_export(batches, columns)
+            else:
+                content = iter_file_chunks(build_xlsx_export(batches, columns, total_records))
+        
+        return StreamingResponse(
+            content,
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{export_filename(format)}"'}
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
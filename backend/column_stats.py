@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+from typing import Dict, List
+
+import pandas as pd
+
+from value_search import delete_value_search
+
+# ==================== COLUMN STATISTICS CATALOG ====================
+#
+# Per-column statistics of an upload's source (its content plus the table
+# read from it), computed in one pass over the DataFrame and kept in the
+# database, so the grouping UI never re-reads the file: distinct count,
+# the sorted value -> count dictionary, null count, pandas dtype and an
+# inferred value type. Sources are content-addressed like blobs, so every
+# upload of the same file shares one catalog.
+#
+# Value dictionaries of up to COLUMN_VALUES_INLINE_MAX entries are stored
+# inline as JSON; larger ones are spilled to column_values, one row per
+# value, and read back in value order.
+
+COLUMN_VALUES_INLINE_MAX = int(os.getenv("COLUMN_VALUES_INLINE_MAX", 1000))
+
+STATS_BATCH_SIZE = 5000
+
+BOOLEAN_WORDS = {'true', 'false', 'yes', 'no'}
+
+# Numeric dates with an optional time part: 2020-01-31, 31/01/2020, 1.31.20 12:00
+DATE_PATTERN = r'^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}(:\d{2})?)?\s*$'
+
+def infer_value_type(values: pd.Index) -> str:
+    """
+    Type of a column's distinct non-blank values: 'integer', 'number',
+    'boolean', 'date' or 'string' ('empty' when there are none).
+    """
+    texts = pd.Series(values, dtype=object).astype(str).str.strip()
+    texts = texts[texts != '']
+    if texts.empty:
+        return 'empty'
+    if texts.str.match(r'^[+-]?\d+$').all():
+        return 'integer'
+    if pd.to_numeric(texts, errors='coerce').notna().all():
+        return 'number'
+    if texts.str.lower().isin(BOOLEAN_WORDS).all():
+        return 'boolean'
+    if texts.str.match(DATE_PATTERN).all():
+        return 'date'
+    return 'string'
+
+def sorted_value_counts(series: pd.Series) -> pd.Series:
+    """
+    Counts of a column's non-null values by their text, ordered by it.
+    Values that stringify alike (1 and "1") are counted as one.
+    """
+    counts = series.value_counts(sort=False)
+    if not all(isinstance(value, str) for value in counts.index):
+        counts = counts.groupby(counts.index.astype(str)).sum()
+    return counts.sort_index()
+
+def compute_column_stats(df: pd.DataFrame) -> List[Dict]:
+    """
+    Statistics of every column of df, in column order. null_count counts
+    missing and blank values; blank strings are still listed as a value,
+    as value_counts lists them.
+    """
+    stats = []
+    for position, col in enumerate(df.columns):
+        series = df[col]
+        counts = sorted_value_counts(series)
+        blank = pd.Series(counts.index, dtype=object).str.strip().eq('').to_numpy()
+        stats.append({
+            "name": str(col),
+            "position": position,
+            "dtype": str(series.dtype),
+            "inferred_type": infer_value_type(counts.index[~blank]),
+            "row_count": len(series),
+            "distinct_count": len(counts),
+            "null_count": int(len(series) - counts.sum() + counts[blank].sum()),
+            "values": counts
+        })
+    return stats
+
+def store_column_stats(c: sqlite3.Cursor, source_key: str, content_key: str, stats: List[Dict]):
+    """Write (or replace) the catalog of a source"""
+    delete_source_stats(c, source_key)
+    for column in stats:
+        counts = column["values"]
+        spilled = len(counts) > COLUMN_VALUES_INLINE_MAX
+        values_json = None if spilled else json.dumps(dict(zip(counts.index, counts.tolist())))
+        c.execute("""INSERT INTO column_stats
+                    (source_key, column_name, content_key, position, dtype, inferred_type,
+                     row_count, distinct_count, null_count, values_json)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                 (source_key, column["name"], content_key, column["position"], column["dtype"],
+                  column["inferred_type"], column["row_count"], column["distinct_count"],
+                  column["null_count"], values_json))
+        if not spilled:
+            continue
+        rows = [(source_key, column["name"], value, count)
+                for value, count in zip(counts.index, counts.tolist())]
+        for start in range(0, len(rows), STATS_BATCH_SIZE):
+            c.executemany("""INSERT INTO column_values (source_key, column_name, value, value_count)
+                            VALUES (?, ?, ?, ?)""", rows[start:start + STATS_BATCH_SIZE])
+
+def has_column_stats(c: sqlite3.Cursor, source_key: str) -> bool:
+    """Whether a source's catalog has been computed"""
+    c.execute("SELECT 1 FROM column_stats WHERE source_key = ? LIMIT 1", (source_key,))
+    return c.fetchone() is not None
+
+def delete_source_stats(c: sqlite3.Cursor, source_key: str):
+    delete_value_search(c, source_key)
+    c.execute("DELETE FROM column_values WHERE source_key = ?", (source_key,))
+    c.execute("DELETE FROM column_stats WHERE source_key = ?", (source_key,))
+
+def release_column_stats(c: sqlite3.Cursor, content_key: str):
+    """Drop the catalogs of every table of a stored file"""
+    c.execute("SELECT DISTINCT source_key FROM column_stats WHERE content_key = ?", (content_key,))
+    for (source_key,) in c.fetchall():
+        delete_source_stats(c, source_key)
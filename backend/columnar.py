@@ -0,0 +1,91 @@
+import glob
+import hashlib
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - pyarrow is optional
+    HAS_PYARROW = False
+
+# ==================== COLUMNAR COPIES ====================
+#
+# Every upload gets an uncompressed Arrow IPC (Feather v2) copy written next
+# to the original file. Uncompressed IPC can be memory-mapped, so reading a
+# single column only pages in that column's buffers instead of re-parsing
+# the whole CSV/XLSX/XML. A file gets one copy per table (Excel sheet, XML
+# record path) that was read.
+
+COLUMNAR_SUFFIX = ".arrow"
+
+def columnar_path_for(file_path: str, source_table: Optional[str] = None) -> str:
+    """Path of the columnar copy that belongs to an uploaded file (or one of its tables)"""
+    if source_table is None:
+        return file_path + COLUMNAR_SUFFIX
+    # Sheet names and record paths may contain characters that aren't safe in file names
+    table_key = hashlib.sha1(source_table.encode("utf-8")).hexdigest()[:16]
+    return f"{file_path}.table-{table_key}{COLUMNAR_SUFFIX}"
+
+def has_columnar_copy(file_path: str, source_table: Optional[str] = None) -> bool:
+    """True if an up-to-date columnar copy exists for the file"""
+    if not HAS_PYARROW:
+        return False
+    path = columnar_path_for(file_path, source_table)
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(file_path).st_mtime_ns
+    except OSError:
+        return False
+
+def write_columnar_copy(df: pd.DataFrame, file_path: str, source_table: Optional[str] = None) -> Optional[str]:
+    """
+    Write df as an Arrow IPC file next to file_path.
+    Returns the written path, or None if pyarrow is unavailable or the
+    frame can't be converted (the original file is still used then).
+    """
+    if not HAS_PYARROW:
+        return None
+
+    path = columnar_path_for(file_path, source_table)
+    tmp_path = path + ".tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+def read_columnar_copy(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    source_table: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Load the columnar copy memory-mapped, optionally projecting to columns.
+    Requested columns that don't exist are skipped.
+    """
+    path = columnar_path_for(file_path, source_table)
+    if columns is not None:
+        available = set(read_columnar_columns(file_path, source_table))
+        columns = [col for col in columns if col in available]
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+def read_columnar_columns(file_path: str, source_table: Optional[str] = None) -> List[str]:
+    """Column names of the columnar copy, read from the file footer only"""
+    with pa.memory_map(columnar_path_for(file_path, source_table)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def remove_columnar_copy(file_path: str) -> None:
+    """Remove the file's columnar copies, including those of its tables"""
+    paths = [columnar_path_for(file_path)]
+    paths += glob.glob(glob.escape(file_path) + ".table-*" + COLUMNAR_SUFFIX)
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,122 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# ==================== DATAFRAME CACHE ====================
+
+class DataFrameCache:
+    """
+    Process-wide LRU cache of parsed upload DataFrames.
+
+    Entries are keyed by the upload's stored file path and table (deduplicated
+    uploads share one file, hence one entry) and validated against the file's mtime,
+    so a file rewritten on disk is re-read on the next access. Eviction is
+    driven by a byte budget (pandas deep memory usage), oldest entry first.
+
+    Cached DataFrames are shared between requests and must not be mutated
+    in place by callers.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[int, pd.DataFrame, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(
+        self,
+        file_path: str,
+        loader: Callable[[str], Tuple[pd.DataFrame, str]],
+        source_table: Optional[str] = None
+    ) -> Tuple[pd.DataFrame, str]:
+        """Return (dataframe, file_type) for a file, loading it on a miss"""
+        mtime = os.stat(file_path).st_mtime_ns
+        key = (file_path, source_table)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        # Load outside the lock so a slow parse doesn't block other uploads
+        df, file_type = loader(file_path)
+        self.put(file_path, df, file_type, mtime=mtime, source_table=source_table)
+        return df, file_type
+
+    def peek(self, file_path: str, source_table: Optional[str] = None) -> Optional[Tuple[pd.DataFrame, str]]:
+        """Return the cached (dataframe, file_type) if fresh, without loading on a miss"""
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return None
+        key = (file_path, source_table)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != mtime:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(
+        self,
+        file_path: str,
+        df: pd.DataFrame,
+        file_type: str,
+        mtime: Optional[int] = None,
+        source_table: Optional[str] = None
+    ) -> None:
+        """Insert or replace the cached DataFrame for a file (or one of its tables)"""
+        if mtime is None:
+            mtime = os.stat(file_path).st_mtime_ns
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        key = (file_path, source_table)
+
+        with self._lock:
+            self._discard(key)
+            # A single frame larger than the whole budget is never cached
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (mtime, df, file_type, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                evicted_key = next(iter(self._entries))
+                self._discard(evicted_key)
+                self.evictions += 1
+
+    def invalidate(self, file_path: str) -> None:
+        """Drop a file and all of its tables from the cache (e.g. after delete)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == file_path]:
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _discard(self, key: Tuple[str, Optional[str]]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
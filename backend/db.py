@@ -0,0 +1,146 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List
+
+import aiosqlite
+from fastapi import HTTPException
+
+# ==================== DATABASE ACCESS ====================
+
+# Applied to every connection when it is opened (WAL itself is set once in init_db)
+CONNECTION_PRAGMAS = {
+    # Wait for a concurrent writer instead of failing with "database is locked";
+    # longer than the write phase of a large parse
+    "busy_timeout": 30000,
+    "synchronous": "NORMAL",  # Safe with WAL
+    "cache_size": -16000,     # 16 MB page cache (negative = KiB)
+    "temp_store": "MEMORY"
+}
+
+# Compiled statements kept per connection; pooled connections keep them between requests
+STATEMENT_CACHE_SIZE = 256
+
+# Seconds a client is told to wait before retrying when no connection was free
+POOL_RETRY_AFTER = 1
+
+def open_connection(path: str) -> sqlite3.Connection:
+    """
+    Open a configured connection.
+    Not bound to the opening thread: pooled connections are handed from one
+    worker thread to the next, but only ever used by one at a time.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+class PoolExhausted(HTTPException):
+    """503 with a Retry-After hint; raised when no pooled connection frees up in time"""
+
+    def __init__(self, timeout: float):
+        super().__init__(status_code=503,
+                         detail=f"No database connection available after {timeout:g}s, try again shortly",
+                         headers={"Retry-After": str(POOL_RETRY_AFTER)})
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite3 connections for the sync endpoints.
+
+    connection() lends a connection for the duration of a with block; at
+    most size are open at once, and callers wait up to timeout seconds for
+    a free one beyond that (PoolExhausted after).
+    Work the caller did not commit is rolled back when the connection comes
+    back, so an exception never leaks a connection or an open transaction.
+    """
+
+    def __init__(self, path: str, size: int, timeout: float):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhausted(self.timeout)
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = open_connection(self.path)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections (connections in use are closed when returned)"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class AsyncConnectionPool:
+    """
+    Bounded pool of aiosqlite connections for async endpoints.
+
+    Each aiosqlite connection runs its queries on its own thread, so async
+    endpoints wait on the database without holding a worker of the default
+    threadpool (which the sync endpoints share). Waits for a free connection
+    are bounded by timeout the same way as in ConnectionPool.
+    """
+
+    def __init__(self, path: str, size: int, timeout: float):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[aiosqlite.Connection] = []
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhausted(self.timeout)
+        try:
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = aiosqlite.connect(self.path, cached_statements=STATEMENT_CACHE_SIZE)
+                conn.daemon = True  # Idle pooled connections must not keep the process alive
+                await conn
+                for name, value in CONNECTION_PRAGMAS.items():
+                    await conn.execute(f"PRAGMA {name} = {value}")
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    await conn.rollback()
+                if self._closed:
+                    await conn.close()
+                else:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Close the idle connections (connections in use are closed when returned)"""
+        self._closed = True
+        while self._idle:
+            await self._idle.pop().close()
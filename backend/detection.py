@@ -0,0 +1,213 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from parsing import MONTH_NAMES
+
+# ==================== COLUMN DETECTION HEURISTICS ====================
+
+COLUMN_KEYWORDS = {
+    'crop_name': [
+        'crop', 'crop name', 'crop type', 'commodity', 'product', 'species',
+        'plant', 'variety', 'cultivar', 'item', 'produce', 'culture'
+    ],
+    'country': [
+        'country', 'nation', 'region', 'location', 'place', 'state', 'province',
+        'area', 'zone', 'territory', 'land', 'country code', 'nation code'
+    ],
+    'season': [
+        'season', 'period', 'phase', 'timing', 'cycle', 'growth', 'stage',
+        'stage name', 'period name', 'season name'
+    ],
+    'harvest_calendar': [
+        'harvest', 'harvest calendar', 'harvest period', 'harvest months',
+        'harvest season', 'calendar', 'months', 'month', 'growing period',
+        'growing months', 'season calendar', 'schedule', 'timing', 'duration',
+        'date', 'dates', 'start', 'end', 'from', 'to', 'period', 'calendar period'
+    ],
+    'start_date': [
+        'start', 'start date', 'from date', 'begin', 'begin date', 'commence',
+        'start month', 'start date', 'sowing', 'planting', 'plantation'
+    ],
+    'end_date': [
+        'end', 'end date', 'to date', 'finish', 'finish date', 'complete',
+        'end month', 'harvest', 'harvest date', 'completion', 'deadline'
+    ],
+    'allYear': [
+        'all year', 'allyear', 'year round', 'year-round', 'perennial', 'continuous',
+        'all months', 'always', 'permanent', 'annual crop'
+    ],
+    'currentYear': [
+        'year', 'current year', 'year data', 'data year', 'year reference', 'harvest year',
+        'year identifier', 'year of', 'year value', 'season year'
+    ]
+}
+
+COLUMN_TYPES = list(COLUMN_KEYWORDS)
+TYPE_INDEX = {col_type: i for i, col_type in enumerate(COLUMN_TYPES)}
+
+# Only types scoring above this are reported as detected
+DETECTION_THRESHOLD = 0.3
+PARTIAL_MATCH_SCORE = 0.7
+
+MONTH_NAME_PATTERN = re.compile("|".join(sorted(map(re.escape, MONTH_NAMES), key=len, reverse=True)))
+NUMERIC_RANGE_PATTERN = re.compile(r'\d+\s*-\s*\d+')
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over keywords, each tagged with a bitmask of the
+    column types it belongs to.
+
+    One pass over a header finds every keyword it contains. The automaton's
+    trie also answers which keywords equal the header and which start with it.
+    """
+
+    def __init__(self, keyword_types: Dict[str, int]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._ends: List[List[Tuple[int, int]]] = [[]]  # (keyword length, type mask) ending at a node
+        self._exact: List[int] = [0]    # types of the keyword spelled by the node
+        self._subtree: List[int] = [0]  # types of every keyword below the node
+
+        for keyword, mask in keyword_types.items():
+            node = 0
+            self._subtree[0] |= mask
+            for char in keyword:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._ends.append([])
+                    self._exact.append(0)
+                    self._subtree.append(0)
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+                self._subtree[node] |= mask
+            self._exact[node] |= mask
+            self._ends[node].append((len(keyword), mask))
+
+        # Breadth-first failure links; a node also reports its failure chain's keywords
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._ends[child] = self._ends[child] + self._ends[self._fail[child]]
+                pending.append(child)
+
+    def matches(self, text: str) -> Iterable[Tuple[int, int, int]]:
+        """(end index, keyword length, type mask) for every keyword occurrence in text"""
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, mask in self._ends[node]:
+                yield end, length, mask
+
+    def _walk(self, text: str) -> Optional[int]:
+        node = 0
+        for char in text:
+            node = self._goto[node].get(char)
+            if node is None:
+                return None
+        return node
+
+    def exact_types(self, text: str) -> int:
+        """Types with a keyword equal to text"""
+        node = self._walk(text)
+        return self._exact[node] if node is not None else 0
+
+    def prefix_of_types(self, text: str) -> int:
+        """Types with a keyword that starts with text"""
+        node = self._walk(text)
+        return self._subtree[node] if node is not None else 0
+
+def _build_matcher() -> KeywordMatcher:
+    keyword_types: Dict[str, int] = {}
+    for col_type, keywords in COLUMN_KEYWORDS.items():
+        for keyword in keywords:
+            keyword_types[keyword] = keyword_types.get(keyword, 0) | (1 << TYPE_INDEX[col_type])
+    return KeywordMatcher(keyword_types)
+
+KEYWORD_MATCHER = _build_matcher()
+
+@lru_cache(maxsize=8192)
+def header_scores(header: str) -> Tuple[float, ...]:
+    """
+    Score 0.0-1.0 per type (COLUMN_TYPES order) for how well a header
+    matches the type's keywords:
+    1.0 for an exact keyword, len(keyword) / len(header) for a keyword the
+    header contains, PARTIAL_MATCH_SCORE when the header starts a keyword
+    or a keyword starts the header. Memoized: headers repeat across files.
+    """
+    header_lower = header.lower().strip()
+    exact = KEYWORD_MATCHER.exact_types(header_lower)
+
+    # Header starts a keyword, or a keyword occurs at the start of the header
+    partial = KEYWORD_MATCHER.prefix_of_types(header_lower)
+    longest = [0] * len(COLUMN_TYPES)
+    for end, length, mask in KEYWORD_MATCHER.matches(header_lower):
+        if end == length:
+            partial |= mask
+        for i in range(len(COLUMN_TYPES)):
+            if mask >> i & 1 and length > longest[i]:
+                longest[i] = length
+
+    scores = []
+    for i in range(len(COLUMN_TYPES)):
+        if exact >> i & 1:
+            scores.append(1.0)
+            continue
+        score = longest[i] / len(header_lower) if longest[i] else 0.0
+        if partial >> i & 1:
+            score = max(score, PARTIAL_MATCH_SCORE)
+        scores.append(score)
+    return tuple(scores)
+
+def score_column(header: str, sample_values: List[str]) -> Dict[str, float]:
+    """Score 0.0-1.0 per column type from the header and sample values"""
+    scores = dict(zip(COLUMN_TYPES, header_scores(str(header))))
+    sample_text = " ".join(str(v).lower() for v in sample_values if v)
+    if MONTH_NAME_PATTERN.search(sample_text):
+        scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.3)
+    if NUMERIC_RANGE_PATTERN.search(sample_text):
+        scores['harvest_calendar'] = min(1.0, scores['harvest_calendar'] + 0.2)
+        scores['start_date'] = min(1.0, scores['start_date'] + 0.15)
+        scores['end_date'] = min(1.0, scores['end_date'] + 0.15)
+    return scores
+
+def detect_column(header: str, sample_values: List[str]) -> Tuple[Optional[str], float]:
+    """
+    Detect a column's type from its header and sample values.
+    Returns (detected_type, confidence); detected_type is None when the best
+    score is not above DETECTION_THRESHOLD.
+    """
+    scores = score_column(header, sample_values)
+    top_type = max(scores, key=scores.get)
+    confidence = scores[top_type]
+    return (top_type if confidence > DETECTION_THRESHOLD else None), confidence
+
+def get_sample_values(df: pd.DataFrame, column: str, n: int = 5) -> List[str]:
+    """Get first n distinct non-null values from a column"""
+    values = df[column].dropna()
+    # First-seen order: the distinct values of a prefix start like those of the
+    # whole column, so only scan as far as needed to find n of them
+    prefix = max(n * 20, 100)
+    while True:
+        distinct = pd.unique(values.iloc[:prefix])
+        if len(distinct) >= n or prefix >= len(values):
+            return [str(v) for v in distinct[:n]]
+        prefix *= 4
+
+def auto_detect_columns(df: pd.DataFrame) -> Dict[str, Optional[str]]:
+    """
+    Auto-detect column types for all columns in dataframe.
+    Returns dict: {column_name: detected_type}
+    """
+    return {column: detect_column(column, get_sample_values(df, column))[0] for column in df.columns}
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# ==================== EXCEL READING ====================
+#
+# Workbooks are opened in openpyxl's read-only mode, which streams rows from
+# the sheet XML instead of building every cell object up front. Rows are
+# turned into DataFrames EXCEL_CHUNK_ROWS at a time, with the same values
+# pd.read_excel(dtype=str, keep_default_na=False) produced for the first
+# sheet: numbers as strings ('3', '2.5'), empty cells as '', blank rows
+# inside the data kept, trailing blank rows dropped.
+
+EXCEL_CHUNK_ROWS = 10000
+
+def list_sheets(file_path: str) -> List[str]:
+    """Worksheet names in workbook order (only the workbook index is read)"""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def convert_cell(value):
+    """A cell value as pandas' openpyxl reader returns it"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_sheet_rows(file_path: str, sheet: Optional[str] = None) -> Iterator[list]:
+    """
+    Converted rows of a sheet (the first sheet by default), header row first.
+    Trailing empty cells are trimmed; blank rows are held back until a row
+    with data follows them, so trailing blank rows never come out.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if sheet is None:
+            worksheet = workbook.worksheets[0]
+        elif sheet in workbook.sheetnames:
+            worksheet = workbook[sheet]
+        else:
+            raise ValueError(f"Sheet '{sheet}' not found")
+
+        blank_rows = 0
+        for cells in worksheet.iter_rows(values_only=True):
+            row = [convert_cell(value) for value in cells]
+            while row and row[-1] == "":
+                row.pop()
+            if not row:
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield []
+            blank_rows = 0
+            yield row
+    finally:
+        workbook.close()
+
+def header_names(header: list, width: int) -> list:
+    """Column names for a header row, named and de-duplicated like pandas ('Unnamed: 1', 'Crop.1')"""
+    names = [name if name != "" else f"Unnamed: {i}" for i, name in enumerate(header)]
+    names += [f"Unnamed: {i}" for i in range(len(header), width)]
+
+    counts = defaultdict(int)
+    for i, name in enumerate(names):
+        base, count = name, counts[name]
+        while count > 0:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            count = count + 1 if name in names else counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def rows_to_frame(header: list, rows: List[list]) -> pd.DataFrame:
+    """String DataFrame of converted rows, padded to the widest of them and the header"""
+    width = max([len(header)] + [len(row) for row in rows])
+    data = [[str(value) for value in row] + [""] * (width - len(row)) for row in rows]
+    return pd.DataFrame(data, columns=header_names(header, width), dtype=object)
+
+def iter_excel_chunks(
+    file_path: str,
+    sheet: Optional[str] = None,
+    nrows: Optional[int] = None,
+    chunk_rows: int = EXCEL_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a sheet as string DataFrames of up to chunk_rows rows each,
+    stopping after nrows data rows. A row wider than the header adds
+    'Unnamed: n' columns from its chunk on (earlier chunks lack them).
+    """
+    rows = iter_sheet_rows(file_path, sheet)
+    header = next(rows, None)
+    if header is None:
+        return
+    if nrows is not None:
+        rows = islice(rows, nrows)
+
+    emitted = False
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk and emitted:
+            return
+        emitted = True
+        yield rows_to_frame(header, chunk)
+        if len(chunk) < chunk_rows:
+            return
+
+def read_excel_sheet(file_path: str, sheet: Optional[str] = None, nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read a sheet (or its first nrows data rows) into one string DataFrame"""
+    chunks = list(iter_excel_chunks(file_path, sheet, nrows))
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    # Columns only some chunks have are empty in the others' rows
+    return df.fillna("") if len({len(chunk.columns) for chunk in chunks}) > 1 else df
+
+def sample_excel_sheet(file_path: str, sheet: Optional[str], nrows: int) -> Tuple[pd.DataFrame, int]:
+    """
+    The first nrows data rows of a sheet and its exact data row count, in
+    one streaming pass.
+    """
+    rows = iter_sheet_rows(file_path, sheet)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame(), 0
+
+    sample = list(islice(rows, nrows))
+    total_rows = len(sample) + sum(1 for _ in rows)
+    return rows_to_frame(header, sample), total_rows
+
+def count_excel_rows(file_path: str, sheet: Optional[str] = None) -> int:
+    """Exact data row count of a sheet, as read_excel_sheet would return"""
+    return max(0, sum(1 for _ in iter_sheet_rows(file_path, sheet)) - 1)
@@ -0,0 +1,169 @@
+import csv
+import io
+import math
+import tempfile
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from record_formats import dumps
+
+# ==================== EXPORTS ====================
+#
+# Exports are written from batches of records as they come out of the
+# database, in the layouts the frontend's export buttons produced: only
+# the selected columns, and month_mask as a 12-digit binary string.
+# Missing values (None, or NaN from a file's empty cells) are empty cells
+# in CSV/XLSX and null in JSON.
+# CSV and JSON are generated piece by piece; XLSX rows go through
+# openpyxl's write-only mode (spilled to disk, not kept as cell objects),
+# and the finished file is streamed back from a temporary file. Building
+# the workbook is CPU-bound, so it runs on the heavy-work pool before the
+# response starts.
+
+EXPORT_STREAM_CHUNK = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'json': 'application/json'
+}
+
+def export_filename(format: str) -> str:
+    """Download name, as the frontend named its exports"""
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    if format == 'json':
+        return f"crop-gantt-data-{timestamp}.json"
+    return f"crop-gantt-export-{timestamp}.{format}"
+
+def render_mask(month_mask: Optional[int]) -> str:
+    """Month mask as 12 binary digits (December first), an empty cell without months"""
+    if not month_mask:
+        return ''
+    return format(month_mask, '012b')
+
+def export_record(record: Dict) -> Dict:
+    """A filter record as exported: without parsed_data, with its month mask in binary"""
+    exported = {key: value for key, value in record.items() if key != 'parsed_data'}
+    # The frontend's JSON export always wrote all 12 digits, zeros included
+    exported['month_mask'] = format(record.get('month_mask') or 0, '012b')
+    return exported
+
+def is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def export_row(record: Dict, columns: List[str]) -> List[str]:
+    """Values of the selected columns; missing ones are empty"""
+    row = []
+    for column in columns:
+        if column == 'month_mask':
+            row.append(render_mask(record.get('month_mask')))
+        else:
+            value = record.get(column)
+            row.append('' if is_missing(value) else str(value))
+    return row
+
+def iter_csv_export(batches: Iterable[List[Dict]], columns: List[str]) -> Iterator[str]:
+    """CSV text: a header row, then one row per record, a batch at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(export_row(record, columns) for record in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_json_export(
+    batches: Iterable[List[Dict]],
+    columns: Optional[List[str]],
+    total_records: int
+) -> Iterator[str]:
+    """
+    JSON document with export metadata and the records. Without a column
+    selection every field of the records is exported.
+    """
+    header = {
+        "format": "Crop Calendar Gantt Export",
+        "exportDate": datetime.now().isoformat(),
+        "totalRecords": total_records,
+        "columns": columns
+    }
+    yield dumps(header).decode()[:-1] + ',"records":['
+    first = True
+    for batch in batches:
+        parts = []
+        for record in batch:
+            if columns is None:
+                exported = export_record(record)
+            else:
+                exported = dict(zip(columns, export_row(record, columns)))
+            parts.append(("" if first else ",") + dumps(exported).decode())
+            first = False
+        yield "".join(parts)
+    yield "]}"
+
+def _styled(ws, value, font: Font, fill: Optional[PatternFill] = None) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    return cell
+
+def write_xlsx_export(
+    batches: Iterable[List[Dict]],
+    columns: List[str],
+    total_records: int,
+    target
+):
+    """
+    Write the export workbook to target (a path or binary file): a title,
+    export metadata, a styled header row, then one row per record.
+    """
+    workbook = Workbook(write_only=True)
+    ws = workbook.create_sheet("Gantt Data")
+    for i in range(len(columns)):
+        ws.column_dimensions[get_column_letter(i + 1)].width = 18
+    ws.freeze_panes = "A8"  # Below the header row
+
+    label_font = Font(bold=True, size=11, color="FF404040")
+    ws.append([_styled(ws, "CROP CALENDAR GANTT EXPORT - DATA TABLE", Font(bold=True, size=14, color="FF1F4E78"),
+                       PatternFill("solid", fgColor="FFD9E1F2"))])
+    ws.append([])
+    ws.append([_styled(ws, "Export Date:", label_font), datetime.now().strftime("%Y-%m-%d")])
+    ws.append([_styled(ws, "Total Records:", label_font), total_records])
+    ws.append([_styled(ws, "Columns:", label_font), ", ".join(columns)])
+    ws.append([])
+    header_font = Font(bold=True, size=12, color="FFFFFFFF")
+    header_fill = PatternFill("solid", fgColor="FF4472C4")
+    ws.append([_styled(ws, column, header_font, header_fill) for column in columns])
+
+    for batch in batches:
+        for record in batch:
+            ws.append(export_row(record, columns))
+    workbook.save(target)
+
+def build_xlsx_export(batches: Iterable[List[Dict]], columns: List[str], total_records: int) -> IO[bytes]:
+    """The export workbook, written to a temporary file positioned at its start"""
+    target = tempfile.TemporaryFile()
+    try:
+        write_xlsx_export(batches, columns, total_records, target)
+    except BaseException:
+        target.close()
+        raise
+    target.seek(0)
+    return target
+
+def iter_file_chunks(source: IO[bytes]) -> Iterator[bytes]:
+    """A file's bytes in chunks, closing it at the end"""
+    with source:
+        while True:
+            chunk = source.read(EXPORT_STREAM_CHUNK)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,89 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from month_mask import MASK_COUNT, mask_bits, mask_label, mask_spans
+
+# ==================== GANTT AGGREGATION ====================
+#
+# The Gantt chart shows one row per combination of grouping values, with
+# the months of all the group's records OR-ed together. Groups are
+# numbered with a pandas groupby; everything else is computed per
+# (group, mask) pair, of which there are far fewer than records since
+# only 4096 masks exist.
+
+UNKNOWN_GROUP_VALUE = 'Unknown'  # Shown for records without a grouping value
+
+def mask_segments(mask: int) -> List[Dict]:
+    """Bar segments of a mask: contiguous month runs, a run over the year end as one wrapping segment"""
+    return [
+        {
+            "start_month": start,
+            "end_month": end,
+            "wraps": start > end,
+            "length": (end - start) % 12 + 1
+        }
+        for start, end in mask_spans(mask)
+    ]
+
+def month_span(masks: np.ndarray) -> int:
+    """Months the chart needs: 12, or up to 24 to draw wrapping segments past December"""
+    span = 12
+    for mask in np.unique(masks).tolist():
+        for start, end in mask_spans(mask):
+            if start > end:
+                span = max(span, 12 + end)
+    return span
+
+def aggregate_gantt_groups(
+    keys: pd.DataFrame,
+    masks: np.ndarray,
+    row_numbers: np.ndarray,
+    include_record_ids: bool = True
+) -> List[Dict]:
+    """
+    One entry per group of records with equal keys (one column per grouping
+    column), in key order: the OR-ed month mask, per-month record counts
+    (January first), the bar segments and the records' row numbers.
+    """
+    if len(masks) == 0:
+        return []
+    masks = np.asarray(masks, dtype=np.int64)
+    row_numbers = np.asarray(row_numbers, dtype=np.int64)
+    keys = keys.fillna(UNKNOWN_GROUP_VALUE).replace('', UNKNOWN_GROUP_VALUE)
+
+    grouped = keys.groupby(list(keys.columns), sort=True)
+    codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    group_keys = grouped.size().index.to_frame(index=False).astype(str)
+    n_groups = len(group_keys)
+
+    # Months per group from its distinct masks and how many records have each
+    pairs, pair_counts = np.unique(codes * MASK_COUNT + masks, return_counts=True)
+    pair_groups, pair_masks = np.divmod(pairs, MASK_COUNT)
+    merged_masks = np.zeros(n_groups, dtype=np.int64)
+    np.bitwise_or.at(merged_masks, pair_groups, pair_masks)
+    month_counts = np.zeros((n_groups, 12), dtype=np.int64)
+    np.add.at(month_counts, pair_groups, mask_bits(pair_masks) * pair_counts[:, None])
+
+    record_counts = np.bincount(codes, minlength=n_groups)
+    ends = np.cumsum(record_counts)
+    group_rows = row_numbers[np.argsort(codes, kind='stable')]
+
+    groups = []
+    for i, key in enumerate(group_keys.itertuples(index=False, name=None)):
+        merged_mask = int(merged_masks[i])
+        group = {
+            "key": dict(zip(keys.columns, key)),
+            "label": " | ".join(key),
+            "record_count": int(record_counts[i]),
+            "month_mask": merged_mask,
+            "months": mask_label(merged_mask),
+            "month_counts": month_counts[i].tolist(),
+            "segments": mask_segments(merged_mask),
+            "first_row_number": int(group_rows[ends[i] - record_counts[i]])
+        }
+        if include_record_ids:
+            group["record_ids"] = group_rows[ends[i] - record_counts[i]:ends[i]].tolist()
+        groups.append(group)
+    return groups
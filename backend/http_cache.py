@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:  # pragma: no cover - brotli is optional
+    HAS_BROTLI = False
+
+# ==================== HTTP CACHING ====================
+#
+# Read endpoints answer conditional requests: responses carry a strong
+# ETag (and Last-Modified where there is a modification time), and a
+# request whose If-None-Match / If-Modified-Since still matches gets an
+# empty 304. Browsers and CDNs are told to store responses but revalidate
+# them every time (Cache-Control: no-cache), so a changed upload is never
+# served stale.
+#
+# Complete JSON bodies are compressed with brotli or gzip, as the client
+# accepts. A compressed body is a different representation, so its ETag
+# gets a '-br' / '-gzip' suffix (as Apache does); validators with the
+# suffix still match the uncompressed tag.
+
+# Bumped when response layouts change, so clients don't keep stale bodies
+CACHE_VERSION = "1"
+
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "public, no-cache")
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+COMPRESSIBLE_TYPES = ("application/json", "application/vnd.apache.arrow.stream", "text/")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough to run per response, still ahead of gzip on size
+
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+def make_etag(*parts) -> str:
+    """Strong entity tag for a response determined by parts"""
+    digest = hashlib.sha256(":".join(str(part) for part in (CACHE_VERSION,) + parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def http_date(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.astimezone()  # Stored times are local
+    return format_datetime(moment.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+def opaque_tag(tag: str) -> str:
+    """An entity tag as compared for If-None-Match: without W/ and any encoding suffix"""
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES.values():
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+def matching_etag(headers: Headers, etag: str, last_modified: Optional[datetime] = None) -> Optional[str]:
+    """
+    The validator the client already holds when its copy is current (the
+    If-None-Match tag that matched, or etag for If-Modified-Since), else None.
+    If-Modified-Since only counts without If-None-Match.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return etag
+        for tag in if_none_match.split(","):
+            if opaque_tag(tag) == opaque_tag(etag):
+                return tag.strip()
+        return None
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        modified = last_modified if last_modified.tzinfo else last_modified.astimezone()
+        if modified.replace(microsecond=0) <= since:
+            return etag
+    return None
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return set_validators(Response(status_code=304), etag, last_modified)
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Content codings named in an Accept-Encoding header, with their q-values"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name, params = name.strip().lower(), params.strip()
+        if not name:
+            continue
+        try:
+            accepted[name] = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            accepted[name] = 0.0
+    return accepted
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The coding to send: the client's highest-rated one, brotli winning ties"""
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best = max(("br", "gzip") if HAS_BROTLI else ("gzip",), key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """
+    Compress complete JSON/text responses of COMPRESS_MIN_BYTES or more with
+    the client's preferred coding (brotli, then gzip). Streamed responses
+    and responses that are already encoded pass through unchanged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            body = message.get("body", b"")
+            compressible = (
+                content_type.startswith(COMPRESSIBLE_TYPES)
+                and "content-encoding" not in headers
+                and start["status"] == 200
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if (not compressible or message.get("more_body", False)
+                    or encoding is None or len(body) < COMPRESS_MIN_BYTES):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = etag[:-1] + ENCODING_SUFFIXES[encoding] + '"'
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import numpy as np
+
+from parsing import build_record, iter_raw_json
+
+# ==================== BULK RECORD INGESTION ====================
+#
+# Ingestion has two steps. Staging builds the rows (serializing every
+# record, the bulk of the work) into a TEMP table, which doesn't lock the
+# database. The ingest proper then copies them into records in SQL and
+# indexes them, inside the parse's write transaction, which stays short.
+
+INGEST_BATCH_SIZE = 5000
+
+# Bumped when the records layout changes; parse results written with another
+# version are rebuilt on their next parse
+RECORDS_VERSION = 3
+
+# Columns with more distinct values than this get no value postings
+# (ids, free text); filters on them scan the parse's raw_json instead
+FILTER_INDEX_MAX_UNIQUE = int(os.getenv("FILTER_INDEX_MAX_UNIQUE", 10000))
+
+# Per-connection settings for write-heavy work (WAL itself is set once in init_db)
+INGEST_PRAGMAS = {
+    "synchronous": "NORMAL",  # Safe with WAL; fsync at checkpoints instead of every commit
+    "cache_size": -64000,     # 64 MB page cache (negative = KiB)
+    "mmap_size": 268435456,   # 256 MB memory-mapped reads
+    "temp_store": "MEMORY"
+}
+
+RECORD_COLUMNS = """upload_id, parse_id, row_number, raw_json, normalized_json,
+                    month_mask, crop_name, country, requires_review, review_reason, is_harvest"""
+
+RECORD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_records_parse ON records (parse_id, row_number)",
+    # Month-window queries seek the masks overlapping a window (see parse_masks)
+    "CREATE INDEX IF NOT EXISTS idx_records_mask ON records (parse_id, month_mask, row_number)",
+    "CREATE INDEX IF NOT EXISTS idx_records_crop ON records (parse_id, crop_name, row_number)"
+]
+
+def apply_ingest_pragmas(conn: sqlite3.Connection):
+    """Tune a connection for bulk loading"""
+    for name, value in INGEST_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+def ensure_record_indexes(c: sqlite3.Cursor):
+    """
+    Create the records indexes if missing.
+    Called after a load, so a fresh table is indexed in one pass instead of
+    maintaining the B-trees row by row.
+    """
+    for statement in RECORD_INDEXES:
+        c.execute(statement)
+
+def harvest_flags(df: pd.DataFrame) -> np.ndarray:
+    """
+    Harvesting-only rule: when the file has a crop process column, only rows
+    whose process mentions "harvesting" count; otherwise every row does.
+    """
+    process_cols = [col for col in df.columns
+                    if 'cropprocess' in str(col).lower() or 'crop_process' in str(col).lower()]
+    if not process_cols:
+        return np.ones(len(df), dtype=bool)
+    values = df[process_cols[0]]
+    flags = values.astype(str).str.lower().str.contains('harvesting', na=False).to_numpy(dtype=bool)
+    return flags & values.notna().to_numpy()
+
+def iter_record_rows(
+    upload_id: str,
+    parse_id: str,
+    df: pd.DataFrame,
+    normalized: Dict
+) -> Iterator[Tuple]:
+    """
+    Yield INSERT parameter tuples for the valid rows of a normalized DataFrame.
+    Uses raw_json from normalized when the parallel parser already serialized it.
+    """
+    valid = normalized['valid']
+    row_numbers = normalized['row_number'].tolist()
+    month_masks = normalized['month_mask'].tolist()
+    requires_review = normalized['requires_review'].tolist()
+    review_reasons = normalized['review_reason'].tolist()
+    no_values = [None] * len(df)
+    crop_names = normalized['fields'].get('crop_name', no_values)
+    countries = normalized['fields'].get('country', no_values)
+    harvesting = harvest_flags(df).tolist()
+    dumps = json.dumps
+
+    raw_rows = normalized['raw_json'] if 'raw_json' in normalized else iter_raw_json(df)
+
+    for i, raw_json in enumerate(raw_rows):
+        if valid[i]:
+            yield (upload_id, parse_id, row_numbers[i], raw_json, dumps(build_record(normalized, i)),
+                   month_masks[i], crop_names[i], countries[i], int(requires_review[i]),
+                   review_reasons[i], int(harvesting[i]))
+
+def bulk_insert_records(
+    c: sqlite3.Cursor,
+    rows: Iterable[Tuple],
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_batch: Optional[Callable[[int], None]] = None,
+    table: str = "records"
+) -> int:
+    """
+    Insert record tuples into table (records or the staging table) with
+    executemany in batches.
+    Runs inside the caller's transaction; the caller commits once at the end.
+    on_batch(rows_inserted_so_far) is called after every batch.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        c.executemany(f"INSERT INTO {table} ({RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        inserted += len(batch)
+        if on_batch:
+            on_batch(inserted)
+    return inserted
+
+def store_parse_masks(c: sqlite3.Cursor, parse_id: str, masks: np.ndarray):
+    """Record which distinct month masks a parse contains, with their row counts"""
+    values, counts = np.unique(masks, return_counts=True)
+    c.execute("DELETE FROM parse_masks WHERE parse_id = ?", (parse_id,))
+    c.executemany(
+        "INSERT INTO parse_masks (parse_id, month_mask, record_count) VALUES (?, ?, ?)",
+        [(parse_id, int(mask), int(count)) for mask, count in zip(values, counts)]
+    )
+
+def encode_row_numbers(row_numbers: np.ndarray) -> bytes:
+    return np.asarray(row_numbers, dtype='<i4').tobytes()
+
+def decode_row_numbers(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype='<i4')
+
+def store_value_postings(
+    c: sqlite3.Cursor,
+    parse_id: str,
+    df: pd.DataFrame,
+    normalized: Dict
+) -> List[str]:
+    """
+    Index the original column values of a parse's records for filtering.
+    Writes one value_postings row per (column, non-null value) holding the
+    row numbers of the valid records with that value, for every column with
+    at most FILTER_INDEX_MAX_UNIQUE distinct values, plus the parse_columns
+    catalog. Values are stored as text, as filters send them.
+    Returns the indexed column names.
+    """
+    c.execute("DELETE FROM value_postings WHERE parse_id = ?", (parse_id,))
+    c.execute("DELETE FROM parse_columns WHERE parse_id = ?", (parse_id,))
+
+    valid = normalized['valid']
+    row_numbers = normalized['row_number']
+    indexed = []
+    for position, col in enumerate(df.columns):
+        column_name = str(col)
+        codes, uniques = pd.factorize(df[col])
+        is_indexed = len(uniques) <= FILTER_INDEX_MAX_UNIQUE
+        c.execute("""INSERT INTO parse_columns (parse_id, column_name, position, distinct_count, indexed)
+                    VALUES (?, ?, ?, ?, ?)""", (parse_id, column_name, position, len(uniques), int(is_indexed)))
+        if not is_indexed:
+            continue
+        indexed.append(column_name)
+
+        # Values that stringify alike (1 and "1") share one posting
+        text_codes, texts = pd.factorize(np.array([str(value) for value in uniques], dtype=object))
+        rows = np.flatnonzero((codes >= 0) & valid)
+        row_codes = text_codes[codes[rows]]
+        order = np.argsort(row_codes, kind='stable')
+        rows, row_codes = rows[order], row_codes[order]
+        boundaries = np.flatnonzero(np.diff(row_codes)) + 1
+        c.executemany(
+            "INSERT INTO value_postings (parse_id, column_name, value, row_count, row_numbers) VALUES (?, ?, ?, ?, ?)",
+            [(parse_id, column_name, texts[row_codes[group[0]]], len(group), encode_row_numbers(row_numbers[rows[group]]))
+             for group in np.split(np.arange(len(rows)), boundaries) if len(group)]
+        )
+    return indexed
+
+def ingest_metrics(rows: int, indexed_columns: List[str], staging_seconds: float, write_seconds: float) -> Dict:
+    elapsed = staging_seconds + write_seconds
+    return {
+        "rows": rows,
+        "indexed_columns": indexed_columns,
+        "seconds": round(elapsed, 3),
+        "write_seconds": round(write_seconds, 3),
+        "rows_per_sec": int(rows / elapsed) if elapsed > 0 else rows
+    }
+
+def stage_records(
+    c: sqlite3.Cursor,
+    upload_id: str,
+    parse_id: str,
+    df: pd.DataFrame,
+    normalized: Dict,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> float:
+    """
+    Build the records of df's valid rows into temp.staged_records for
+    ingest_records. on_batch(rows_staged_so_far) is called after every
+    batch. Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    c.execute(f"CREATE TEMP TABLE IF NOT EXISTS staged_records AS SELECT {RECORD_COLUMNS} FROM records WHERE 0")
+    c.execute("DELETE FROM temp.staged_records")
+    bulk_insert_records(c, iter_record_rows(upload_id, parse_id, df, normalized), on_batch=on_batch,
+                        table="temp.staged_records")
+    return time.perf_counter() - started
+
+def ingest_records(
+    c: sqlite3.Cursor,
+    parse_id: str,
+    df: pd.DataFrame,
+    normalized: Dict,
+    staging_seconds: float = 0.0
+) -> Dict:
+    """
+    Load the records staged by stage_records and index them.
+    Returns ingest metrics: rows, indexed_columns, seconds (staging
+    included), write_seconds and rows_per_sec.
+    """
+    started = time.perf_counter()
+    # Staged in row order already, so no sort
+    c.execute(f"""INSERT INTO records ({RECORD_COLUMNS})
+                 SELECT {RECORD_COLUMNS} FROM temp.staged_records""")
+    inserted = c.rowcount
+    c.execute("DELETE FROM temp.staged_records")
+    store_parse_masks(c, parse_id, normalized['month_mask'][normalized['valid']])
+    indexed_columns = store_value_postings(c, parse_id, df, normalized)
+    ensure_record_indexes(c)
+    return ingest_metrics(inserted, indexed_columns, staging_seconds, time.perf_counter() - started)
+
+def iter_reparse_rows(normalized: Dict) -> Iterator[Tuple]:
+    """Yield reparse_rows tuples (the mapping-dependent record columns) for the valid rows"""
+    valid = normalized['valid']
+    row_numbers = normalized['row_number'].tolist()
+    month_masks = normalized['month_mask'].tolist()
+    requires_review = normalized['requires_review'].tolist()
+    review_reasons = normalized['review_reason'].tolist()
+    no_values = [None] * len(valid)
+    crop_names = normalized['fields'].get('crop_name', no_values)
+    countries = normalized['fields'].get('country', no_values)
+    dumps = json.dumps
+
+    for i in np.flatnonzero(valid).tolist():
+        yield (row_numbers[i], dumps(build_record(normalized, i)), month_masks[i], crop_names[i], countries[i],
+               int(requires_review[i]), review_reasons[i])
+
+def stage_reparse_records(
+    c: sqlite3.Cursor,
+    normalized: Dict,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> float:
+    """
+    Write the mapping-dependent record columns of normalized's valid rows
+    into temp.reparse_rows for reingest_records. on_batch is called as in
+    stage_records. Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    c.execute("""CREATE TEMP TABLE IF NOT EXISTS reparse_rows (
+                row_number INTEGER PRIMARY KEY,
+                normalized_json TEXT,
+                month_mask INTEGER,
+                crop_name TEXT,
+                country TEXT,
+                requires_review INTEGER,
+                review_reason TEXT
+                )""")
+    c.execute("DELETE FROM temp.reparse_rows")
+
+    written = 0
+    rows = iter_reparse_rows(normalized)
+    while True:
+        batch = list(islice(rows, INGEST_BATCH_SIZE))
+        if not batch:
+            break
+        c.executemany("INSERT INTO temp.reparse_rows VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        written += len(batch)
+        if on_batch:
+            on_batch(written)
+    return time.perf_counter() - started
+
+def reingest_records(
+    c: sqlite3.Cursor,
+    upload_id: str,
+    parse_id: str,
+    base_parse_id: str,
+    normalized: Dict,
+    staging_seconds: float = 0.0
+) -> Dict:
+    """
+    Load a parse's records from an earlier parse of the same rows that has
+    the same valid rows (its mappings differ only outside the month inputs,
+    or the month parse came out with the same valid rows).
+
+    Only the mapping-dependent columns come from normalized, staged by
+    stage_reparse_records; raw_json and is_harvest are copied over in SQL,
+    and so are the value postings and column catalog, which depend on the
+    valid rows alone. Returns ingest metrics like ingest_records.
+    """
+    started = time.perf_counter()
+    c.execute(f"""
+        INSERT INTO records ({RECORD_COLUMNS})
+        SELECT ?, ?, r.row_number, r.raw_json, t.normalized_json,
+               t.month_mask, t.crop_name, t.country, t.requires_review, t.review_reason, r.is_harvest
+        FROM records r JOIN temp.reparse_rows t ON t.row_number = r.row_number
+        WHERE r.parse_id = ?
+        ORDER BY r.row_number
+    """, (upload_id, parse_id, base_parse_id))
+    inserted = c.rowcount
+    c.execute("DELETE FROM temp.reparse_rows")
+
+    store_parse_masks(c, parse_id, normalized['month_mask'][normalized['valid']])
+    c.execute("DELETE FROM value_postings WHERE parse_id = ?", (parse_id,))
+    c.execute("""INSERT INTO value_postings (parse_id, column_name, value, row_count, row_numbers)
+                SELECT ?, column_name, value, row_count, row_numbers FROM value_postings WHERE parse_id = ?""",
+             (parse_id, base_parse_id))
+    c.execute("DELETE FROM parse_columns WHERE parse_id = ?", (parse_id,))
+    c.execute("""INSERT INTO parse_columns (parse_id, column_name, position, distinct_count, indexed)
+                SELECT ?, column_name, position, distinct_count, indexed FROM parse_columns WHERE parse_id = ?""",
+             (parse_id, base_parse_id))
+    c.execute("SELECT column_name FROM parse_columns WHERE parse_id = ? AND indexed = 1 ORDER BY position",
+             (parse_id,))
+    indexed_columns = [row[0] for row in c.fetchall()]
+    ensure_record_indexes(c)
+    return {**ingest_metrics(inserted, indexed_columns, staging_seconds, time.perf_counter() - started),
+            "incremental": True}
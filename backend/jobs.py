@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# ==================== PARSE JOBS ====================
+
+ACTIVE_STATES = ('queued', 'running')
+
+class JobCancelled(Exception):
+    """Raised from a progress report once cancellation was requested"""
+
+class ParseJob:
+    """State and progress of one background parse of an upload"""
+
+    def __init__(self, upload_id: str):
+        self.job_id = str(uuid.uuid4())
+        self.upload_id = upload_id
+        self.state = 'queued'
+        self.rows_done = 0
+        self.rows_total: Optional[int] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self._cancel = threading.Event()
+
+    def start(self):
+        self.state = 'running'
+        self.started_at = time.monotonic()
+
+    def report_progress(self, rows_done: int, rows_total: int):
+        """Progress callback for the parse pipeline; raises JobCancelled when cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.rows_done = rows_done
+        self.rows_total = rows_total
+
+    def request_cancel(self) -> bool:
+        """Ask a queued/running job to stop. Returns False if it already finished."""
+        if self.state not in ACTIVE_STATES:
+            return False
+        self._cancel.set()
+        return True
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def finish(self, state: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        self.state = state
+        self.result = result
+        self.error = error
+        self.finished_at = time.monotonic()
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        throughput = None
+        eta_seconds = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+            if elapsed > 0 and self.rows_done:
+                throughput = self.rows_done / elapsed
+                if self.state == 'running' and self.rows_total:
+                    eta_seconds = round((self.rows_total - self.rows_done) / throughput, 1)
+
+        return {
+            "job_id": self.job_id,
+            "upload_id": self.upload_id,
+            "state": self.state,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "progress": round(self.rows_done / self.rows_total, 4) if self.rows_total else 0.0,
+            "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+            "rows_per_sec": int(throughput) if throughput else None,
+            "eta_seconds": eta_seconds,
+            "created_at": self.created_at,
+            "error": self.error
+        }
+
+class JobRegistry:
+    """In-memory registry of parse jobs; keeps the most recent max_jobs"""
+
+    def __init__(self, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, ParseJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, upload_id: str) -> Tuple[ParseJob, bool]:
+        """
+        Register a new job for an upload.
+        Returns (job, created); created is False when the upload already has
+        a queued/running job, which is returned instead.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.upload_id == upload_id and job.state in ACTIVE_STATES:
+                    return job, False
+
+            job = ParseJob(upload_id)
+            self._jobs[job.job_id] = job
+            self._prune()
+            return job, True
+
+    def get(self, job_id: str) -> Optional[ParseJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # Drop the oldest finished jobs beyond the limit; active jobs are kept
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [j.job_id for j in self._jobs.values() if j.state not in ACTIVE_STATES][:max(excess, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,137 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# ==================== MONTH MASK ALGEBRA ====================
+#
+# A month mask is a 12-bit integer where bit (m - 1) is set when month m
+# (1 = Jan ... 12 = Dec) is active. There are only 4096 masks, so every
+# per-mask property is precomputed once here and looked up by indexing.
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+ALL_MONTHS = 4095  # 111111111111 in binary
+MASK_COUNT = 4096
+
+_MASKS = np.arange(MASK_COUNT, dtype=np.int64)
+_BITS = (_MASKS[:, None] >> np.arange(12)) & 1  # (4096, 12) month flags per mask
+
+def _build_range_masks() -> np.ndarray:
+    """RANGE_MASKS[start - 1, end - 1]: months start..end, wrapping past Dec"""
+    table = np.zeros((12, 12), dtype=np.int64)
+    for start in range(1, 13):
+        for end in range(1, 13):
+            if start <= end:
+                months = range(start, end + 1)
+            else:
+                months = list(range(start, 13)) + list(range(1, end + 1))
+            for m in months:
+                table[start - 1, end - 1] |= 1 << (m - 1)
+    return table
+
+def _build_spans(mask: int) -> List[Tuple[int, int]]:
+    """Contiguous (start, end) month runs of a mask; a run across Dec-Jan is one span"""
+    if mask == ALL_MONTHS:
+        return [(1, 12)]
+    spans = []
+    m = 1
+    while m <= 12:
+        if mask & (1 << (m - 1)):
+            start = m
+            while m < 12 and mask & (1 << m):
+                m += 1
+            spans.append((start, m))
+        m += 1
+    # Merge Dec and Jan runs into one wrapping span (e.g. Nov-Feb)
+    if len(spans) > 1 and spans[0][0] == 1 and spans[-1][1] == 12:
+        spans = spans[1:-1] + [(spans[-1][0], spans[0][1])]
+    return spans
+
+RANGE_MASKS = _build_range_masks()
+
+MASK_LABELS = np.array(
+    [", ".join(MONTH_LABELS[m] for m in range(12) if mask & (1 << m)) for mask in range(MASK_COUNT)],
+    dtype=object
+)
+
+POPCOUNT = _BITS.sum(axis=1).astype(np.int8)
+
+# 0 for the empty mask, otherwise the month number (1-12)
+FIRST_MONTH = np.where(_MASKS > 0, _BITS.argmax(axis=1) + 1, 0).astype(np.int8)
+LAST_MONTH = np.where(_MASKS > 0, 12 - _BITS[:, ::-1].argmax(axis=1), 0).astype(np.int8)
+
+MASK_SPANS = [_build_spans(mask) for mask in range(MASK_COUNT)]
+
+def range_mask(start_month: int, end_month: int) -> int:
+    """Mask for months start..end (1-12), wrapping past December when start > end"""
+    return int(RANGE_MASKS[start_month - 1, end_month - 1])
+
+def range_masks(start_months: np.ndarray, end_months: np.ndarray) -> np.ndarray:
+    """Vectorized range_mask; months outside 1-12 give an empty mask"""
+    start_months = np.asarray(start_months, dtype=np.int64)
+    end_months = np.asarray(end_months, dtype=np.int64)
+    ok = (start_months >= 1) & (start_months <= 12) & (end_months >= 1) & (end_months <= 12)
+    result = np.zeros(start_months.shape, dtype=np.int64)
+    result[ok] = RANGE_MASKS[start_months[ok] - 1, end_months[ok] - 1]
+    return result
+
+def months_to_mask(months) -> int:
+    """Mask with the given month numbers (1-12) set"""
+    mask = 0
+    for m in months:
+        mask |= 1 << (m - 1)
+    return mask
+
+def mask_label(mask: int) -> str:
+    """Render a mask as "Jan, Feb, Mar" ("" for the empty mask)"""
+    return MASK_LABELS[mask]
+
+def mask_labels(masks: np.ndarray) -> np.ndarray:
+    return MASK_LABELS[np.asarray(masks, dtype=np.int64)]
+
+def mask_union(masks: np.ndarray) -> int:
+    """OR of all masks (0 for none)"""
+    masks = np.asarray(masks, dtype=np.int64)
+    return int(np.bitwise_or.reduce(masks)) if masks.size else 0
+
+def mask_intersection(masks: np.ndarray) -> int:
+    """AND of all masks (0 for none)"""
+    masks = np.asarray(masks, dtype=np.int64)
+    return int(np.bitwise_and.reduce(masks)) if masks.size else 0
+
+def overlaps(masks: np.ndarray, window: int) -> np.ndarray:
+    """Boolean array: which masks share at least one month with window"""
+    return (np.asarray(masks, dtype=np.int64) & window) != 0
+
+def overlapping_masks(window: int) -> np.ndarray:
+    """All 4096-domain masks that share at least one month with window"""
+    return _MASKS[(_MASKS & window) != 0]
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """Number of active months per mask"""
+    return POPCOUNT[np.asarray(masks, dtype=np.int64)]
+
+def first_month(masks: np.ndarray) -> np.ndarray:
+    """First active month (1-12) per mask, 0 for empty masks"""
+    return FIRST_MONTH[np.asarray(masks, dtype=np.int64)]
+
+def last_month(masks: np.ndarray) -> np.ndarray:
+    """Last active month (1-12) per mask, 0 for empty masks"""
+    return LAST_MONTH[np.asarray(masks, dtype=np.int64)]
+
+def mask_spans(mask: int) -> List[Tuple[int, int]]:
+    """
+    Contiguous (start_month, end_month) spans of a mask.
+    A span running over the year end has start > end, e.g. (11, 2) for Nov-Feb.
+    """
+    return MASK_SPANS[mask]
+
+def mask_bits(masks: np.ndarray) -> np.ndarray:
+    """(n, 12) array of 0/1 month flags per mask, January first"""
+    return _BITS[np.asarray(masks, dtype=np.int64)]
+
+def month_counts(masks: np.ndarray) -> np.ndarray:
+    """Per-month (12,) count of masks that include each month"""
+    masks = np.asarray(masks, dtype=np.int64)
+    return _BITS[masks].sum(axis=0) if masks.size else np.zeros(12, dtype=np.int64)
@@ -0,0 +1,418 @@
+import json
+import re
+from concurrent.futures import Executor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import numpy as np
+
+from month_mask import ALL_MONTHS, range_mask, months_to_mask, mask_label
+
+# ==================== MONTH PARSING ====================
+
+MONTH_NAMES = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+
+DATE_FORMATS = ['%m/%d/%Y', '%m/%d/%y', '%d-%m-%y', '%d-%m-%Y', '%m-%d-%Y', '%m-%d-%y',
+                '%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']
+
+ALL_YEAR_MARKERS = ['all year', 'allyear', 'year round', 'year-round', 'perennial', 'permanent', 'annual crop']
+
+# Precompiled once at import; parse_month_string runs these for every distinct value
+LEADING_MONTH_PATTERN = re.compile(r'^(\d{1,2})(?:[/-]|$)')
+DATE_RANGE_PATTERNS = [
+    re.compile(r'([a-z]{3,})\s+\d+\s*(?:to|-|through)\s*([a-z]{3,})\s+\d+', re.IGNORECASE),  # "Jan 01 to Feb 28"
+    re.compile(r'([a-z]{3,})\s*(?:to|-|through)\s*([a-z]{3,})', re.IGNORECASE),  # "Jan to Feb"
+    re.compile(r'(\d+)\s*(?:to|-|through)\s*(\d+)', re.IGNORECASE),  # "3 to 5"
+]
+INDIVIDUAL_MONTH_PATTERN = re.compile(r'\b([a-z]{3,})\b')
+
+MONTH_TYPES = ('harvest_calendar', 'season')
+DATE_TYPES = ('start_date', 'end_date')
+
+def extract_month_from_date(date_str: str) -> Optional[int]:
+    """
+    Extract month number from a date string.
+    Handles: MM/DD/YYYY, DD-MM-YY, MM-DD-YYYY, etc.
+    Returns month number (1-12) or None if can't parse
+    """
+    if not date_str or pd.isna(date_str):
+        return None
+
+    date_str = str(date_str).strip()
+
+    # Try parsing with common date formats
+    for fmt in DATE_FORMATS:
+        try:
+            parsed_date = datetime.strptime(date_str, fmt)
+            return parsed_date.month
+        except:
+            continue
+
+    # If date parsing fails, try to extract just the month
+    # Look for MM in MM/DD or MM-DD patterns
+    month_match = LEADING_MONTH_PATTERN.search(date_str)
+    if month_match:
+        try:
+            month = int(month_match.group(1))
+            if 1 <= month <= 12:
+                return month
+        except:
+            pass
+
+    return None
+
+def parse_month_string(value: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[int, bool, str]:
+    """
+    Parse month/season information and return (month_mask, requires_review, parsed_months).
+
+    Priority:
+    1. If start_date and end_date are provided, use them for precise month extraction
+    2. Otherwise parse the period/value string (Jan-Mar, 3-5, All year, etc.)
+
+    month_mask: 12-bit integer where bit i=1 means month i is active
+    """
+    if not value or pd.isna(value):
+        return 0, True, "unknown"
+
+    value = str(value).strip().lower()
+
+    # PRIORITY 1: Use actual start_date and end_date if available
+    if start_date and end_date:
+        start_month = extract_month_from_date(start_date)
+        end_month = extract_month_from_date(end_date)
+
+        if start_month and end_month:
+            # Handles wraparound (e.g., Oct-Feb crossing year boundary)
+            month_mask = range_mask(start_month, end_month)
+            return month_mask, False, mask_label(month_mask)
+
+    # PRIORITY 2: Parse the period string
+    # Check for "all year" / perennial indicators (but NOT just "12")
+    if any(x in value for x in ALL_YEAR_MARKERS):
+        return ALL_MONTHS, False, "all year"
+
+    month_mask = 0
+
+    # Try range patterns with dates (e.g., "Jan 01 to Feb 28", "Mar 15 - Apr 15")
+    # This pattern handles month names even when followed by dates
+    for pattern in DATE_RANGE_PATTERNS:
+        match = pattern.search(value)
+        if match:
+            start_str, end_str = match.groups()
+
+            # Check if they're month names, otherwise try numeric
+            start_month = MONTH_NAMES.get(start_str.lower()[:3]) or parse_month_number(start_str)
+            end_month = MONTH_NAMES.get(end_str.lower()[:3]) or parse_month_number(end_str)
+
+            if start_month and end_month:
+                month_mask = range_mask(start_month, end_month)
+                break
+
+    # Try individual month patterns (e.g., "Jan", "May", "Aug")
+    if month_mask == 0:
+        individual_months = INDIVIDUAL_MONTH_PATTERN.findall(value)
+        month_mask = months_to_mask(
+            MONTH_NAMES[month_str[:3]] for month_str in individual_months if month_str[:3] in MONTH_NAMES
+        )
+
+    if month_mask == 0:
+        return 0, True, "unparseable"
+    return month_mask, False, mask_label(month_mask)
+
+def parse_month_number(text: str) -> Optional[int]:
+    """Numeric month from a range endpoint ("3" -> 3); None if not a number or above 12"""
+    try:
+        month = int(text)
+    except ValueError:
+        return None
+    return month if month <= 12 else None
+
+# ==================== VECTORIZED PARSING ====================
+
+def column_values(df: pd.DataFrame, column: Optional[str]) -> np.ndarray:
+    """Column as an object array; a missing column reads as all None (like row.get)"""
+    if column is None or column not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    return df[column].to_numpy(dtype=object)
+
+def parse_month_values(
+    values: np.ndarray,
+    start_values: Optional[np.ndarray] = None,
+    end_values: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized parse_month_string over aligned arrays.
+
+    Each distinct (value, start_date, end_date) combination is parsed once
+    and the results are broadcast back to every row.
+    Returns (month_masks, requires_review, parsed_months, failed), where
+    failed marks rows whose parse raised.
+    """
+    n = len(values)
+    value_codes, value_uniques = pd.factorize(values, use_na_sentinel=False)
+
+    # start/end only matter when both are present (see parse_month_string)
+    if start_values is None or end_values is None:
+        combo_codes, combo_uniques = pd.factorize(value_codes)
+        start_uniques = end_uniques = None
+    else:
+        start_codes, start_uniques = pd.factorize(start_values, use_na_sentinel=False)
+        end_codes, end_uniques = pd.factorize(end_values, use_na_sentinel=False)
+        n_start, n_end = max(len(start_uniques), 1), max(len(end_uniques), 1)
+        combined = (value_codes.astype(np.int64) * n_start + start_codes) * n_end + end_codes
+        combo_codes, combo_uniques = pd.factorize(combined)
+        start_index = (combo_uniques // n_end) % n_start
+        end_index = combo_uniques % n_end
+        combo_uniques = combo_uniques // (n_start * n_end)
+
+    n_unique = len(combo_uniques)
+    unique_masks = np.zeros(n_unique, dtype=np.int64)
+    unique_review = np.zeros(n_unique, dtype=bool)
+    unique_parsed = np.empty(n_unique, dtype=object)
+    unique_failed = np.zeros(n_unique, dtype=bool)
+
+    for i in range(n_unique):
+        value = value_uniques[combo_uniques[i]]
+        start_date = start_uniques[start_index[i]] if start_uniques is not None else None
+        end_date = end_uniques[end_index[i]] if end_uniques is not None else None
+        try:
+            unique_masks[i], unique_review[i], unique_parsed[i] = parse_month_string(value, start_date, end_date)
+        except Exception:
+            unique_failed[i] = True
+
+    if n == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool),
+                np.empty(0, dtype=object), np.zeros(0, dtype=bool))
+    return (unique_masks[combo_codes], unique_review[combo_codes],
+            unique_parsed[combo_codes], unique_failed[combo_codes])
+
+def format_reasons(prefix: str, values: np.ndarray) -> np.ndarray:
+    """prefix + str(value) for each value, as f"{prefix}{value}" would render it"""
+    return (prefix + pd.Series(values, dtype=object).astype(str)).to_numpy(dtype=object)
+
+def month_inputs(mappings: Dict[str, str]) -> Tuple[Tuple[str, ...], Optional[str], Optional[str]]:
+    """
+    The part of a mapping set the month parse depends on: the month
+    (harvest_calendar/season) columns in mapping order, and the start and
+    end date columns. Mappings with equal month inputs give the same month
+    masks, review flags and valid rows for a file.
+    """
+    month_cols = []
+    start_date_col = None
+    end_date_col = None
+    for col_name, col_type in mappings.items():
+        if col_type in MONTH_TYPES:
+            month_cols.append(col_name)
+        elif col_type == 'start_date':
+            start_date_col = col_name
+        elif col_type == 'end_date':
+            end_date_col = col_name
+    return tuple(month_cols), start_date_col, end_date_col
+
+def field_columns(mappings: Dict[str, str]) -> List[str]:
+    """Columns normalize_fields reads: those mapped to a type stored as a field"""
+    return [col_name for col_name, col_type in mappings.items()
+            if col_type != 'ignore' and col_type not in MONTH_TYPES and col_type not in DATE_TYPES]
+
+def normalize_months(df: pd.DataFrame, mappings: Dict[str, str]) -> Dict:
+    """
+    The month half of normalize_dataframe: month masks, review flags and
+    valid rows. The last harvest_calendar/season column wins, review flags
+    stick once set, and a 'period' column is the fallback when no months
+    were found.
+    """
+    n = len(df)
+    month_cols, start_date_col, end_date_col = month_inputs(mappings)
+    period_col = 'period' if 'period' in df.columns else None  # Always try period as fallback
+
+    start_values = column_values(df, start_date_col) if start_date_col else None
+    end_values = column_values(df, end_date_col) if end_date_col else None
+
+    month_mask = np.zeros(n, dtype=np.int64)
+    parsed_months = np.full(n, None, dtype=object)
+    has_month = np.zeros(n, dtype=bool)
+    requires_review = np.zeros(n, dtype=bool)
+    review_reason = np.full(n, None, dtype=object)
+    valid = np.ones(n, dtype=bool)
+
+    for col_name in month_cols:
+        values = column_values(df, col_name)
+        masks, needs_review, parsed, failed = parse_month_values(values, start_values, end_values)
+        month_mask, parsed_months = masks, parsed
+        has_month[:] = True
+        requires_review |= needs_review
+        review_reason[needs_review] = format_reasons("Could not parse: ", values[needs_review])
+        valid &= ~failed
+
+    # If month_mask is 0 (parse failed), try period column as fallback
+    if period_col:
+        rows = np.flatnonzero(month_mask == 0)
+        if len(rows):
+            period_values = column_values(df, period_col)[rows]
+            masks, needs_review, parsed, failed = parse_month_values(
+                period_values,
+                start_values[rows] if start_values is not None else None,
+                end_values[rows] if end_values is not None else None
+            )
+            valid[rows[failed]] = False
+
+            # Only update if we successfully parsed something (month_mask > 0)
+            success = (masks > 0) & ~failed
+            rows_ok = rows[success]
+            month_mask[rows_ok] = masks[success]
+            parsed_months[rows_ok] = parsed[success]
+            has_month[rows_ok] = True
+            requires_review[rows_ok] = False  # Clear the review flag if fallback succeeded
+            review_reason[rows_ok] = None
+
+            # Fallback also failed to parse
+            still_failed = (masks == 0) & needs_review & ~failed
+            rows_bad = rows[still_failed]
+            month_mask[rows_bad] = 0
+            parsed_months[rows_bad] = parsed[still_failed]
+            has_month[rows_bad] = True
+            requires_review[rows_bad] = True
+            review_reason[rows_bad] = format_reasons("Could not parse period: ", period_values[still_failed])
+
+    return {
+        "row_number": df.index.to_numpy() + 1,
+        "month_mask": month_mask,
+        "parsed_months": parsed_months,
+        "has_month": has_month,
+        "requires_review": requires_review,
+        "review_reason": review_reason,
+        "valid": valid
+    }
+
+def normalize_fields(df: pd.DataFrame, mappings: Dict[str, str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """
+    The field half of normalize_dataframe: ({type: values}, field_order).
+    Values are stringified (None for missing); a type mapped twice keeps
+    its first position and the last column's values.
+    """
+    fields = {}
+    field_order = []
+    for col_name, col_type in mappings.items():
+        if col_type == 'ignore':
+            continue
+        if col_type in MONTH_TYPES:
+            if 'month_mask' not in field_order:
+                field_order.extend(['month_mask', 'parsed_months'])
+        elif col_type not in DATE_TYPES:  # Skip storing raw date columns
+            if col_type not in fields:
+                field_order.append(col_type)
+            values = column_values(df, col_name)
+            stringified = pd.Series(values, dtype=object).astype(str).to_numpy(dtype=object)
+            fields[col_type] = np.where(pd.isna(values), None, stringified)
+    return fields, field_order
+
+def normalize_dataframe(df: pd.DataFrame, mappings: Dict[str, str]) -> Dict:
+    """
+    Apply column mappings to every row of df at once.
+
+    Produces the same normalized records as walking the rows one by one
+    (see normalize_months and normalize_fields).
+
+    Returns a dict of row-aligned arrays:
+    row_number, month_mask, parsed_months, has_month, requires_review,
+    review_reason, valid (False for rows whose parse raised), plus
+    fields ({type: values}) and field_order (normalized key order).
+    """
+    normalized = normalize_months(df, mappings)
+    normalized['fields'], normalized['field_order'] = normalize_fields(df, mappings)
+    return normalized
+
+def build_record(normalized: Dict, i: int) -> Dict:
+    """Assemble row i of normalize_dataframe() output as a record dict"""
+    record = {
+        'row_number': int(normalized['row_number'][i]),
+        'requires_review': bool(normalized['requires_review'][i]),
+        'review_reason': normalized['review_reason'][i]
+    }
+    month_keys = ['month_mask', 'parsed_months'] if normalized['has_month'][i] else []
+    keys = normalized['field_order'] + [k for k in month_keys if k not in normalized['field_order']]
+
+    for key in keys:
+        if key == 'month_mask':
+            if month_keys:
+                record['month_mask'] = int(normalized['month_mask'][i])
+        elif key == 'parsed_months':
+            if month_keys:
+                record['parsed_months'] = normalized['parsed_months'][i]
+        else:
+            record[key] = normalized['fields'][key][i]
+    return record
+
+def summarize_parse(normalized: Dict) -> Dict[str, int]:
+    """Parse stats in the shape returned by the parse endpoint"""
+    valid = normalized['valid']
+    review = normalized['requires_review'] & valid
+    total = int(valid.sum())
+    return {
+        'total_parsed': total,
+        'successful': total - int(review.sum()),
+        'manual_review': int(review.sum()),
+        'errors': int((~valid).sum())
+    }
+
+# ==================== PARALLEL PARSING ====================
+
+def iter_raw_json(df: pd.DataFrame) -> Iterator[str]:
+    """
+    raw_json of each row: the row as a {column: value} JSON object. Missing
+    cells (NaN where an XML record lacks a field) become null; json.dumps
+    would write NaN, which SQLite's JSON functions reject.
+    """
+    if df.isna().any().any():
+        df = df.astype(object).where(df.notna(), None)
+    columns = df.columns.tolist()
+    dumps = json.dumps
+    for values in df.itertuples(index=False, name=None):
+        yield dumps(dict(zip(columns, values)))
+
+def serialize_rows(df: pd.DataFrame) -> np.ndarray:
+    """raw_json for every row, as iter_raw_json writes it"""
+    return np.array(list(iter_raw_json(df)), dtype=object)
+
+def normalize_chunk(df: pd.DataFrame, mappings: Dict[str, str]) -> Dict:
+    """Worker entry point: normalize a row chunk and serialize its raw rows"""
+    normalized = normalize_dataframe(df, mappings)
+    normalized['raw_json'] = serialize_rows(df)
+    return normalized
+
+def merge_normalized(parts: List[Dict]) -> Dict:
+    """Concatenate normalize_chunk() results, in the order given, into one result"""
+    merged = {
+        key: np.concatenate([part[key] for part in parts])
+        for key in ('row_number', 'month_mask', 'parsed_months', 'has_month',
+                    'requires_review', 'review_reason', 'valid', 'raw_json')
+    }
+    merged['field_order'] = parts[0]['field_order']
+    merged['fields'] = {
+        key: np.concatenate([part['fields'][key] for part in parts])
+        for key in parts[0]['fields']
+    }
+    return merged
+
+def normalize_dataframe_parallel(
+    df: pd.DataFrame,
+    mappings: Dict[str, str],
+    executor: Executor,
+    chunk_rows: int
+) -> Dict:
+    """
+    normalize_dataframe() over row chunks on a process pool.
+    Chunks keep their index, so row numbers and the merged order match the
+    single-process result; raw_json is serialized by the workers too.
+    """
+    chunks = [df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows)]
+    if not chunks:
+        return normalize_chunk(df, mappings)
+    return merge_normalized(list(executor.map(normalize_chunk, chunks, repeat(mappings))))
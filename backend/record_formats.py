@@ -0,0 +1,203 @@
+import json
+import math
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from starlette.responses import Response
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover - orjson is optional
+    HAS_ORJSON = False
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - pyarrow is optional
+    HAS_PYARROW = False
+
+# ==================== RECORD RESPONSE FORMATS ====================
+#
+# Endpoints returning many records can send them in one of these layouts:
+#
+#   json      a list of objects, one per record (the default)
+#   columnar  JSON with each column's name once and its values as an array;
+#             repetitive columns are dictionary-encoded (distinct values
+#             once, then one index per record, -1 for missing)
+#   arrow     an Arrow IPC stream of the same columns, dictionary-encoded
+#             the same way, with the rest of the response as JSON in the
+#             schema metadata under 'response'
+#   ndjson    records streamed one JSON object per line (where supported)
+#
+# Nested objects (a filter record's parsed_data) become nested column
+# groups, or struct columns in Arrow. The layout is taken from ?format= or
+# else from the Accept header. JSON is encoded with orjson when installed.
+
+RECORD_FORMATS = ('json', 'columnar', 'arrow', 'ndjson')
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Accept media types of the non-default layouts; columnar JSON is asked
+# for with a parameter: application/json; layout=columnar
+ACCEPT_FORMATS = {
+    ARROW_MEDIA_TYPE: 'arrow',
+    NDJSON_MEDIA_TYPE: 'ndjson'
+}
+
+# A column is dictionary-encoded when it has at most this many distinct
+# values per record
+DICTIONARY_MAX_RATIO = 0.5
+
+ARROW_METADATA_KEY = b"response"
+
+def finite(content):
+    """content with NaN and infinities replaced by None, and numpy values as Python ones"""
+    if isinstance(content, float):
+        return content if math.isfinite(content) else None
+    if isinstance(content, dict):
+        return {key: finite(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [finite(value) for value in content]
+    if isinstance(content, (np.ndarray, np.generic)):
+        return finite(content.tolist())
+    return content
+
+def dumps(content) -> bytes:
+    """Compact JSON; NaN and infinities become null"""
+    if HAS_ORJSON:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(finite(content), separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+def loads(text: str):
+    """Parse stored JSON, which json.dumps may have written with NaN in it"""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+class FastJSONResponse(Response):
+    """JSONResponse rendered with dumps(), skipping jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def negotiate_record_format(requested: Optional[str], accept: str, allowed: Sequence[str]) -> str:
+    """
+    Layout to answer with: the requested ?format=, else the highest-rated
+    allowed layout in the Accept header, else 'json'.
+    """
+    if requested is not None:
+        if requested not in allowed:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {requested}")
+        return requested
+
+    best, best_q = 'json', 0.0
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        options = dict(param.partition("=")[::2] for param in params)
+        try:
+            q = float(options.get("q", 1))
+        except ValueError:
+            continue
+        if media_type.lower() == "application/json":
+            layout = 'columnar' if options.get("layout", "").lower() == 'columnar' else 'json'
+        else:
+            layout = ACCEPT_FORMATS.get(media_type.lower())
+        if layout in allowed and q > best_q:
+            best, best_q = layout, q
+    return best
+
+def dictionary_encode(values: list) -> Optional[Dict]:
+    """{"dictionary", "indices"} for a repetitive column of scalars, else None"""
+    try:
+        indices, dictionary = pd.factorize(pd.Series(values, dtype=object))
+    except TypeError:  # Lists and other unhashable values are sent as they are
+        return None
+    if len(dictionary) > len(values) * DICTIONARY_MAX_RATIO:
+        return None
+    return {"dictionary": dictionary.tolist(), "indices": indices}
+
+def transpose(records: List[Dict]) -> Tuple[List[str], List[list]]:
+    """
+    Column names of records (in the order they first appear) and each
+    column's values, None where a record lacks the key.
+    """
+    names = list(dict.fromkeys(chain.from_iterable(records)))
+    return names, [[record.get(name) for record in records] for name in names]
+
+def is_nested(values: list) -> bool:
+    """Whether a column holds objects (and nulls)"""
+    first = next((value for value in values if value is not None), None)
+    return isinstance(first, dict) and all(value is None or isinstance(value, dict) for value in values)
+
+def columnar_records(records: List[Dict]) -> Dict:
+    """records as {"length", "columns": [{"name", "values" | "dictionary"+"indices" | "columns"}]}"""
+    columns = []
+    for name, values in zip(*transpose(records)):
+        if is_nested(values):
+            nested = columnar_records([value if value is not None else {} for value in values])
+            columns.append({"name": name, "columns": nested["columns"]})
+            continue
+        encoded = dictionary_encode(values)
+        columns.append({"name": name, **(encoded if encoded else {"values": values})})
+    return {"length": len(records), "columns": columns}
+
+def arrow_array(values: list) -> "pa.Array":
+    """
+    Arrow array of a column's values. Columns mixing types (numbers and
+    text in one spreadsheet column) are sent as text, with NaN as null.
+    """
+    if is_nested(values):
+        names, arrays = arrow_columns([value if value is not None else {} for value in values])
+        mask = pa.array([value is None for value in values])
+        return pa.StructArray.from_arrays(arrays, names=names, mask=mask)
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array([
+            None if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+            for value in values
+        ], type=pa.string())
+    if pa.types.is_null(array.type):
+        return array
+    if (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)) and len(values):
+        encoded = array.dictionary_encode()
+        if len(encoded.dictionary) <= len(values) * DICTIONARY_MAX_RATIO:
+            return encoded
+    return array
+
+def arrow_columns(records: List[Dict]) -> Tuple[List[str], List["pa.Array"]]:
+    names, columns = transpose(records)
+    return names, [arrow_array(values) for values in columns]
+
+def arrow_stream(records: List[Dict], envelope: Dict) -> bytes:
+    """records as an Arrow IPC stream, envelope in the schema metadata"""
+    names, arrays = arrow_columns(records)
+    table = pa.Table.from_arrays(arrays, names=names, metadata={ARROW_METADATA_KEY: dumps(envelope)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def record_response(envelope: Dict, records: List[Dict], record_format: str) -> Response:
+    """
+    Response with envelope's fields plus records under 'records', in the
+    negotiated layout.
+    """
+    headers = {"Vary": "Accept"}
+    if record_format == 'arrow':
+        if not HAS_PYARROW:
+            raise HTTPException(status_code=406, detail="Arrow responses are not available on this server")
+        return Response(arrow_stream(records, envelope), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if record_format == 'columnar':
+        return FastJSONResponse({**envelope, "layout": "columnar", "records": columnar_records(records)},
+                                headers=headers)
+    return FastJSONResponse({**envelope, "records": records}, headers=headers)
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATA_DIR = BACKEND_DIR.parent / "test_data"
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The backend app, with its data directory in a temporary working directory"""
+    os.chdir(tmp_path_factory.mktemp("server"))
+    import app
+    return app
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+    return TestClient(app_module.app)
+
+@pytest.fixture
+def db(app_module):
+    conn = sqlite3.connect(app_module.DB_FILE)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def upload(client):
+    """Upload a file's content under a name, returning the upload response"""
+    def upload_file(name: str, content: bytes) -> dict:
+        response = client.post("/api/upload", files={"file": (name, content)})
+        assert response.status_code == 200, response.text
+        return response.json()
+    return upload_file
+
+@pytest.fixture
+def sample_crops() -> bytes:
+    """test_data/sample_crops.csv plus one row of its own, so no other test shares its content"""
+    content = (TEST_DATA_DIR / "sample_crops.csv").read_bytes().rstrip(b"\n")
+    return content + f"\nWheat,Ethiopia,{uuid.uuid4().hex},October,January,Oct-Jan,3.1\n".encode()
+
+SAMPLE_MAPPINGS = {"Crop": "crop_name", "Country": "country", "Growing_Period": "harvest_calendar"}
+
+@pytest.fixture
+def missing_field_xml() -> bytes:
+    """Two XML records, the second without a Country (a NaN cell once loaded), unique to the test"""
+    return (f"<!-- {uuid.uuid4().hex} --><root>"
+            "<r><Crop>Wheat</Crop><Country>ET</Country><Period>Jan-Mar</Period></r>"
+            "<r><Crop>Maize</Crop><Period>Oct-Dec</Period></r>"
+            "</root>").encode()
+
+XML_MAPPINGS = {"Crop": "crop_name", "Country": "country", "Period": "harvest_calendar"}
+
+@pytest.fixture
+def parsed_upload(client, upload):
+    """Upload and parse a file's content with mappings, returning the upload id"""
+    def upload_and_parse(name: str, content: bytes, mappings: dict) -> str:
+        upload_id = upload(name, content)["upload_id"]
+        assert client.post(f"/api/upload/{upload_id}/save-mappings", json=mappings).status_code == 200
+        response = client.post(f"/api/upload/{upload_id}/parse")
+        assert response.status_code == 200, response.text
+        return upload_id
+    return upload_and_parse
@@ -0,0 +1,67 @@
+import os
+
+from conftest import SAMPLE_MAPPINGS
+
+def parse(client, upload_id, mappings=SAMPLE_MAPPINGS):
+    assert client.post(f"/api/upload/{upload_id}/save-mappings", json=mappings).status_code == 200
+    response = client.post(f"/api/upload/{upload_id}/parse")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def upload_refs(db, upload_id):
+    """(blob ref_count, parse_id, parse_results ref_count) of an upload"""
+    return db.execute("""SELECT b.ref_count, u.parse_id, p.ref_count FROM uploads u
+                         JOIN blobs b ON b.content_hash = u.content_hash
+                         LEFT JOIN parse_results p ON p.parse_id = u.parse_id
+                         WHERE u.upload_id = ?""", (upload_id,)).fetchone()
+
+def test_identical_uploads_share_file_and_parse(client, db, upload, sample_crops):
+    first = upload("first.csv", sample_crops)
+    second = upload("second.csv", sample_crops)
+    assert second["deduplicated"]
+    assert upload_refs(db, first["upload_id"])[0] == 2
+
+    parsed = parse(client, first["upload_id"])
+    reused = parse(client, second["upload_id"])
+    assert reused["reused"]
+    assert reused["stats"] == parsed["stats"]
+
+    blob_refs, parse_id, parse_refs = upload_refs(db, second["upload_id"])
+    assert parse_id == upload_refs(db, first["upload_id"])[1]
+    assert parse_refs == 2
+    records = db.execute("SELECT COUNT(*) FROM records WHERE parse_id = ?", (parse_id,)).fetchone()[0]
+    assert records == parsed["stats"]["total_parsed"]
+
+def test_reparse_releases_previous_results(client, db, upload, sample_crops):
+    first = upload("first.csv", sample_crops)
+    second = upload("second.csv", sample_crops)
+    parse(client, first["upload_id"])
+    parse(client, second["upload_id"])
+    shared_parse_id = upload_refs(db, first["upload_id"])[1]
+
+    parse(client, first["upload_id"], {**SAMPLE_MAPPINGS, "Region": "ignore", "Country": "ignore"})
+    _, parse_id, parse_refs = upload_refs(db, first["upload_id"])
+    assert parse_id != shared_parse_id
+    assert parse_refs == 1
+    assert upload_refs(db, second["upload_id"])[2] == 1
+
+def test_deleting_uploads_releases_file_and_records(client, db, upload, sample_crops):
+    first = upload("first.csv", sample_crops)
+    second = upload("second.csv", sample_crops)
+    parse(client, first["upload_id"])
+    parse(client, second["upload_id"])
+    content_hash, path = db.execute("""SELECT b.content_hash, b.path FROM uploads u
+                                       JOIN blobs b ON b.content_hash = u.content_hash
+                                       WHERE u.upload_id = ?""", (first["upload_id"],)).fetchone()
+    parse_id = upload_refs(db, first["upload_id"])[1]
+
+    assert client.delete(f"/api/upload/{first['upload_id']}").status_code == 200
+    assert upload_refs(db, second["upload_id"])[0::2] == (1, 1)
+    assert os.path.exists(path)
+
+    response = client.post("/api/delete-uploads", json={"ids": [second["upload_id"]]})
+    assert response.json()["deleted"] == 1
+    assert not os.path.exists(path)
+    assert db.execute("SELECT COUNT(*) FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()[0] == 0
+    assert db.execute("SELECT COUNT(*) FROM parse_results WHERE parse_id = ?", (parse_id,)).fetchone()[0] == 0
+    assert db.execute("SELECT COUNT(*) FROM records WHERE parse_id = ?", (parse_id,)).fetchone()[0] == 0
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import math
+
+import pytest
+from openpyxl import load_workbook
+
+from conftest import SAMPLE_MAPPINGS, XML_MAPPINGS
+from exports import export_record, export_row, iter_csv_export, iter_json_export
+
+def test_export_row_leaves_missing_values_empty():
+    record = {"Crop": "Wheat", "Country": math.nan, "Region": None, "Yield": 2.5, "month_mask": 0}
+    assert export_row(record, ["Crop", "Country", "Region", "Yield", "Absent", "month_mask"]) == \
+        ["Wheat", "", "", "2.5", "", ""]
+    assert export_row({"month_mask": 7}, ["month_mask"]) == ["000000000111"]
+
+def test_export_record_drops_parsed_data():
+    record = {"Crop": "Wheat", "parsed_data": {"crop_name": "Wheat"}, "month_mask": 0}
+    assert export_record(record) == {"Crop": "Wheat", "month_mask": "000000000000"}
+
+def test_json_export_writes_missing_values_as_null():
+    batches = [[{"Crop": "Wheat", "Country": math.nan, "month_mask": 7}], [{"Crop": "Maize", "month_mask": 0}]]
+    document = json.loads("".join(iter_json_export(batches, None, 2)))
+    assert document["totalRecords"] == 2
+    assert document["records"] == [
+        {"Crop": "Wheat", "Country": None, "month_mask": "000000000111"},
+        {"Crop": "Maize", "month_mask": "000000000000"}
+    ]
+    document = json.loads("".join(iter_json_export(iter([]), ["Crop"], 0)))
+    assert document["records"] == [] and document["columns"] == ["Crop"]
+
+def test_csv_export_batches():
+    batches = [[{"Crop": "Wheat", "month_mask": 7}], [{"Crop": "Maize, white", "month_mask": 0}]]
+    rows = list(csv.reader(io.StringIO("".join(iter_csv_export(batches, ["Crop", "month_mask"])))))
+    assert rows == [["Crop", "month_mask"], ["Wheat", "000000000111"], ["Maize, white", ""]]
+
+def export(client, upload_id, export_format, body=None):
+    response = client.post(f"/api/upload/{upload_id}/export?format={export_format}", json=body or {})
+    assert response.status_code == 200, response.text
+    assert "attachment" in response.headers["content-disposition"]
+    return response.content
+
+def read_export(client, upload_id, export_format, body=None):
+    """An export read back as (header, rows) or, for JSON, the document"""
+    content = export(client, upload_id, export_format, body)
+    if export_format == "json":
+        return json.loads(content)
+    if export_format == "csv":
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        return rows[0], rows[1:]
+    sheet = load_workbook(io.BytesIO(content), read_only=True).active
+    rows = [["" if value is None else value for value in row] for row in sheet.iter_rows(min_row=7, values_only=True)]
+    return rows[0], rows[1:]
+
+@pytest.mark.parametrize("export_format", ["csv", "xlsx"])
+def test_table_exports_of_xml_records_missing_a_field(client, parsed_upload, missing_field_xml, export_format):
+    upload_id = parsed_upload("crops.xml", missing_field_xml, XML_MAPPINGS)
+    header, rows = read_export(client, upload_id, export_format)
+    assert header == ["Crop", "Country", "Period", "month_mask"]
+    assert rows == [["Wheat", "ET", "Jan-Mar", "000000000111"], ["Maize", "", "Oct-Dec", "111000000000"]]
+
+def test_json_export_of_xml_records_missing_a_field(client, parsed_upload, missing_field_xml):
+    upload_id = parsed_upload("crops.xml", missing_field_xml, XML_MAPPINGS)
+    document = read_export(client, upload_id, "json")
+    assert document["totalRecords"] == 2
+    assert document["records"][1] == {"Crop": "Maize", "Country": None, "Period": "Oct-Dec",
+                                      "month_mask": "111000000000"}
+
+@pytest.mark.parametrize("export_format", ["csv", "xlsx", "json"])
+def test_filtered_export_of_selected_columns(client, parsed_upload, sample_crops, export_format):
+    upload_id = parsed_upload("crops.csv", sample_crops, SAMPLE_MAPPINGS)
+    body = {"column_name": "Crop", "values": ["Wheat"], "columns": ["Crop", "Country", "month_mask"]}
+    records = client.post(f"/api/upload/{upload_id}/filter",
+                          json={"column_name": "Crop", "values": ["Wheat"]}).json()["records"]
+    expected = [[record["Crop"], record["Country"], format(record["month_mask"], "012b")] for record in records]
+    assert expected
+
+    exported = read_export(client, upload_id, export_format, body)
+    if export_format == "json":
+        assert exported["columns"] == body["columns"]
+        assert [list(record.values()) for record in exported["records"]] == expected
+    else:
+        assert exported == (body["columns"], expected)
+
+def test_export_rejects_unknown_format(client, parsed_upload, sample_crops):
+    upload_id = parsed_upload("crops.csv", sample_crops, SAMPLE_MAPPINGS)
+    assert client.post(f"/api/upload/{upload_id}/export?format=pdf", json={}).status_code == 400
@@ -0,0 +1,33 @@
+
+import pandas as pd
+import pytest
+
+import ingest
+from conftest import XML_MAPPINGS
+from parsing import serialize_rows
+
+def test_raw_json_writes_missing_cells_as_null():
+    df = pd.DataFrame([{"Crop": "Wheat", "Country": "ET"}, {"Crop": "Maize"}])
+    assert df["Country"].isna().any()
+    assert serialize_rows(df).tolist() == ['{"Crop": "Wheat", "Country": "ET"}', '{"Crop": "Maize", "Country": null}']
+
+@pytest.mark.parametrize("indexed", [True, False], ids=["postings", "raw_json"])
+def test_filter_xml_records_missing_a_field(client, db, monkeypatch, parsed_upload, missing_field_xml, indexed):
+    if not indexed:
+        monkeypatch.setattr(ingest, "FILTER_INDEX_MAX_UNIQUE", 0)
+    upload_id = parsed_upload("crops.xml", missing_field_xml, XML_MAPPINGS)
+    parse_id = db.execute("SELECT parse_id FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()[0]
+    assert db.execute("SELECT COUNT(*) FROM parse_columns WHERE parse_id = ? AND indexed = ?",
+                      (parse_id, int(indexed))).fetchone()[0] == 3
+    for (raw_json,) in db.execute("SELECT raw_json FROM records WHERE parse_id = ?", (parse_id,)):
+        assert db.execute("SELECT json_valid(?)", (raw_json,)).fetchone()[0] == 1
+
+    response = client.post(f"/api/upload/{upload_id}/filter", json={"column_name": "Country", "values": ["ET"]})
+    assert response.status_code == 200, response.text
+    assert [record["Crop"] for record in response.json()["records"]] == ["Wheat"]
+
+    response = client.post(f"/api/upload/{upload_id}/filter", json={"column_name": "Crop", "values": ["Maize"]})
+    assert response.status_code == 200, response.text
+    [record] = response.json()["records"]
+    assert record["Country"] is None
+    assert record["parsed_data"]["crop_name"] == "Maize"
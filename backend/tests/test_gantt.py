@@ -0,0 +1,81 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from conftest import XML_MAPPINGS
+from gantt import UNKNOWN_GROUP_VALUE, aggregate_gantt_groups, month_span
+
+JAN_MAR = 0b000000000111
+OCT_DEC = 0b111000000000
+NOV_FEB = 0b110000000011
+
+def test_groups_merge_masks_and_count_months():
+    keys = pd.DataFrame({"Country": ["ET", "KE", "ET", "ET"], "Crop": ["Teff", "Teff", "Teff", "Wheat"]})
+    groups = aggregate_gantt_groups(keys, np.array([JAN_MAR, OCT_DEC, OCT_DEC, JAN_MAR]), np.array([1, 2, 3, 4]))
+
+    assert [group["label"] for group in groups] == ["ET | Teff", "ET | Wheat", "KE | Teff"]
+    teff = groups[0]
+    assert teff["key"] == {"Country": "ET", "Crop": "Teff"}
+    assert teff["record_count"] == 2
+    assert teff["month_mask"] == JAN_MAR | OCT_DEC
+    assert teff["month_counts"] == [1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1]
+    assert teff["record_ids"] == [1, 3]
+    assert teff["first_row_number"] == 1
+    # Oct-Dec and Jan-Mar run on over the year end
+    assert teff["segments"] == [{"start_month": 10, "end_month": 3, "wraps": True, "length": 6}]
+
+def test_missing_and_empty_values_group_as_unknown():
+    keys = pd.DataFrame({"Country": ["ET", None, "", np.nan]})
+    groups = aggregate_gantt_groups(keys, np.array([JAN_MAR] * 4), np.array([1, 2, 3, 4]), include_record_ids=False)
+
+    assert [group["key"]["Country"] for group in groups] == ["ET", UNKNOWN_GROUP_VALUE]
+    assert groups[1]["record_count"] == 3
+    assert groups[1]["first_row_number"] == 2
+    assert "record_ids" not in groups[1]
+
+def test_wrapping_months_form_one_segment():
+    [group] = aggregate_gantt_groups(pd.DataFrame({"Crop": ["Wheat"]}), np.array([NOV_FEB]), np.array([1]))
+    assert group["segments"] == [{"start_month": 11, "end_month": 2, "wraps": True, "length": 4}]
+    assert month_span(np.array([NOV_FEB, JAN_MAR])) == 14
+    assert month_span(np.array([JAN_MAR, OCT_DEC])) == 12
+
+def test_no_records_no_groups():
+    assert aggregate_gantt_groups(pd.DataFrame({"Crop": []}), np.array([]), np.array([])) == []
+
+def gantt(client, upload_id, body):
+    response = client.post(f"/api/upload/{upload_id}/gantt", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_gantt_groups_missing_xml_field_as_unknown(client, parsed_upload, missing_field_xml):
+    upload_id = parsed_upload("crops.xml", missing_field_xml, XML_MAPPINGS)
+    result = gantt(client, upload_id, {"grouping_columns": ["Country"]})
+
+    assert result["total_records"] == 2
+    assert [(group["label"], group["month_mask"]) for group in result["groups"]] == [
+        ("ET", JAN_MAR), (UNKNOWN_GROUP_VALUE, OCT_DEC)
+    ]
+    assert result["groups"][1]["first_record"] == {"Crop": "Maize", "Country": None, "Period": "Oct-Dec"}
+
+def test_gantt_endpoint_groups_filters_and_wraps(client, parsed_upload):
+    content = "\n".join([
+        "Crop,Country,Period",
+        "Wheat,ET,Nov-Feb",
+        "Wheat,,Jan-Mar",
+        "Teff,ET,Jan-Mar",
+        f"Wheat,Z{uuid.uuid4().hex},Oct-Dec"
+    ]).encode()
+    upload_id = parsed_upload("crops.csv", content, {"Crop": "crop_name", "Country": "country",
+                                                     "Period": "harvest_calendar"})
+
+    result = gantt(client, upload_id, {"grouping_columns": ["Crop", "Country"],
+                                       "column_name": "Crop", "values": ["Wheat"]})
+    assert result["total_records"] == 3
+    labels = [group["label"] for group in result["groups"]]
+    assert labels[:2] == ["Wheat | ET", "Wheat | Unknown"]
+    assert result["groups"][0]["segments"][0]["wraps"]
+    assert result["month_span"] == 14
+
+    response = client.post(f"/api/upload/{upload_id}/gantt", json={"grouping_columns": ["Nope"]})
+    assert response.status_code == 400
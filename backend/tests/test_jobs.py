@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from conftest import SAMPLE_MAPPINGS
+
+@pytest.fixture
+def mapped_upload(client, upload, sample_crops):
+    upload_id = upload("crops.csv", sample_crops)["upload_id"]
+    client.post(f"/api/upload/{upload_id}/save-mappings", json=SAMPLE_MAPPINGS)
+    return upload_id
+
+def start_job(client, upload_id):
+    """Create a parse job; the test client runs it before returning"""
+    response = client.post(f"/api/upload/{upload_id}/parse-jobs")
+    assert response.status_code == 200, response.text
+    return client.get(f"/api/parse-jobs/{response.json()['job_id']}").json()
+
+def upload_status(client, upload_id):
+    return client.get(f"/api/upload/{upload_id}").json()["status"]
+
+def test_job_completes(client, mapped_upload):
+    job = start_job(client, mapped_upload)
+    assert job["state"] == "completed"
+    assert upload_status(client, mapped_upload) == "parsed"
+    result = client.get(f"/api/parse-jobs/{job['job_id']}/result").json()
+    assert result["stats"]["total_parsed"] > 0
+
+def test_failed_load_fails_job(client, app_module, monkeypatch, mapped_upload):
+    def broken_load(*args, **kwargs):
+        raise ValueError("unreadable file")
+    monkeypatch.setattr(app_module, "load_upload_dataframe", broken_load)
+
+    job = start_job(client, mapped_upload)
+    assert job["state"] == "failed"
+    assert job["error"] == "unreadable file"
+    assert upload_status(client, mapped_upload) == "failed"
+
+    monkeypatch.undo()
+    retried = start_job(client, mapped_upload)
+    assert retried["job_id"] != job["job_id"]
+    assert retried["state"] == "completed"
+
+def test_failed_status_update_fails_job(client, app_module, monkeypatch, mapped_upload):
+    set_upload_status = app_module.set_upload_status
+    def locked_status(upload_id, status):
+        if status == 'parsing':
+            raise sqlite3.OperationalError("database is locked")
+        set_upload_status(upload_id, status)
+    monkeypatch.setattr(app_module, "set_upload_status", locked_status)
+
+    job = start_job(client, mapped_upload)
+    assert job["state"] == "failed"
+    assert job["error"] == "database is locked"
+    assert upload_status(client, mapped_upload) == "failed"
+
+def test_cancel_stops_job_between_stages(client, db, app_module, monkeypatch, mapped_upload):
+    job, _ = app_module.parse_jobs.create(mapped_upload)
+    load_upload_dataframe = app_module.load_upload_dataframe
+    def load_then_cancel(*args, **kwargs):
+        job.request_cancel()
+        return load_upload_dataframe(*args, **kwargs)
+    staged = []
+    monkeypatch.setattr(app_module, "load_upload_dataframe", load_then_cancel)
+    monkeypatch.setattr(app_module, "stage_records", lambda *args, **kwargs: staged.append(args))
+
+    app_module.run_parse_job(job)
+    assert job.state == "cancelled"
+    assert not staged
+    assert upload_status(client, mapped_upload) == "cancelled"
+    assert db.execute("SELECT parse_id FROM uploads WHERE upload_id = ?", (mapped_upload,)).fetchone() == (None,)
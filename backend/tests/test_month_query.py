@@ -0,0 +1,64 @@
+import uuid
+
+import pytest
+
+from conftest import XML_MAPPINGS
+from month_mask import overlapping_masks, range_mask
+
+CALENDAR_MAPPINGS = {"Crop": "crop_name", "Country": "country", "Period": "harvest_calendar"}
+
+def test_window_masks():
+    assert range_mask(3, 5) == 0b000000011100
+    assert range_mask(11, 2) == 0b110000000011
+    assert range_mask(4, 4) == 0b000000001000
+    window = set(overlapping_masks(range_mask(12, 1)).tolist())
+    assert 0b100000000000 in window and 0b000000000001 in window
+    assert 0b011111111110 not in window
+    assert len(overlapping_masks(range_mask(1, 12))) == 4095
+
+@pytest.fixture
+def calendar_upload(parsed_upload):
+    content = "\n".join([
+        "Crop,Country,Period",
+        "Wheat,ET,Jan-Mar",
+        "Teff,ET,Jun-Aug",
+        "Wheat,KE,Nov-Feb",
+        "Maize,KE,Oct-Dec",
+        f"Sorghum,{uuid.uuid4().hex},Apr-May"
+    ]).encode()
+    return parsed_upload("calendar.csv", content, CALENDAR_MAPPINGS)
+
+def query_months(client, upload_id, start_month, end_month, **options):
+    response = client.post("/api/query/months", json={"start_month": start_month, "end_month": end_month,
+                                                      "upload_ids": [upload_id], **options})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("start_month, end_month, crops", [
+    (3, 5, ["Wheat", "Sorghum"]),
+    (7, 7, ["Teff"]),
+    (12, 1, ["Wheat", "Wheat", "Maize"]),  # Wraps over the year end
+    (9, 9, [])
+])
+def test_month_window(client, calendar_upload, start_month, end_month, crops):
+    result = query_months(client, calendar_upload, start_month, end_month)
+    assert [record["data"]["Crop"] for record in result["records"]] == crops
+    assert result["total_records"] == len(crops)
+    assert result["window"]["month_mask"] == range_mask(start_month, end_month)
+
+def test_month_window_filters_and_limit(client, calendar_upload):
+    result = query_months(client, calendar_upload, 11, 2, filters={"Crop": ["Wheat"], "Country": ["KE"]})
+    assert [(record["row_number"], record["months"]) for record in result["records"]] == [(3, "Jan, Feb, Nov, Dec")]
+
+    result = query_months(client, calendar_upload, 1, 12, limit=2)
+    assert result["total_records"] == 5
+    assert result["returned"] == 2
+
+def test_month_window_rejects_invalid_months(client, calendar_upload):
+    response = client.post("/api/query/months", json={"start_month": 0, "end_month": 13})
+    assert response.status_code == 400
+
+def test_month_window_over_xml_records_missing_a_field(client, parsed_upload, missing_field_xml):
+    upload_id = parsed_upload("crops.xml", missing_field_xml, XML_MAPPINGS)
+    result = query_months(client, upload_id, 10, 12, filters={"Crop": ["Maize"]})
+    assert [record["data"] for record in result["records"]] == [{"Crop": "Maize", "Country": None, "Period": "Oct-Dec"}]
@@ -0,0 +1,198 @@
+import random
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from parsing import MONTH_NAMES, build_record, normalize_dataframe, parse_month_string, summarize_parse
+
+# ==================== REFERENCE PARSER ====================
+#
+# The row-by-row parser normalize_dataframe replaced, as the parse endpoint
+# ran it: normalize_dataframe must produce exactly its records and stats.
+
+def reference_month_from_date(date_str):
+    if not date_str or pd.isna(date_str):
+        return None
+    date_str = str(date_str).strip()
+    for fmt in ['%m/%d/%Y', '%m/%d/%y', '%d-%m-%y', '%d-%m-%Y', '%m-%d-%Y', '%m-%d-%y',
+                '%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
+        try:
+            return datetime.strptime(date_str, fmt).month
+        except ValueError:
+            continue
+    month_match = re.search(r'^(\d{1,2})(?:[/-]|$)', date_str)
+    if month_match:
+        month = int(month_match.group(1))
+        if 1 <= month <= 12:
+            return month
+    return None
+
+def reference_month_names(months):
+    names = []
+    for m in sorted(set(months)):
+        for name, num in MONTH_NAMES.items():
+            if num == m and len(name) >= 3:
+                names.append(name.capitalize())
+                break
+    return ", ".join(names)
+
+def reference_range(start_month, end_month):
+    if start_month <= end_month:
+        return list(range(start_month, end_month + 1))
+    return list(range(start_month, 13)) + list(range(1, end_month + 1))
+
+def reference_parse_month_string(value, start_date=None, end_date=None):
+    if not value or pd.isna(value):
+        return 0, True, "unknown"
+    value = str(value).strip().lower()
+
+    if start_date and end_date:
+        start_month = reference_month_from_date(start_date)
+        end_month = reference_month_from_date(end_date)
+        if start_month and end_month:
+            months = reference_range(start_month, end_month)
+            return sum(1 << (m - 1) for m in set(months)), False, reference_month_names(months)
+
+    if any(x in value for x in ['all year', 'allyear', 'year round', 'year-round', 'perennial', 'permanent',
+                                'annual crop']):
+        return 4095, False, "all year"
+
+    parsed_months = []
+    for pattern in [r'([a-z]{3,})\s+\d+\s*(?:to|-|through)\s*([a-z]{3,})\s+\d+',
+                    r'([a-z]{3,})\s*(?:to|-|through)\s*([a-z]{3,})',
+                    r'(\d+)\s*(?:to|-|through)\s*(\d+)']:
+        match = re.search(pattern, value, re.IGNORECASE)
+        if match:
+            endpoints = []
+            for text in match.groups():
+                month = MONTH_NAMES.get(text.lower()[:3])
+                if not month:
+                    try:
+                        month = int(text)
+                        if month > 12:
+                            month = None
+                    except ValueError:
+                        pass
+                endpoints.append(month)
+            if endpoints[0] and endpoints[1]:
+                parsed_months = reference_range(*endpoints)
+                break
+
+    if not parsed_months:
+        for month_str in re.findall(r'\b([a-z]{3,})\b', value):
+            month = MONTH_NAMES.get(month_str.lower()[:3])
+            if month:
+                parsed_months.append(month)
+
+    if not parsed_months:
+        return 0, True, "unparseable"
+    return sum(1 << (m - 1) for m in set(parsed_months)), False, reference_month_names(parsed_months)
+
+def reference_parse(df, mappings):
+    """(records, stats) as the row-by-row parse endpoint produced them"""
+    records = []
+    stats = {'total_parsed': 0, 'successful': 0, 'manual_review': 0, 'errors': 0}
+    start_date_col = next((col for col, kind in mappings.items() if kind == 'start_date'), None)
+    end_date_col = next((col for col, kind in mappings.items() if kind == 'end_date'), None)
+    period_col = 'period' if 'period' in df.columns else None
+
+    for idx, raw_row in df.iterrows():
+        try:
+            normalized = {}
+            requires_review = False
+            review_reason = None
+            start_date = raw_row.get(start_date_col) if start_date_col else None
+            end_date = raw_row.get(end_date_col) if end_date_col else None
+            for col_name, col_type in mappings.items():
+                if col_type == 'ignore':
+                    continue
+                value = raw_row.get(col_name)
+                if col_type in ('harvest_calendar', 'season'):
+                    month_mask, needs_review, parsed_months = reference_parse_month_string(value, start_date,
+                                                                                         end_date)
+                    normalized['month_mask'] = month_mask
+                    normalized['parsed_months'] = parsed_months
+                    if needs_review:
+                        requires_review = True
+                        review_reason = f"Could not parse: {value}"
+                elif col_type not in ('start_date', 'end_date'):
+                    normalized[col_type] = str(value) if pd.notna(value) else None
+
+            if not normalized.get('month_mask') and period_col:
+                period_value = raw_row.get(period_col)
+                month_mask, needs_review, parsed_months = reference_parse_month_string(period_value, start_date,
+                                                                                     end_date)
+                if month_mask > 0:
+                    normalized['month_mask'] = month_mask
+                    normalized['parsed_months'] = parsed_months
+                    requires_review = False
+                    review_reason = None
+                elif needs_review:
+                    normalized['month_mask'] = month_mask
+                    normalized['parsed_months'] = parsed_months
+                    requires_review = True
+                    review_reason = f"Could not parse period: {period_value}"
+
+            records.append({'row_number': idx + 1, 'requires_review': requires_review,
+                            'review_reason': review_reason, **normalized})
+            stats['total_parsed'] += 1
+            stats['manual_review' if requires_review else 'successful'] += 1
+        except Exception:
+            stats['errors'] += 1
+    return records, stats
+
+# ==================== COMPARISON ====================
+
+PERIODS = [
+    "Jan-Mar", "jan - mar", "JANUARY to MARCH", "Oct-Feb", "Nov through Jan", "Sept-Dec", "Sep to Sept",
+    "May", "may, jun and aug", "Jan 01 to Feb 28", "Mar 15 - Apr 15", "Dec 1 - Jan 31", "3-5", "3 to 5",
+    "11-2", "0-4", "13-15", "4-4", "All year", "year-round", "Perennial crop", "annual crop", "12",
+    "Jan-Dec", "Harvest: Jul/Aug", "Meher (Sep-Dec)", "Belg season", "garbage", "", " ", "jun-", "-jun",
+    "Maize", "Marchand", "junk-jul", None, np.nan
+]
+DATES = ["03/15/2020", "3/1/20", "15-10-2020", "2020-11-30", "31.12.2020", "7/4", "13/01/2020", "11",
+         "not a date", "", None, np.nan]
+
+def varied_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Crop": [rng.choice(["Wheat", "Teff", None, "", np.nan, 7]) for _ in range(rows)],
+        "Period": [rng.choice(PERIODS) for _ in range(rows)],
+        "Season": [rng.choice(PERIODS) for _ in range(rows)],
+        "period": [rng.choice(PERIODS) for _ in range(rows)],
+        "Start": [rng.choice(DATES) for _ in range(rows)],
+        "End": [rng.choice(DATES) for _ in range(rows)]
+    }, dtype=object)
+
+MAPPINGS = {
+    "period": {"Crop": "crop_name", "Period": "harvest_calendar", "Season": "ignore"},
+    "dates": {"Crop": "crop_name", "Period": "harvest_calendar", "Start": "start_date", "End": "end_date"},
+    "two month columns": {"Period": "harvest_calendar", "Crop": "crop_name", "Season": "season"},
+    "fallback only": {"Crop": "crop_name", "Start": "start_date", "End": "end_date"},
+    "no months": {"Crop": "crop_name", "Period": "ignore"}
+}
+
+@pytest.mark.parametrize("value", PERIODS)
+@pytest.mark.parametrize("start_date, end_date", [(None, None), ("03/15/2020", "11/30/2020"),
+                                                  ("15-10-2020", "2020-02-01"), ("not a date", "3/1/20")])
+def test_parse_month_string_matches_reference(value, start_date, end_date):
+    assert parse_month_string(value, start_date, end_date) == \
+        reference_parse_month_string(value, start_date, end_date)
+
+@pytest.mark.parametrize("case", sorted(MAPPINGS))
+@pytest.mark.parametrize("with_period_column", [True, False])
+def test_normalize_dataframe_matches_reference(case, with_period_column):
+    df = varied_frame(2000, seed=len(case))
+    if not with_period_column:
+        df = df.drop(columns=["period"])
+    mappings = MAPPINGS[case]
+    expected_records, expected_stats = reference_parse(df, mappings)
+
+    normalized = normalize_dataframe(df, mappings)
+    records = [build_record(normalized, i) for i in np.flatnonzero(normalized["valid"])]
+    assert summarize_parse(normalized) == expected_stats
+    # Key order too: it is the order of the stored normalized_json
+    assert [list(record.items()) for record in records] == [list(record.items()) for record in expected_records]
@@ -0,0 +1,115 @@
+import json
+import math
+
+import pytest
+from fastapi import HTTPException
+
+import record_formats
+from conftest import SAMPLE_MAPPINGS
+from record_formats import arrow_stream, columnar_records, dumps, loads, negotiate_record_format
+
+if record_formats.HAS_PYARROW:
+    import pyarrow as pa
+
+requires_arrow = pytest.mark.skipif(not record_formats.HAS_PYARROW, reason="pyarrow is not installed")
+
+RECORDS = [
+    {"row": i, "crop": ["Wheat", "Teff"][i % 2], "yield": 2.5 + i, "note": None if i % 3 else f"note {i}",
+     "parsed_data": {"crop_name": ["Wheat", "Teff"][i % 2], "months": [1, 2, 3][:i % 3 + 1]}}
+    for i in range(10)
+]
+
+def decode_columnar(length, columns):
+    """Python twin of the frontend's decodeColumnarRecords"""
+    records = [{} for _ in range(length)]
+    for column in columns:
+        if "columns" in column:
+            values = decode_columnar(length, column["columns"])
+        elif "dictionary" in column:
+            values = [None if index < 0 else column["dictionary"][index] for index in column["indices"]]
+        else:
+            values = column["values"]
+        for record, value in zip(records, values):
+            record[column["name"]] = value
+    return records
+
+def test_columnar_round_trip():
+    encoded = json.loads(dumps(columnar_records(RECORDS)))
+    by_name = {column["name"]: column for column in encoded["columns"]}
+    assert "dictionary" in by_name["crop"]
+    assert "values" in by_name["row"]
+    assert "columns" in by_name["parsed_data"]
+    assert decode_columnar(encoded["length"], encoded["columns"]) == RECORDS
+
+def test_columnar_fills_missing_keys():
+    encoded = json.loads(dumps(columnar_records([{"a": 1}, {"b": "x"}])))
+    assert decode_columnar(encoded["length"], encoded["columns"]) == [{"a": 1, "b": None}, {"a": None, "b": "x"}]
+
+@requires_arrow
+def test_arrow_round_trip():
+    reader = pa.ipc.open_stream(arrow_stream(RECORDS, {"total_records": len(RECORDS)}))
+    table = reader.read_all()
+    assert json.loads(table.schema.metadata[b"response"]) == {"total_records": len(RECORDS)}
+    assert pa.types.is_dictionary(table.schema.field("crop").type)
+    assert table.to_pylist() == RECORDS
+
+@requires_arrow
+def test_arrow_sends_mixed_columns_as_text():
+    records = [{"value": 1}, {"value": "two"}, {"value": float("nan")}]
+    table = pa.ipc.open_stream(arrow_stream(records, {})).read_all()
+    assert table.column("value").to_pylist() == ["1", "two", None]
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", "json"),
+    ("application/json", "json"),
+    ("application/json; layout=columnar", "columnar"),
+    ("application/vnd.apache.arrow.stream, application/json;q=0.5", "arrow"),
+    ("application/vnd.apache.arrow.stream;q=0.2, application/x-ndjson", "ndjson"),
+    ("text/html, */*", "json")
+])
+def test_negotiate_from_accept(accept, expected):
+    assert negotiate_record_format(None, accept, record_formats.RECORD_FORMATS) == expected
+
+def test_negotiate_query_parameter_wins():
+    assert negotiate_record_format("columnar", "application/vnd.apache.arrow.stream", ("json", "columnar")) == "columnar"
+    assert negotiate_record_format(None, "application/vnd.apache.arrow.stream", ("json", "columnar")) == "json"
+    with pytest.raises(HTTPException) as error:
+        negotiate_record_format("arrow", "", ("json", "columnar"))
+    assert error.value.status_code == 400
+
+@pytest.mark.parametrize("has_orjson", [True, False])
+def test_dumps_writes_non_finite_floats_as_null(monkeypatch, has_orjson):
+    if has_orjson and not record_formats.HAS_ORJSON:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(record_formats, "HAS_ORJSON", has_orjson)
+    content = {"a": math.nan, "b": [1.5, math.inf, -math.inf], "c": {"d": None}}
+    assert dumps(content) == b'{"a":null,"b":[1.5,null,null],"c":{"d":null}}'
+
+def test_loads_reads_stored_nan():
+    assert math.isnan(loads('{"a": NaN}')["a"])
+
+def test_filter_formats_carry_the_same_records(client, upload, sample_crops):
+    upload_id = upload("crops.csv", sample_crops)["upload_id"]
+    client.post(f"/api/upload/{upload_id}/save-mappings", json=SAMPLE_MAPPINGS)
+    assert client.post(f"/api/upload/{upload_id}/parse").status_code == 200
+    body = {"column_name": "Crop", "values": ["Wheat", "Sesame"]}
+
+    records = client.post(f"/api/upload/{upload_id}/filter", json=body).json()["records"]
+    assert records
+
+    columnar = client.post(f"/api/upload/{upload_id}/filter", json=body,
+                           headers={"Accept": "application/json; layout=columnar"}).json()
+    assert columnar["layout"] == "columnar"
+    assert decode_columnar(columnar["records"]["length"], columnar["records"]["columns"]) == records
+
+    response = client.post(f"/api/upload/{upload_id}/filter?format=arrow", json=body)
+    if record_formats.HAS_PYARROW:
+        assert response.headers["content-type"] == record_formats.ARROW_MEDIA_TYPE
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == len(records)
+        assert table.column("month_mask").to_pylist() == [record["month_mask"] for record in records]
+    else:
+        assert response.status_code == 406
+
+    lines = client.post(f"/api/upload/{upload_id}/filter?format=ndjson", json=body).text.splitlines()
+    assert [json.loads(line) for line in lines] == records
@@ -0,0 +1,72 @@
+import random
+import uuid
+
+import pytest
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+BASE_MAPPINGS = {
+    'Crop': 'crop_name', 'Country': 'ignore', 'Region': 'ignore', 'CropProcess': 'ignore',
+    'Period': 'harvest_calendar', 'Start': 'ignore', 'End': 'ignore'
+}
+
+# Re-parses answered incrementally from BASE_MAPPINGS' results: a changed
+# field mapping, and months read from other columns
+REPARSE_MAPPINGS = {
+    'field': {**BASE_MAPPINGS, 'Country': 'country'},
+    'months': {**BASE_MAPPINGS, 'Period': 'ignore', 'Start': 'start_date', 'End': 'end_date'}
+}
+
+def crop_calendar_csv(rows: int) -> bytes:
+    """A generated calendar with a unique region, some unparseable periods among its rows"""
+    rng = random.Random(rows)
+    lines = ['Crop,Country,Region,CropProcess,Period,Start,End']
+    for i in range(rows):
+        start, end = rng.randrange(12), rng.randrange(12)
+        period = f"{MONTHS[start]}-{MONTHS[end]}" if i % 17 else 'unknown'
+        lines.append(f"{rng.choice(['Wheat', 'Maize', 'Teff', 'Sorghum'])},C{rng.randrange(20)},"
+                     f"R{rng.randrange(300)},{rng.choice(['Harvesting', 'Planting'])},{period},"
+                     f"{start + 1:02d}/01/2020,{end + 1:02d}/28/2020")
+    lines.append(f"Wheat,C0,{uuid.uuid4().hex},Harvesting,Jan-Mar,01/01/2020,03/28/2020")
+    return ("\n".join(lines) + "\n").encode()
+
+def parse(client, upload_id, mappings):
+    client.post(f"/api/upload/{upload_id}/save-mappings", json=mappings)
+    response = client.post(f"/api/upload/{upload_id}/parse")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def parse_snapshot(db, upload_id):
+    """Everything stored for an upload's current parse results"""
+    parse_id = db.execute("SELECT parse_id FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()[0]
+    query = lambda sql: db.execute(sql, (parse_id,)).fetchall()
+    return {
+        "records": query("""SELECT row_number, raw_json, normalized_json, month_mask, crop_name, country,
+                                   requires_review, review_reason, is_harvest
+                            FROM records WHERE parse_id = ? ORDER BY row_number"""),
+        "postings": query("""SELECT column_name, value, row_count, row_numbers FROM value_postings
+                             WHERE parse_id = ? ORDER BY column_name, value"""),
+        "columns": query("""SELECT column_name, position, distinct_count, indexed FROM parse_columns
+                            WHERE parse_id = ? ORDER BY position"""),
+        "masks": query("SELECT month_mask, record_count FROM parse_masks WHERE parse_id = ? ORDER BY month_mask")
+    }
+
+@pytest.mark.parametrize("case", sorted(REPARSE_MAPPINGS))
+def test_incremental_reparse_matches_full_parse(client, db, upload, case):
+    content = crop_calendar_csv(3000)
+
+    incremental_upload = upload("calendar.csv", content)["upload_id"]
+    parse(client, incremental_upload, BASE_MAPPINGS)
+    incremental = parse(client, incremental_upload, REPARSE_MAPPINGS[case])
+    assert incremental["ingest"].get("incremental")
+    incremental_snapshot = parse_snapshot(db, incremental_upload)
+    client.delete(f"/api/upload/{incremental_upload}")
+
+    full_upload = upload("calendar.csv", content)["upload_id"]
+    full = parse(client, full_upload, REPARSE_MAPPINGS[case])
+    assert not full.get("reused") and not full["ingest"].get("incremental")
+
+    assert incremental["stats"] == full["stats"]
+    assert incremental["sample_records"] == full["sample_records"]
+    assert incremental_snapshot == parse_snapshot(db, full_upload)
+    assert incremental_snapshot["records"]
@@ -0,0 +1,29 @@
+import os
+import uuid
+
+import pytest
+
+def stored_files(app_module, filename):
+    return [name for name in os.listdir(app_module.DATA_DIR) if name.endswith(filename)]
+
+def test_upload_previews_and_detects(client, upload, sample_crops):
+    result = upload("crops.csv", sample_crops)
+    assert result["total_rows"] == sample_crops.count(b"\n") - 1
+    assert not result["total_rows_estimated"]
+    assert result["columns"][:3] == ["Crop", "Country", "Region"]
+    assert result["detected_columns"]["Crop"] == "crop_name"
+    assert len(result["preview_rows"]) == 10
+
+@pytest.mark.parametrize("extension, content", [
+    ("csv", b"Crop,Country\n"),
+    ("csv", b""),
+    ("xml", b"<root><r><Crop>Wheat</Crop></r"),
+    ("xml", b"<root/>"),
+    ("xlsx", b"not a workbook")
+], ids=["header only", "blank", "malformed xml", "no xml records", "corrupt xlsx"])
+def test_failed_upload_removes_saved_file(client, db, app_module, extension, content):
+    filename = f"{uuid.uuid4().hex}.{extension}"
+    response = client.post("/api/upload", files={"file": (filename, content)})
+    assert response.status_code == 400 or response.json()[0]["success"] is False
+    assert stored_files(app_module, filename) == []
+    assert db.execute("SELECT COUNT(*) FROM uploads WHERE filename = ?", (filename,)).fetchone()[0] == 0
@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ==================== VALUE SEARCH ====================
+#
+# Typeahead over a column's distinct values. A column's values are copied
+# once from the column statistics catalog into value_search, an FTS5 table
+# with the trigram tokenizer, the first time the column is searched. Each
+# column gets a contiguous rowid range, so a search only visits its own
+# values.
+#
+# Queries of three characters or more are answered from the trigram index:
+# a quoted phrase matches values containing it (case-insensitively), and
+# fuzzy candidates are values sharing trigrams with the query, re-ranked by
+# trigram similarity. Shorter queries scan the column's range.
+#
+# The trigram tokenizer needs SQLite 3.34 or later built with FTS5. Without
+# it there is no index: searches scan the column's values in the catalog
+# (scan_search_values) and rank them the same way, which is slower on
+# columns with many distinct values.
+
+SEARCH_MODES = ('all', 'prefix', 'substring', 'fuzzy')
+
+MAX_SEARCH_LIMIT = 200
+
+# Fuzzy matches: the values sharing the most trigrams with the query, kept
+# when their similarity (as pg_trgm computes it) reaches the threshold
+FUZZY_CANDIDATES = int(os.getenv("FUZZY_CANDIDATES", 500))
+FUZZY_MIN_SIMILARITY = float(os.getenv("FUZZY_MIN_SIMILARITY", 0.3))
+
+SEARCH_BATCH_SIZE = 5000
+
+# Whether this SQLite has trigram FTS5 and value_search exists; set by create_value_search
+_trigram_index = False
+
+def create_value_search(c: sqlite3.Cursor) -> bool:
+    """
+    Create the search tables, the trigram index only where SQLite supports
+    it (probed on a TEMP table). Returns whether searches use the index.
+    """
+    global _trigram_index
+    try:
+        c.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(value, tokenize = 'trigram')")
+        c.execute("DROP TABLE temp.trigram_probe")
+        _trigram_index = True
+    except sqlite3.OperationalError:  # No FTS5 module, or no trigram tokenizer (SQLite < 3.34)
+        _trigram_index = False
+    if _trigram_index:
+        c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS value_search
+                    USING fts5(value, value_count UNINDEXED, tokenize = 'trigram')""")
+    c.execute("""CREATE TABLE IF NOT EXISTS value_search_columns (
+                source_key TEXT,
+                column_name TEXT,
+                first_rowid INTEGER,
+                last_rowid INTEGER,
+                PRIMARY KEY (source_key, column_name)
+                )""")
+    return _trigram_index
+
+def has_trigram_index() -> bool:
+    return _trigram_index
+
+def trigram_set(text: str) -> set:
+    """Trigrams of each lowercased word, padded with two blanks in front and one behind"""
+    grams = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(query_grams: set, text: str) -> float:
+    """Shared trigrams over all distinct trigrams of both strings"""
+    grams = trigram_set(text)
+    if not query_grams or not grams:
+        return 0.0
+    shared = len(query_grams & grams)
+    return shared / (len(query_grams) + len(grams) - shared)
+
+def fts_phrase(text: str) -> str:
+    """text as an FTS5 string literal"""
+    return '"' + text.replace('"', '""') + '"'
+
+def value_search_range(c: sqlite3.Cursor, source_key: str, column_name: str) -> Optional[Tuple[int, int]]:
+    """(first, last) value_search rowids of an indexed column, or None"""
+    c.execute("SELECT first_rowid, last_rowid FROM value_search_columns WHERE source_key = ? AND column_name = ?",
+             (source_key, column_name))
+    row = c.fetchone()
+    return (row[0], row[1]) if row else None
+
+def catalog_values(c: sqlite3.Cursor, source_key: str, column_name: str) -> Optional[List[Tuple[str, int]]]:
+    """(value, count) of a cataloged column, inline or from column_values; None if no such column"""
+    c.execute("SELECT values_json FROM column_stats WHERE source_key = ? AND column_name = ?",
+             (source_key, column_name))
+    row = c.fetchone()
+    if not row:
+        return None
+    if row[0] is not None:
+        return list(json.loads(row[0]).items())
+    c.execute("SELECT value, value_count FROM column_values WHERE source_key = ? AND column_name = ?",
+             (source_key, column_name))
+    return c.fetchall()
+
+def build_value_search(c: sqlite3.Cursor, source_key: str, column_name: str) -> Optional[Tuple[int, int]]:
+    """
+    Index a cataloged column's values for search, unless already indexed.
+    Returns its rowid range; None if the catalog has no such column.
+    The caller commits.
+    """
+    # Taking the write lock first: a concurrent build of the same column finishes before this checks
+    c.execute("""INSERT OR IGNORE INTO value_search_columns (source_key, column_name, first_rowid, last_rowid)
+                VALUES (?, ?, 0, -1)""", (source_key, column_name))
+    if c.rowcount == 0:
+        return value_search_range(c, source_key, column_name)
+
+    values = catalog_values(c, source_key, column_name)
+    if values is None:
+        c.execute("DELETE FROM value_search_columns WHERE source_key = ? AND column_name = ?",
+                 (source_key, column_name))
+        return None
+
+    c.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM value_search")
+    first = c.fetchone()[0]
+    rows = [(first + i, value, count) for i, (value, count) in enumerate(values)]
+    for start in range(0, len(rows), SEARCH_BATCH_SIZE):
+        c.executemany("INSERT INTO value_search (rowid, value, value_count) VALUES (?, ?, ?)",
+                      rows[start:start + SEARCH_BATCH_SIZE])
+    last = first + len(rows) - 1
+    c.execute("UPDATE value_search_columns SET first_rowid = ?, last_rowid = ? WHERE source_key = ? AND column_name = ?",
+             (first, last, source_key, column_name))
+    return first, last
+
+def search_values(
+    c: sqlite3.Cursor,
+    value_range: Tuple[int, int],
+    query: str,
+    mode: str = 'all',
+    limit: int = 20
+) -> List[Dict]:
+    """
+    Values of an indexed column matching query, at most limit of them:
+    prefix matches, then other values containing the query, then fuzzy
+    matches ('all'), or only the given kind. Each comes with its count, the
+    kind of match and a score (1 for exact substrings, the similarity for
+    fuzzy ones). Matches of a kind are ordered by count, fuzzy ones by
+    similarity. An empty query returns the most frequent values.
+    """
+    first, last = value_range
+    query = query.strip()
+    if not query:
+        c.execute("""SELECT value, value_count FROM value_search WHERE rowid BETWEEN ? AND ?
+                    ORDER BY value_count DESC, value LIMIT ?""", (first, last, limit))
+        return [{"value": value, "count": count, "match": "all", "score": 1.0} for value, count in c.fetchall()]
+
+    folded = query.lower()
+
+    def contained() -> List[Tuple[str, int]]:
+        if len(query) >= 3:
+            c.execute("""SELECT value, value_count FROM value_search
+                        WHERE value_search MATCH ? AND rowid BETWEEN ? AND ?
+                        ORDER BY value_count DESC, value""", (fts_phrase(query), first, last))
+        else:
+            c.execute("""SELECT value, value_count FROM value_search
+                        WHERE rowid BETWEEN ? AND ? AND instr(lower(value), ?) > 0
+                        ORDER BY value_count DESC, value""", (first, last, folded))
+        return c.fetchall()
+
+    def fuzzy_candidates() -> List[Tuple[str, int]]:
+        # Each trigram is one index lookup; counting them per value is cheaper than ranking an OR query
+        shared = Counter()
+        for gram in {folded[i:i + 3] for i in range(len(folded) - 2)}:
+            c.execute("SELECT rowid FROM value_search WHERE value_search MATCH ? AND rowid BETWEEN ? AND ?",
+                     (fts_phrase(gram), first, last))
+            shared.update(row[0] for row in c.fetchall())
+        candidates = [rowid for rowid, _ in shared.most_common(FUZZY_CANDIDATES)]
+        c.execute(f"""SELECT value, value_count FROM value_search
+                     WHERE rowid IN ({", ".join("?" for _ in candidates)})""", candidates)
+        return c.fetchall()
+
+    return rank_matches(query, mode, limit, contained, fuzzy_candidates)
+
+def scan_search_values(
+    c: sqlite3.Cursor,
+    source_key: str,
+    column_name: str,
+    query: str,
+    mode: str = 'all',
+    limit: int = 20
+) -> Optional[List[Dict]]:
+    """
+    search_values without the trigram index: the same matches, from a scan
+    of the column's cataloged values. None if the catalog has no such column.
+    """
+    values = catalog_values(c, source_key, column_name)
+    if values is None:
+        return None
+    values.sort(key=lambda item: (-item[1], item[0]))
+    query = query.strip()
+    if not query:
+        return [{"value": value, "count": count, "match": "all", "score": 1.0} for value, count in values[:limit]]
+
+    folded = query.lower()
+    return rank_matches(query, mode, limit,
+                        lambda: [(value, count) for value, count in values if folded in value.lower()],
+                        lambda: values)
+
+def rank_matches(
+    query: str,
+    mode: str,
+    limit: int,
+    contained: Callable[[], List[Tuple[str, int]]],
+    fuzzy_candidates: Callable[[], List[Tuple[str, int]]]
+) -> List[Dict]:
+    """
+    The matches search_values returns, given the (value, count) pairs
+    containing the query, most frequent first, and the fuzzy candidates;
+    each is only fetched when mode needs it.
+    """
+    folded = query.lower()
+    results: List[Dict] = []
+    seen = set()
+
+    def add(value: str, count: int, match: str, score: float):
+        if value not in seen and len(results) < limit:
+            seen.add(value)
+            results.append({"value": value, "count": count, "match": match, "score": round(score, 3)})
+
+    if mode in ('all', 'prefix', 'substring'):
+        matches = [(value, count) for value, count in contained() if folded in value.lower()]
+        if mode != 'substring':
+            for value, count in matches:
+                if value.lower().startswith(folded):
+                    add(value, count, 'prefix', 1.0)
+        if mode != 'prefix':
+            for value, count in matches:
+                add(value, count, 'substring', 1.0)
+
+    if mode in ('all', 'fuzzy') and len(results) < limit and len(query) >= 3:
+        query_grams = trigram_set(query)
+        scored = [(similarity(query_grams, value), value, count) for value, count in fuzzy_candidates()]
+        scored.sort(key=lambda item: (-item[0], -item[2], item[1]))
+        for score, value, count in scored:
+            if score < FUZZY_MIN_SIMILARITY:
+                break
+            add(value, count, 'fuzzy', score)
+    return results
+
+def delete_value_search(c: sqlite3.Cursor, source_key: str):
+    """Drop the search index of a source's columns"""
+    if not _trigram_index:
+        return
+    c.execute("SELECT first_rowid, last_rowid FROM value_search_columns WHERE source_key = ?", (source_key,))
+    for first, last in c.fetchall():
+        c.execute("DELETE FROM value_search WHERE rowid BETWEEN ? AND ?", (first, last))
+    c.execute("DELETE FROM value_search_columns WHERE source_key = ?", (source_key,))
@@ -0,0 +1,186 @@
+import xml.etree.ElementTree as ET
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# ==================== XML READING ====================
+#
+# XML files are read with iterparse: each record element is turned into a
+# row as soon as it is complete, then cleared and detached from its parent,
+# so only the record being read (plus its ancestors) is ever in memory.
+#
+# Without a record path the root's children are the records and their
+# direct children the columns (tag -> text), as the original reader did.
+# With a record path, records are the elements at that path and are
+# flattened: attributes become '@name' columns, nested children
+# 'parent.child' columns, and repeated children are joined with ', '.
+
+XML_CHUNK_ROWS = 10000
+
+def local_name(tag: str) -> str:
+    """Tag without its '{namespace}' prefix"""
+    return tag.rsplit("}", 1)[-1]
+
+def parse_record_path(record_path: Optional[str]) -> List[str]:
+    """
+    Steps of a record path: slash-separated tag names below the root,
+    '*' matching any tag (e.g. 'Crops/Crop', '*/record').
+    """
+    if record_path is None:
+        return ["*"]
+    steps = [step for step in record_path.strip().strip("/").split("/") if step]
+    if not steps:
+        raise ValueError("Record path is empty")
+    return steps
+
+def simple_row(element: ET.Element) -> Dict[str, str]:
+    """A record's direct children as tag -> text (no record path)"""
+    return {child.tag: child.text or '' for child in element}
+
+def flatten_row(element: ET.Element) -> Dict[str, str]:
+    """A record flattened into '@attr', 'child', 'parent.child' and 'child@attr' columns"""
+    row: Dict[str, str] = {}
+
+    def add(column: str, value: str):
+        # Repeated columns keep their non-empty values, joined
+        if column not in row:
+            row[column] = value
+        elif value:
+            row[column] = f"{row[column]}, {value}" if row[column] else value
+
+    def visit(node: ET.Element, prefix: str):
+        for name, value in node.attrib.items():
+            add(f"{prefix}@{local_name(name)}", value)
+        text = (node.text or '').strip()
+        if len(node) == 0:
+            if prefix:
+                add(prefix, text)
+            return
+        if text and prefix:
+            add(prefix, text)  # Mixed content: keep the element's own text too
+        for child in node:
+            name = local_name(child.tag)
+            visit(child, f"{prefix}.{name}" if prefix else name)
+
+    visit(element, "")
+    return row
+
+def iter_xml_records(file_path: str, record_path: Optional[str] = None) -> Iterator[ET.Element]:
+    """
+    Record elements at record_path, in document order. Each is complete
+    when yielded and cleared once the caller moves on to the next one.
+    """
+    steps = parse_record_path(record_path)
+    match_any = steps == ["*"] * len(steps)
+    record_level = len(steps) + 1  # The root is level 1
+
+    level = 0
+    path: List[str] = []             # Local tags of the open elements below the root, down to record level
+    stack: List[ET.Element] = []     # Open elements down to record level, root first
+    names: Dict[str, str] = {}
+    for event, element in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            level += 1
+            if level <= record_level:
+                stack.append(element)
+                if level > 1:
+                    tag = element.tag
+                    name = names.get(tag)
+                    if name is None:
+                        name = names[tag] = local_name(tag)
+                    path.append(name)
+            continue
+
+        # Elements inside a record are kept until the record itself ends
+        if level > record_level:
+            level -= 1
+            continue
+
+        if level == record_level and (match_any or all(step in ('*', tag) for step, tag in zip(steps, path))):
+            yield element
+
+        level -= 1
+        stack.pop()
+        if path:
+            path.pop()
+        # Finished: nothing below it is needed anymore
+        element.clear()
+        if stack:
+            stack[-1].remove(element)
+
+def iter_xml_rows(file_path: str, record_path: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Rows of the records at record_path, in document order"""
+    to_row = simple_row if record_path is None else flatten_row
+    return map(to_row, iter_xml_records(file_path, record_path))
+
+def iter_xml_chunks(
+    file_path: str,
+    record_path: Optional[str] = None,
+    nrows: Optional[int] = None,
+    chunk_rows: int = XML_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Stream the records as DataFrames of up to chunk_rows rows each, stopping after nrows"""
+    rows = iter_xml_rows(file_path, record_path)
+    if nrows is not None:
+        rows = islice(rows, nrows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk)
+        if len(chunk) < chunk_rows:
+            return
+
+def read_xml_records(file_path: str, record_path: Optional[str] = None, nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read the records into one DataFrame. Columns appear in the order they
+    are first seen; records without a column have NaN there.
+    """
+    chunks = list(iter_xml_chunks(file_path, record_path, nrows))
+    if not chunks:
+        raise ValueError("No data found in XML file")
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+def sample_xml_records(file_path: str, record_path: Optional[str], nrows: int) -> Tuple[pd.DataFrame, int]:
+    """The first nrows records and the exact record count, in one streaming pass"""
+    rows = iter_xml_rows(file_path, record_path)
+    sample = list(islice(rows, nrows))
+    if not sample:
+        raise ValueError("No data found in XML file")
+    return pd.DataFrame(sample), len(sample) + sum(1 for _ in rows)
+
+def count_xml_records(file_path: str, record_path: Optional[str] = None) -> int:
+    """Exact number of records at record_path"""
+    return sum(1 for _ in iter_xml_records(file_path, record_path))
+
+def suggest_record_paths(file_path: str, max_elements: int = 100000, limit: int = 10) -> List[Dict]:
+    """
+    Candidate record paths: element paths that repeat, counted over the
+    first max_elements elements. Most frequent first, and at equal counts
+    the shallower path (the record rather than its fields).
+    """
+    counts: Counter = Counter()
+    path: List[str] = []
+    stack: List[ET.Element] = []
+    seen = 0
+    for event, element in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(element)
+            if len(stack) > 1:
+                path.append(local_name(element.tag))
+                counts["/".join(path)] += 1
+                seen += 1
+                if seen >= max_elements:
+                    break
+            continue
+        stack.pop()
+        if path:
+            path.pop()
+        element.clear()
+        if stack:
+            stack[-1].remove(element)
+    candidates = sorted((item for item in counts.items() if item[1] > 1),
+                        key=lambda item: (-item[1], item[0].count("/")))
+    return [{"record_path": record_path, "count": count} for record_path, count in candidates[:limit]]
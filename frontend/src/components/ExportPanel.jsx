@@ -8,10 +8,22 @@ import {
   exportTableAsPDF,
   exportAsJSON,
   exportTableAsSVG,
-  exportAsLZL
+  exportAsLZL,
+  downloadServerExport
 } from '../utils/exportUtils'
 
+const getApiUrl = () => {
+  if (window.location.hostname === 'localhost') {
+    return 'http://localhost:8000'
+  }
+  const protocol = window.location.protocol
+  const host = window.location.hostname
+  return `${protocol}//${host}:8000`
+}
+
 export default function ExportPanel({
+  uploadId,
+  filter,
   records,
   ganttElementId,
   groupingColumns,
@@ -74,12 +86,25 @@ export default function ExportPanel({
 
       switch (selectedFormat) {
         case 'excel':
-          result = await exportToExcelWithColumns(
-            records,
-            groupedData,
-            groupingColumns,
-            selectedColumns
-          )
+          // Streamed by the backend when the records come from an upload
+          result = uploadId
+            ? await downloadServerExport(getApiUrl(), uploadId, 'xlsx', {
+                filter,
+                columns: selectedColumns
+              })
+            : await exportToExcelWithColumns(
+                records,
+                groupedData,
+                groupingColumns,
+                selectedColumns
+              )
+          break
+
+        case 'csv':
+          result = await downloadServerExport(getApiUrl(), uploadId, 'csv', {
+            filter,
+            columns: selectedColumns
+          })
           break
 
         case 'png':
@@ -104,7 +129,9 @@ export default function ExportPanel({
           break
 
         case 'json':
-          result = exportAsJSON(records, groupedData, groupingColumns)
+          result = uploadId
+            ? await downloadServerExport(getApiUrl(), uploadId, 'json', { filter })
+            : exportAsJSON(records, groupedData, groupingColumns)
           break
 
         case 'svg':
@@ -139,6 +166,7 @@ export default function ExportPanel({
 
   const formatOptions = [
     { value: 'excel', label: '📊 Excel - Professional table', icon: '📊' },
+    ...(uploadId ? [{ value: 'csv', label: '🧾 CSV - Plain data table', icon: '🧾' }] : []),
     { value: 'png', label: '🖼️ PNG - Full table image (entire width)', icon: '🖼️' },
     { value: 'jpg', label: '📸 JPG - Compressed image (entire width)', icon: '📸' },
     { value: 'pdf', label: '📄 PDF - Multi-page document (entire table)', icon: '📄' },
@@ -205,7 +233,7 @@ export default function ExportPanel({
             </div>
 
             {/* Excel Column Selection */}
-            {selectedFormat === 'excel' && (
+            {(selectedFormat === 'excel' || selectedFormat === 'csv') && (
               <div className="space-y-2 p-3 bg-blue-50 rounded-lg border border-blue-200">
                 <div className="flex items-center justify-between">
                   <label className="block text-sm font-semibold text-gray-900">
@@ -242,7 +270,7 @@ export default function ExportPanel({
                 </div>
 
                 <p className="text-xs text-gray-600 mt-2">
-                  ℹ️ Select columns to include in the professional Excel table export
+                  ℹ️ Select columns to include in the table export
                 </p>
               </div>
             )}
@@ -1,4 +1,5 @@
-import React, { useState, useMemo } from 'react'
+import React, { useState, useEffect, useMemo } from 'react'
+import axios from 'axios'
 import { Toaster, toast } from 'sonner'
 import ExportPanel from './ExportPanel'
 
@@ -74,6 +75,15 @@ function formatDateRange(monthStart, monthEnd) {
   return `${startStr} - ${endStr}`
 }
 
+const getApiUrl = () => {
+  if (window.location.hostname === 'localhost') {
+    return 'http://localhost:8000'
+  }
+  const protocol = window.location.protocol
+  const host = window.location.hostname
+  return `${protocol}//${host}:8000`
+}
+
 function getColorForGroup(index) {
   return COLORS[index % COLORS.length]
 }
@@ -126,6 +136,32 @@ export default function GanttChart({ filterResults, groupingColumns, onBack }) {
   
   const groupingColumnArray = Array.isArray(groupingColumns) ? groupingColumns : [groupingColumns]
   
+  // Groups aggregated by the backend; grouped locally until they arrive (or if the request fails)
+  const [serverGroups, setServerGroups] = useState(null)
+  const uploadId = filterResults?.upload_id
+  const groupingKey = groupingColumnArray.join('\u0000')
+
+  useEffect(() => {
+    setServerGroups(null)
+    if (!uploadId) return
+    let cancelled = false
+    axios.post(`${getApiUrl()}/api/upload/${uploadId}/gantt`, {
+      grouping_columns: groupingColumnArray,
+      column_name: filterColumn || null,
+      values: filterResults?.filter?.values || [],
+      include_record_ids: false
+    })
+      .then(response => {
+        if (!cancelled) setServerGroups(response.data)
+      })
+      .catch(err => {
+        console.warn('Gantt aggregation failed, grouping locally:', err)
+      })
+    return () => {
+      cancelled = true
+    }
+  }, [uploadId, filterResults, groupingKey])
+
   const parseGroupKey = (groupKey) => {
     const parts = groupKey.split(' | ')
     const fieldValues = {}
@@ -136,6 +172,15 @@ export default function GanttChart({ filterResults, groupingColumns, onBack }) {
   }
 
   const groupedRecords = useMemo(() => {
+    if (serverGroups) {
+      // One merged row per group: its first record with the OR-ed month mask
+      const merged = {}
+      serverGroups.groups.forEach(group => {
+        merged[group.label] = [{ ...group.first_record, month_mask: group.month_mask }]
+      })
+      return merged
+    }
+
     const groups = {}
     records.forEach((record, idx) => {
       const groupKey = groupingColumnArray
@@ -171,12 +216,12 @@ export default function GanttChart({ filterResults, groupingColumns, onBack }) {
     })
     
     return mergedGroups
-  }, [records, groupingColumnArray])
+  }, [serverGroups, records, groupingColumnArray])
 
   // Calculate dynamic month span
   const dynamicMonthCount = useMemo(() => {
-    return calculateMaxMonthSpan(records)
-  }, [records])
+    return serverGroups ? serverGroups.month_span : calculateMaxMonthSpan(records)
+  }, [serverGroups, records])
 
   let groupNames = Object.keys(groupedRecords).sort()
 
@@ -315,6 +360,8 @@ export default function GanttChart({ filterResults, groupingColumns, onBack }) {
             )}
 
             <ExportPanel
+              uploadId={filterResults?.upload_id}
+              filter={filterResults?.filter}
               records={records}
               ganttElementId="gantt-table-container"
               groupingColumns={groupingColumnArray}
@@ -3,6 +3,12 @@ import axios from 'axios'
 import Fuse from 'fuse.js'
 import { Toaster, toast } from 'sonner'
 import LoadingSpinner from './LoadingSpinner'
+import { decodeColumnarRecords } from '../utils/recordFormats'
+
+// Columns with more unique values are searched on the server instead of downloaded
+const SERVER_SEARCH_MIN_VALUES = 1000
+const SERVER_SEARCH_LIMIT = 100
+const SEARCH_DEBOUNCE_MS = 150
 
 export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
   const [loading, setLoading] = useState(true)
@@ -12,6 +18,7 @@ export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
   const [uniqueValues, setUniqueValues] = useState([])
   const [selectedValues, setSelectedValues] = useState(new Set())
   const [searchQuery, setSearchQuery] = useState('')
+  const [searchResults, setSearchResults] = useState([])
   const [useFuzzyMerge, setUseFuzzyMerge] = useState(false)
   const [filtering, setFiltering] = useState(false)
 
@@ -48,10 +55,23 @@ export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
     loadColumns()
   }, [uploadId])
 
+  const serverSearch = useMemo(() => {
+    const column = columns.find(col => col.name === selectedColumn)
+    return Boolean(column && column.unique_values > SERVER_SEARCH_MIN_VALUES)
+  }, [columns, selectedColumn])
+
   // Load unique values when column changes
   useEffect(() => {
     if (!selectedColumn) return
 
+    if (serverSearch) {
+      // Too many to download: the search effect below fetches matches instead
+      setUniqueValues([])
+      setSelectedValues(new Set())
+      setSearchQuery('')
+      return
+    }
+
     const loadUniqueValues = async () => {
       try {
         setError(null)
@@ -71,10 +91,42 @@ export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
     }
 
     loadUniqueValues()
-  }, [selectedColumn, uploadId])
+  }, [selectedColumn, uploadId, serverSearch])
+
+  // Server-side typeahead for large columns, debounced per keystroke
+  useEffect(() => {
+    if (!selectedColumn || !serverSearch) return
+
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const apiUrl = getApiUrl()
+        const response = await axios.get(
+          `${apiUrl}/api/upload/${uploadId}/unique-values/${selectedColumn}/search`,
+          { params: { q: searchQuery, limit: SERVER_SEARCH_LIMIT } }
+        )
+        if (!cancelled) {
+          setSearchResults(response.data.matches || [])
+        }
+      } catch (err) {
+        if (!cancelled) {
+          setError(err.response?.data?.detail || 'Failed to search values')
+        }
+      }
+    }, SEARCH_DEBOUNCE_MS)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [selectedColumn, uploadId, serverSearch, searchQuery])
 
   // Fuzzy search/filter unique values
   const filteredValues = useMemo(() => {
+    if (serverSearch) {
+      return searchResults
+    }
+
     if (!searchQuery) {
       return uniqueValues
     }
@@ -86,7 +138,7 @@ export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
     })
 
     return fuse.search(searchQuery).map(result => result.item)
-  }, [uniqueValues, searchQuery])
+  }, [uniqueValues, searchQuery, serverSearch, searchResults])
 
   // Handle value toggle
   const handleToggleValue = (value) => {
@@ -128,12 +180,16 @@ export default function GroupSelector({ uploadId, onFilterApply, onBack }) {
         {
           column_name: selectedColumn,
           values: Array.from(selectedValues)
-        }
+        },
+        // Column names once and repeated values dictionary-encoded: a fraction of the row layout
+        { params: { format: 'columnar' } }
       )
 
       if (response.data.success) {
+        const records = decodeColumnarRecords(response.data.records)
+
         // Ensure ONLY harvesting records are included
-        const harvestingRecords = response.data.records.filter(record => {
+        const harvestingRecords = records.filter(record => {
           const cropProcess = record.cropProcess || record.crop_process || ''
           return cropProcess.toLowerCase().includes('harvesting')
         })
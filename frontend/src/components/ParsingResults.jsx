@@ -9,6 +9,7 @@ export default function ParsingResults({ uploadId, onParsingComplete, onBack })
   const [error, setError] = useState(null)
   const [results, setResults] = useState(null)
   const [stats, setStats] = useState(null)
+  const [progress, setProgress] = useState(null)
 
   const getApiUrl = () => {
     if (window.location.hostname === 'localhost') {
@@ -31,9 +32,26 @@ export default function ParsingResults({ uploadId, onParsingComplete, onBack })
       })
       
       const apiUrl = getApiUrl()
-      const response = await axios.post(
-        `${apiUrl}/api/upload/${uploadId}/parse`
+      
+      // Parse runs as a background job; poll it instead of holding the request open
+      const submitted = await axios.post(
+        `${apiUrl}/api/upload/${uploadId}/parse-jobs`
       )
+      const jobId = submitted.data.job_id
+      let job = submitted.data
+      setProgress(job)
+      
+      while (job.state === 'queued' || job.state === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        job = (await axios.get(`${apiUrl}/api/parse-jobs/${jobId}`)).data
+        setProgress(job)
+      }
+      
+      if (job.state !== 'completed') {
+        throw { response: { data: { detail: job.error || `Parsing ${job.state}` } } }
+      }
+      
+      const response = await axios.get(`${apiUrl}/api/parse-jobs/${jobId}/result`)
       
       if (response.data.success) {
         setResults(response.data)
@@ -55,6 +73,7 @@ export default function ParsingResults({ uploadId, onParsingComplete, onBack })
       })
     } finally {
       setParsing(false)
+      setProgress(null)
     }
   }
 
@@ -65,7 +84,14 @@ export default function ParsingResults({ uploadId, onParsingComplete, onBack })
         <div className="flex items-center justify-center p-12">
           <div className="text-center">
             <LoadingSpinner message="Parsing data and generating month masks..." size="lg" />
-            <p className="text-sm text-gray-500 mt-4">This may take a moment for large files</p>
+            {progress?.rows_total ? (
+              <p className="text-sm text-gray-500 mt-4">
+                {progress.rows_done.toLocaleString()} / {progress.rows_total.toLocaleString()} rows
+                {progress.eta_seconds != null && ` · about ${Math.ceil(progress.eta_seconds)}s left`}
+              </p>
+            ) : (
+              <p className="text-sm text-gray-500 mt-4">This may take a moment for large files</p>
+            )}
           </div>
         </div>
       </div>
@@ -1,6 +1,6 @@
 import React from 'react'
 
-export default function UploadStatus({ uploadData }) {
+export default function UploadStatus({ uploadData, onSelectSheet, onSelectRecordPath }) {
   const getFileTypeIcon = (fileType) => {
     const icons = {
       csv: '📄',
@@ -32,7 +32,7 @@ export default function UploadStatus({ uploadData }) {
             <div>
               <p className="text-xs text-gray-500 uppercase tracking-wide">Total Rows</p>
               <p className="text-sm font-medium text-gray-900">
-                {uploadData.total_rows.toLocaleString()}
+                {uploadData.total_rows_estimated ? '~' : ''}{uploadData.total_rows.toLocaleString()}
               </p>
             </div>
             <div>
@@ -42,6 +42,42 @@ export default function UploadStatus({ uploadData }) {
               </p>
             </div>
           </div>
+          {uploadData.sheets && uploadData.sheets.length > 1 && (
+            <div className="mt-4 flex items-center space-x-3">
+              <label htmlFor="sheet-select" className="text-xs text-gray-500 uppercase tracking-wide">
+                Sheet
+              </label>
+              <select
+                id="sheet-select"
+                value={uploadData.sheet_name || uploadData.sheets[0]}
+                onChange={(e) => onSelectSheet && onSelectSheet(e.target.value)}
+                className="text-sm border border-gray-300 rounded-md px-2 py-1 bg-white"
+              >
+                {uploadData.sheets.map((sheet) => (
+                  <option key={sheet} value={sheet}>{sheet}</option>
+                ))}
+              </select>
+            </div>
+          )}
+          {uploadData.file_type === 'xml' && (
+            <div className="mt-4 flex items-center space-x-3">
+              <label htmlFor="record-path-input" className="text-xs text-gray-500 uppercase tracking-wide">
+                Record Path
+              </label>
+              <input
+                id="record-path-input"
+                key={uploadData.record_path || ''}
+                defaultValue={uploadData.record_path || ''}
+                placeholder="e.g. Crops/Crop"
+                onKeyDown={(e) => {
+                  if (e.key === 'Enter' && onSelectRecordPath) {
+                    onSelectRecordPath(e.target.value.trim() || null)
+                  }
+                }}
+                className="text-sm border border-gray-300 rounded-md px-2 py-1 bg-white"
+              />
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -72,6 +72,38 @@ export default function UploadPage({ onUploadComplete, onColumnMappingStart }) {
     }
   }
 
+  const handleSelectSheet = async (sheetName) => {
+    try {
+      const apiUrl = getApiUrl()
+      const response = await axios.post(
+        `${apiUrl}/api/upload/${uploadData.upload_id}/sheet`,
+        { sheet_name: sheetName }
+      )
+      const sheetData = { ...uploadData, ...response.data }
+      setUploadData(sheetData)
+      setError(null)
+      onUploadComplete(sheetData)
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to switch sheet')
+    }
+  }
+
+  const handleSelectRecordPath = async (recordPath) => {
+    try {
+      const apiUrl = getApiUrl()
+      const response = await axios.post(
+        `${apiUrl}/api/upload/${uploadData.upload_id}/record-path`,
+        { record_path: recordPath }
+      )
+      const recordData = { ...uploadData, ...response.data }
+      setUploadData(recordData)
+      setError(null)
+      onUploadComplete(recordData)
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to switch record path')
+    }
+  }
+
   const handleNext = () => {
     if (uploadData) {
       onColumnMappingStart(uploadData)
@@ -128,7 +160,11 @@ export default function UploadPage({ onUploadComplete, onColumnMappingStart }) {
           <>
             {/* Upload Status */}
             <div className="mb-8">
-              <UploadStatus uploadData={uploadData} />
+              <UploadStatus
+                uploadData={uploadData}
+                onSelectSheet={handleSelectSheet}
+                onSelectRecordPath={handleSelectRecordPath}
+              />
             </div>
 
             {/* Preview Section */}
@@ -136,6 +136,48 @@ export const exportToExcelWithColumns = async (
   }
 }
 
+/**
+ * Download a data export (xlsx, csv, json) streamed by the backend from the
+ * parsed records, so large datasets are not built in the browser
+ */
+export const downloadServerExport = async (apiUrl, uploadId, format, options = {}) => {
+  const { filter = null, columns = null } = options
+
+  try {
+    const response = await fetch(`${apiUrl}/api/upload/${uploadId}/export?format=${format}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        column_name: filter?.column || null,
+        values: filter?.values || [],
+        columns: columns && columns.length > 0 ? columns : null
+      })
+    })
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}))
+      throw new Error(error.detail || `Export failed (${response.status})`)
+    }
+
+    const blob = await response.blob()
+    const disposition = response.headers.get('Content-Disposition') || ''
+    const match = disposition.match(/filename="([^"]+)"/)
+    const timestamp = new Date().toISOString().slice(0, 10)
+
+    const link = document.createElement('a')
+    link.href = URL.createObjectURL(blob)
+    link.download = match ? match[1] : `crop-gantt-export-${timestamp}.${format}`
+    document.body.appendChild(link)
+    link.click()
+    document.body.removeChild(link)
+    URL.revokeObjectURL(link.href)
+
+    return { success: true, message: `${format.toUpperCase()} export completed` }
+  } catch (error) {
+    console.error('Server export error:', error)
+    return { success: false, error: error.message }
+  }
+}
+
 /**
  * Helper function to capture entire scrollable table
  * Increases cell heights during capture to ensure text renders fully without clipping
@@ -0,0 +1,28 @@
+/**
+ * Column values of a columnar response column: plain values, or a
+ * dictionary with one index per record (-1 for missing)
+ */
+const columnValues = (column) => {
+  if (!column.dictionary) return column.values
+  const { dictionary, indices } = column
+  return indices.map(index => (index < 0 ? null : dictionary[index]))
+}
+
+/**
+ * Turn the records of a columnar response ({ length, columns }) back into
+ * one object per record; nested column groups become nested objects
+ */
+export const decodeColumnarRecords = ({ length, columns }) => {
+  const records = Array.from({ length }, () => ({}))
+
+  columns.forEach(column => {
+    const values = column.columns
+      ? decodeColumnarRecords({ length, columns: column.columns })
+      : columnValues(column)
+    for (let i = 0; i < length; i++) {
+      records[i][column.name] = values[i]
+    }
+  })
+
+  return records
+}